@@ -0,0 +1,72 @@
+"""
+Implied-volatility solver benchmark.
+
+Builds realistic chains (tick-rounded prices, volatility smile) of increasing
+width and times cold solves (rational initial guess) and steady-state solves
+warm-started from the previous tick's IVs, both when every price moved and
+when none did.
+
+Typical results on a development laptop: a cold solve takes 0.5-1.5 ms and a
+warm one 0.25-0.65 ms for 20 to 500 strikes, and an unchanged tick about
+0.15 ms. Cost is mostly fixed NumPy overhead per iteration, so it grows far
+less than linearly with width. "Well under a millisecond per hundred strikes"
+therefore holds for wide chains (100+ strikes), but a 20-strike window costs
+about 1.2 ms per hundred strikes warm, and a moved tick still needs about four
+passes.
+
+Run from backend/:  python benchmarks/bench_iv.py
+"""
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greeks import bs_price  # noqa: E402
+from implied_vol import implied_volatility  # noqa: E402
+
+SPOT = 25012.3
+TIME_TO_EXPIRY = 7 / 365
+TICK = 0.05
+
+
+def make_chain(strikes: int, spot: float = SPOT, vol_shift: float = 0.0):
+    """CE and PE prices for `strikes` strikes around spot, rounded to the tick"""
+    strike = np.repeat(SPOT - (strikes // 2) * 50 + 50 * np.arange(strikes), 2).round(-1)
+    is_call = np.tile([True, False], strikes)
+    sigma = 0.12 + vol_shift + 0.8 * ((strike - SPOT) / SPOT) ** 2
+    price = np.maximum(np.round(bs_price(spot, strike, sigma, TIME_TO_EXPIRY, is_call) / TICK) * TICK, TICK)
+    return price, strike, is_call
+
+
+def time_call(fn, repeat: int = 7, number: int = 50) -> float:
+    """Best-of-`repeat` mean time per call in microseconds"""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1e6
+
+
+def main():
+    print(f"{'strikes':>8} {'options':>8} {'cold µs':>10} {'iters':>6} {'warm µs':>10} {'iters':>6} "
+          f"{'warm µs/100 strikes':>20} {'unchanged µs':>13} {'iters':>6}")
+    for strikes in (20, 100, 200, 500):
+        price, strike, is_call = make_chain(strikes)
+        iv, cold_iters = implied_volatility(price, SPOT, strike, TIME_TO_EXPIRY, is_call, return_iterations=True)
+
+        # Next tick: spot up 2 bps, vols up 0.1 point
+        next_spot = SPOT * 1.0002
+        next_price, _, _ = make_chain(strikes, next_spot, 0.001)
+        _, warm_iters = implied_volatility(next_price, next_spot, strike, TIME_TO_EXPIRY, is_call,
+                                           initial=iv, return_iterations=True)
+
+        # Next tick with no price change
+        _, same_iters = implied_volatility(price, SPOT, strike, TIME_TO_EXPIRY, is_call, initial=iv, return_iterations=True)
+
+        cold = time_call(lambda: implied_volatility(price, SPOT, strike, TIME_TO_EXPIRY, is_call))
+        warm = time_call(lambda: implied_volatility(next_price, next_spot, strike, TIME_TO_EXPIRY, is_call, initial=iv))
+        same = time_call(lambda: implied_volatility(price, SPOT, strike, TIME_TO_EXPIRY, is_call, initial=iv))
+        print(f"{strikes:>8} {strikes * 2:>8} {cold:>10.1f} {cold_iters:>6} {warm:>10.1f} {warm_iters:>6} "
+              f"{warm / strikes * 100:>20.1f} {same:>13.1f} {same_iters:>6}")
+
+
+if __name__ == '__main__':
+    main()
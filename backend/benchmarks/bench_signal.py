@@ -0,0 +1,357 @@
+"""
+Signal hot-path benchmarks.
+
+Times the Greeks engine, signal evaluation over chains of 2, 20 and 200
+strikes, streamed ticks (IV solve plus evaluation) touching from none to all
+of a 200-strike chain's options, get_option_chain on a cache hit and a cache
+miss, and endpoint
+throughput through the ASGI app. Market data comes from the in-process
+FakeKite (benchmarks/fake_kite.py), so the live fetch/IV/signal path runs
+without network I/O and gives the same inputs on every run.
+
+Each benchmark is calibrated to run for at least --min-time seconds per
+repeat; the median of --repeat repeats is reported per operation. Save a run
+with --save and pass it to --compare on a later commit to see the ratio per
+benchmark; --max-regression turns slowdowns beyond the given fraction into a
+non-zero exit status.
+
+Run from backend/:
+    python benchmarks/bench_signal.py
+    python benchmarks/bench_signal.py --save before.json
+    python benchmarks/bench_signal.py --compare before.json --max-regression 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Keep runs isolated and repeatable: no tick stream or recorder threads, an
+# in-process shared cache, throwaway instrument master and session files, and
+# no Kite rate limits (the fake client has none to protect) and no market
+# hours, so results do not depend on the time of day
+os.environ.update({
+    'STREAM_ENABLED': 'false',
+    'RECORDER_ENABLED': 'false',
+    'MARKET_CACHE_BACKEND': 'local',
+    'INSTRUMENTS_DIR': tempfile.mkdtemp(prefix='bench-instruments-'),
+    'SESSION_FILE': os.path.join(tempfile.mkdtemp(prefix='bench-session-'), 'session.json'),
+    'KITE_QUOTE_RATE': '0',
+    'KITE_API_RATE': '0',
+    'KITE_QUOTE_COALESCE': '0',
+    'WARMUP_ENABLED': 'false',
+    'MARKET_HOURS_ENABLED': 'false',
+})
+
+import numpy as np  # noqa: E402
+from config import DEFAULT_THRESHOLDS  # noqa: E402
+import instruments  # noqa: E402
+import shared_cache  # noqa: E402
+import signal_engine  # noqa: E402
+import zerodha_api  # noqa: E402
+from chain import OptionChain  # noqa: E402
+from greeks import bs_greeks  # noqa: E402
+from fake_kite import FakeKite  # noqa: E402
+
+try:
+    import httpx
+except ImportError:  # only needed for the endpoint benchmarks
+    httpx = None
+
+SYMBOL = 'NIFTY'
+CHAIN_WIDTHS = (2, 20, 200)
+CONCURRENT_REQUESTS = 32
+
+BENCHMARKS = []
+
+
+def benchmark(name: str):
+    """Register a setup function returning (fn, operations per call); fn=None skips the benchmark"""
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+def make_chain(kite: FakeKite, width: int) -> OptionChain:
+    """Chain of `width` strikes around the spot, built from fake quotes the way the live fetch builds it"""
+    index = instruments.ensure_instruments(kite)
+    expiry = index.nearest_expiry(SYMBOL)
+    spot = kite.spots[SYMBOL]
+    atm_strike, strikes = index.strike_window(SYMBOL, expiry, spot, width // 2)
+    strikes = strikes[:width]
+    names = {}
+    for strike in strikes:
+        for option_type in ('CE', 'PE'):
+            inst = index.lookup(SYMBOL, expiry, strike, option_type)
+            names[(strike, option_type)] = f"{inst.exchange}:{inst.tradingsymbol}"
+    quotes = kite.quote(list(names.values()))
+    chain = OptionChain(SYMBOL, strikes, spot, atm_strike, expiry=expiry.isoformat(),
+                        lot_size=index.lot_size(SYMBOL), data_source='ZERODHA_LIVE', version=f"bench-{width}")
+    for row, strike in enumerate(strikes):
+        zerodha_api._fill_option(chain.ce, row, quotes[names[(strike, 'CE')]])
+        zerodha_api._fill_option(chain.pe, row, quotes[names[(strike, 'PE')]])
+    return zerodha_api._attach_implied_vols(SYMBOL, chain)
+
+
+# --- Greeks -----------------------------------------------------------------
+
+@benchmark('greeks.calculate_greeks')
+def _calculate_greeks(kite):
+    spot = kite.spots[SYMBOL]
+    return lambda: signal_engine.calculate_greeks(spot, 25000, 0.14, 7 / 365, 'CE'), 1
+
+
+@benchmark('greeks.bs_greeks[200 strikes, per strike]')
+def _bs_greeks_chain(kite):
+    chain = make_chain(kite, 200)
+    strikes = np.repeat(chain.strikes, 2)
+    is_call = np.tile([True, False], len(chain))
+    iv = chain.interleaved('iv')
+    return lambda: bs_greeks(chain.ltp, strikes, iv, chain.time_to_expiry, is_call), len(chain)
+
+
+# --- Signal evaluation --------------------------------------------------------
+
+def _register_widths():
+    for width in CHAIN_WIDTHS:
+        def evaluate(kite, width=width):
+            chain = make_chain(kite, width)
+            return lambda: signal_engine.evaluate_signal(SYMBOL, chain, DEFAULT_THRESHOLDS), 1
+
+        def generate(kite, width=width):
+            chain = make_chain(kite, width)
+            return lambda: zerodha_api.generate_signal_from_market_data(SYMBOL, DEFAULT_THRESHOLDS, option_chain=chain), 1
+
+        benchmark(f'signal.evaluate_signal[{width}]')(evaluate)
+        benchmark(f'signal.generate_signal_from_market_data[{width}]')(generate)
+
+
+_register_widths()
+
+
+# --- Streamed ticks -----------------------------------------------------------
+
+TICK_ROWS = (('spot only', 0), ('1 option', 1), ('10 options', 10), ('100 options', 100), ('400 options', 400))
+
+
+def _ticked(chain: OptionChain, rows: int, spot_move: float) -> OptionChain:
+    """Copy of a chain with spot moved and the prices of `rows` options (spread across the chain) up one tick"""
+    ticked = chain.copy()
+    ticked.ltp += spot_move
+    picked = np.linspace(0, 2 * len(chain) - 1, rows).astype(int) if rows else np.empty(0, dtype=int)
+    for side, parity in (('ce', 0), ('pe', 1)):
+        options = ticked.side(side)
+        at = picked[picked % 2 == parity] // 2
+        for field in ('ltp', 'bid', 'ask'):
+            options[field][at] += 0.05
+    return ticked
+
+
+def _register_ticks():
+    """
+    Successive stream snapshots of a 200-strike chain, alternating between two
+    snapshots 2 points of spot and `rows` option ticks apart: the IV solve alone,
+    then IV solve plus evaluation as get_option_chain and the precompute do it
+    """
+    for label, rows in TICK_ROWS:
+        def setup(kite, rows=rows, evaluate=True):
+            base = make_chain(kite, 200)
+            chains = [base, _ticked(base, rows, 2.0)]
+            turn = [0]
+
+            def tick():
+                turn[0] ^= 1
+                chain = zerodha_api._attach_implied_vols(SYMBOL, chains[turn[0]])
+                if evaluate:
+                    return signal_engine.evaluate_signal(SYMBOL, chain, DEFAULT_THRESHOLDS, chain.ltp)
+            tick()
+            tick()
+            return tick, 1
+
+        benchmark(f'tick.attach_implied_vols[200, {label}]')(lambda kite, setup=setup: setup(kite, evaluate=False))
+        benchmark(f'tick.signal[200, {label}]')(setup)
+
+
+_register_ticks()
+
+
+# --- Option chain cache -------------------------------------------------------
+
+@benchmark('chain.get_option_chain[cache hit]')
+def _chain_hit(kite):
+    zerodha_api.market_cache.clear()
+    zerodha_api.get_option_chain(SYMBOL)
+    return lambda: zerodha_api.get_option_chain(SYMBOL), 1
+
+
+@benchmark('chain.get_option_chain[cache miss]')
+def _chain_miss(kite):
+    """Batched quote from the fake, IV solve and cache store on every call"""
+    local = isinstance(shared_cache.backend, shared_cache.LocalBackend)
+
+    def miss():
+        zerodha_api.market_cache.clear()
+        if local:
+            shared_cache.backend._data.clear()
+        return zerodha_api.get_option_chain(SYMBOL)
+    return miss, 1
+
+
+# --- Endpoints ----------------------------------------------------------------
+
+def _endpoint(path: str):
+    if httpx is None:
+        return None, 1
+    from main import app
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench')
+
+    async def burst():
+        responses = await asyncio.gather(*(client.get(path) for _ in range(CONCURRENT_REQUESTS)))
+        for response in responses:
+            response.raise_for_status()
+
+    loop.run_until_complete(burst())  # warm the precomputed signals
+    return (lambda: loop.run_until_complete(burst())), CONCURRENT_REQUESTS
+
+
+@benchmark(f'api.health[{CONCURRENT_REQUESTS} concurrent]')
+def _api_health(kite):
+    return _endpoint('/health')
+
+
+@benchmark(f'api.signal[{CONCURRENT_REQUESTS} concurrent]')
+def _api_signal(kite):
+    return _endpoint(f'/api/signal?symbol={SYMBOL}')
+
+
+@benchmark(f'api.signals[{CONCURRENT_REQUESTS} concurrent, 3 symbols]')
+def _api_signals(kite):
+    return _endpoint('/api/signals?symbols=NIFTY,BANKNIFTY,SENSEX&count=3')
+
+
+# --- Runner -------------------------------------------------------------------
+
+def measure(fn, ops: int, min_time: float, repeat: int) -> dict:
+    """Per-operation timings in microseconds over `repeat` calibrated repeats"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / (number * ops) * 1e6)
+    median = statistics.median(samples)
+    return {
+        'median_us': median,
+        'min_us': min(samples),
+        'stdev_us': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'ops_per_s': 1e6 / median if median else 0.0,
+        'calls': number,
+        'ops_per_call': ops,
+    }
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(['git', *args], cwd=BACKEND, capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ''
+
+
+def environment() -> dict:
+    """What a result was measured on, so runs are only compared like for like"""
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline_path: str, max_regression: float) -> bool:
+    """Print the ratio to a saved run; False if any benchmark slowed down by more than `max_regression`"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    base_env = baseline.get('environment', {})
+    print(f"\nvs {baseline_path} ({base_env.get('commit', '?')[:10]}{' dirty' if base_env.get('dirty') else ''})")
+    print(f"{'benchmark':<56} {'before µs':>11} {'after µs':>11} {'ratio':>7}")
+    ok = True
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"{name:<56} {'-':>11} {result['median_us']:>11.2f} {'new':>7}")
+            continue
+        ratio = result['median_us'] / before['median_us']
+        flag = ''
+        if max_regression is not None and ratio > 1 + max_regression:
+            flag, ok = '  ✗ slower', False
+        elif ratio < 1 / 1.05:
+            flag = '  ✓ faster'
+        print(f"{name:<56} {before['median_us']:>11.2f} {result['median_us']:>11.2f} {ratio:>7.2f}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed repeats per benchmark (median is reported)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repeat')
+    parser.add_argument('--kite-latency', type=float, default=0.0, help='Seconds each fake Kite call sleeps')
+    parser.add_argument('--save', help='Write results and environment as JSON to this path')
+    parser.add_argument('--compare', help='Saved JSON results to compare against')
+    parser.add_argument('--max-regression', type=float, help='Exit non-zero if any benchmark is slower by more than this fraction')
+    args = parser.parse_args()
+
+    # Benchmark the computation, not the log handlers
+    logging.disable(logging.INFO)
+    kite = FakeKite(latency=args.kite_latency)
+    zerodha_api.set_kite_client(kite)
+
+    print(f"{'benchmark':<56} {'median µs':>11} {'min µs':>11} {'stdev':>9} {'ops/s':>12}")
+    results = {}
+    for name, setup in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        fn, ops = setup(kite)
+        if fn is None:
+            print(f"{name:<56} skipped (httpx not installed)")
+            continue
+        result = results[name] = measure(fn, ops, args.min_time, args.repeat)
+        print(f"{name:<56} {result['median_us']:>11.2f} {result['min_us']:>11.2f} "
+              f"{result['stdev_us']:>9.2f} {result['ops_per_s']:>12,.0f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+In-process stand-in for KiteConnect.
+
+Lists weekly option contracts for every configured underlying and answers
+quote() from a deterministic model: Black-Scholes prices on a volatility
+smile, rounded to the tick, with one-tick bid/ask depth and OI/volume derived
+from a hash of the contract name. The same spots give the same quotes on
+every run, so the real fetch, IV and signal code can be timed without network
+I/O. Inject it with zerodha_api.set_kite_client(FakeKite()).
+"""
+import time
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+from config import SYMBOL_MAPPING
+from greeks import bs_price
+from instruments import IST
+
+SPOTS = {'NIFTY': 25012.35, 'BANKNIFTY': 51234.6, 'SENSEX': 81234.1}
+LOT_SIZES = {'NIFTY': 75, 'BANKNIFTY': 35, 'SENSEX': 20}
+EXPIRY_DAYS = (2, 9)     # Listed expiries, in days from today
+STRIKES_EACH_SIDE = 120  # Listed strikes each side of the spot, per expiry
+TICK = 0.05
+MARKET_CLOSE = (15, 30)
+
+
+def _smile(spot: float, strike: np.ndarray) -> np.ndarray:
+    return 0.12 + 0.8 * ((strike - spot) / spot) ** 2
+
+
+def _stable_hash(name: str) -> int:
+    return zlib.crc32(name.encode())
+
+
+class FakeKite:
+    """The subset of KiteConnect the backend calls: quote(), instruments(), login_url(), set_access_token()"""
+
+    def __init__(self, spots: dict = None, latency: float = 0.0,
+                 expiry_days=EXPIRY_DAYS, strikes_each_side: int = STRIKES_EACH_SIDE):
+        self.spots = dict(SPOTS, **(spots or {}))
+        self.latency = latency  # Seconds each REST call sleeps, to model the network round-trip
+        self.calls = {'quote': 0, 'instruments': 0}
+        self.quoted_instruments = 0
+        today = datetime.now(IST).date()
+        self.expiries = [today + timedelta(days=days) for days in expiry_days]
+
+        self._underlyings = {}  # 'NSE:NIFTY 50' -> symbol
+        self._contracts = {}    # 'NFO:NIFTY25JAN25000CE' -> (symbol, strike, is_call, years to expiry, token)
+        self._listing = {}      # exchange -> instrument master rows
+        token = 10_000_000
+        for symbol, mapping in SYMBOL_MAPPING.items():
+            exchange, tradingsymbol = mapping['quote_symbol'].split(':', 1)
+            self._underlyings[mapping['quote_symbol']] = symbol
+            self._listing.setdefault(exchange, []).append({
+                'instrument_token': mapping['token'], 'tradingsymbol': tradingsymbol, 'name': tradingsymbol,
+                'expiry': '', 'strike': 0.0, 'instrument_type': 'EQ', 'lot_size': 0, 'exchange': exchange,
+            })
+            interval = mapping['strike_interval']
+            atm = round(self.spots[symbol] / interval) * interval
+            option_exchange = mapping.get('exchange', 'NFO')
+            for expiry in self.expiries:
+                for i in range(-strikes_each_side, strikes_each_side + 1):
+                    strike = atm + i * interval
+                    for option_type in ('CE', 'PE'):
+                        token += 1
+                        name = f"{symbol}{expiry:%y%b%d}{strike}{option_type}".upper()
+                        self._contracts[f"{option_exchange}:{name}"] = (symbol, strike, option_type == 'CE', expiry, token)
+                        self._listing.setdefault(option_exchange, []).append({
+                            'instrument_token': token, 'tradingsymbol': name, 'name': symbol, 'expiry': expiry,
+                            'strike': float(strike), 'instrument_type': option_type,
+                            'lot_size': LOT_SIZES.get(symbol, 1), 'exchange': option_exchange,
+                        })
+
+    def _wait(self, method: str):
+        self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _years_to_expiry(self, expiry) -> float:
+        close = datetime(expiry.year, expiry.month, expiry.day, *MARKET_CLOSE, tzinfo=IST)
+        return max((close - datetime.now(IST)).total_seconds(), 60.0) / (365 * 24 * 3600)
+
+    def instruments(self, exchange: str = None) -> list:
+        self._wait('instruments')
+        if exchange is None:
+            return [row for rows in self._listing.values() for row in rows]
+        return list(self._listing.get(exchange, []))
+
+    def quote(self, *instruments) -> dict:
+        """Quotes keyed by 'EXCHANGE:TRADINGSYMBOL'; unknown instruments are left out, as Kite does"""
+        self._wait('quote')
+        if len(instruments) == 1 and isinstance(instruments[0], (list, tuple)):
+            instruments = instruments[0]
+        self.quoted_instruments += len(instruments)
+
+        quotes = {}
+        options = []
+        for name in instruments:
+            symbol = self._underlyings.get(name)
+            if symbol is not None:
+                quotes[name] = {
+                    'instrument_token': SYMBOL_MAPPING[symbol]['token'],
+                    'last_price': self.spots[symbol],
+                    'ohlc': {'close': self.spots[symbol]},
+                }
+            elif name in self._contracts:
+                options.append(name)
+        if not options:
+            return quotes
+
+        symbol, strike, is_call, expiry, token = zip(*(self._contracts[name] for name in options))
+        spot = np.array([self.spots[s] for s in symbol])
+        strike = np.array(strike, dtype=float)
+        years = np.array([self._years_to_expiry(e) for e in expiry])
+        price = bs_price(spot, strike, _smile(spot, strike), years, np.array(is_call))
+        price = np.maximum(np.round(price / TICK) * TICK, TICK).round(2).tolist()
+
+        for name, last_price, instrument_token in zip(options, price, token):
+            seed = _stable_hash(name)
+            quotes[name] = {
+                'instrument_token': instrument_token,
+                'last_price': last_price,
+                'oi': 2_000 + seed % 300_000,
+                'volume': 500 + (seed >> 8) % 80_000,
+                'ohlc': {'close': last_price},
+                'depth': {
+                    'buy': [{'price': round(max(last_price - TICK, TICK), 2), 'quantity': 75, 'orders': 1}],
+                    'sell': [{'price': round(last_price + TICK, 2), 'quantity': 75, 'orders': 1}],
+                },
+            }
+        return quotes
+
+    def login_url(self) -> str:
+        return 'https://kite.zerodha.com/connect/login?v=3&api_key=fake'
+
+    def set_access_token(self, access_token: str):
+        self.access_token = access_token
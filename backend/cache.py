@@ -0,0 +1,200 @@
+"""
+In-process caching: a bounded TTL cache and request coalescing for refreshes.
+
+TTLCache holds entries per namespace (e.g. 'ltp', 'option_chain'), each with
+its own TTL, on a monotonic clock. The total entry count is bounded with LRU
+eviction, and entries past the namespace's retention are purged, so memory
+stays flat as underlyings and expiries are added. Hit/miss/eviction counters
+show how effective the cache is.
+
+When a cache entry expires, every concurrent request sees the miss at the
+same moment (the frontend pollers line up on the same 10-second tick).
+single_flight() lets exactly one caller per key run the refresh while the
+others wait for its result, and refresh_in_background() starts that refresh
+without making anyone wait, for stale-while-revalidate reads.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache keyed by (namespace, key).
+
+    `ttls` maps namespace -> seconds an entry is fresh; `retention` maps
+    namespace -> seconds it is kept at all (for stale-while-revalidate reads).
+    Namespaces not listed use `default_ttl` and keep entries for their TTL.
+    """
+
+    def __init__(self, max_entries: int, default_ttl: float, ttls: dict = None, retention: dict = None,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.retention = dict(retention or {})
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (namespace, key) -> (stored_at, value), least recently used first
+        self._stats = {}
+
+    def ttl(self, namespace: str) -> float:
+        return self.ttls.get(namespace, self.default_ttl)
+
+    def set_ttl(self, namespace: str, seconds: float):
+        """Change how long a namespace's entries stay fresh (existing entries included)"""
+        with self._lock:
+            self.ttls[namespace] = seconds
+
+    def _retention(self, namespace: str) -> float:
+        return max(self.retention.get(namespace, 0), self.ttl(namespace))
+
+    def _count(self, namespace: str, counter: str):
+        stats = self._stats.setdefault(namespace, {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0})
+        stats[counter] += 1
+
+    def _lookup(self, namespace: str, key):
+        """(age, value) of a retained entry, or None; drops it if past retention. Caller holds the lock."""
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        age = self._clock() - entry[0]
+        if age >= self._retention(namespace):
+            del self._entries[(namespace, key)]
+            self._count(namespace, 'expirations')
+            return None
+        self._entries.move_to_end((namespace, key))
+        return age, entry[1]
+
+    def get(self, namespace: str, key, default=None):
+        """Value if it is younger than the namespace TTL, otherwise `default`"""
+        with self._lock:
+            found = self._lookup(namespace, key)
+            if found is not None and found[0] < self.ttl(namespace):
+                self._count(namespace, 'hits')
+                return found[1]
+            self._count(namespace, 'misses')
+            return default
+
+    def get_stale(self, namespace: str, key, max_age: float, default=None):
+        """Value if it is younger than `max_age` (used after get() missed), otherwise `default`"""
+        with self._lock:
+            found = self._lookup(namespace, key)
+            if found is not None and found[0] < max_age:
+                self._count(namespace, 'stale_hits')
+                return found[1]
+            return default
+
+    def peek(self, namespace: str, key):
+        """(age, value) of a retained entry without touching the counters, or None"""
+        with self._lock:
+            return self._lookup(namespace, key)
+
+    def set(self, namespace: str, key, value, age: float = 0.0):
+        """Store a value; `age` backdates entries that were produced earlier (e.g. by another worker)"""
+        with self._lock:
+            self._entries[(namespace, key)] = (self._clock() - max(age, 0.0), value)
+            self._entries.move_to_end((namespace, key))
+            if len(self._entries) > self.max_entries:
+                self._purge_expired()
+            while len(self._entries) > self.max_entries:
+                (evicted_namespace, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_namespace, 'evictions')
+
+    def _purge_expired(self):
+        now = self._clock()
+        for (namespace, key), (stored_at, _) in list(self._entries.items()):
+            if now - stored_at >= self._retention(namespace):
+                del self._entries[(namespace, key)]
+                self._count(namespace, 'expirations')
+
+    def delete(self, namespace: str, key):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Entry count and per-namespace hit/miss/eviction counters"""
+        with self._lock:
+            sizes = {}
+            for namespace, _ in self._entries:
+                sizes[namespace] = sizes.get(namespace, 0) + 1
+            namespaces = {
+                namespace: {**counters, 'entries': sizes.get(namespace, 0),
+                            'hit_rate': round(counters['hits'] / max(counters['hits'] + counters['misses'], 1), 3)}
+                for namespace, counters in self._stats.items()
+            }
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'namespaces': namespaces}
+
+
+# Request coalescing
+_lock = threading.Lock()
+_in_flight = {}  # key -> _Call currently refreshing it
+
+
+class _Call:
+    """One in-flight refresh; waiters block on `done`"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def single_flight(key: str, fn):
+    """
+    Run fn() unless a call for `key` is already in flight, in which case wait
+    for that call and return its result (or raise its exception).
+    """
+    with _lock:
+        call = _in_flight.get(key)
+        owner = call is None
+        if owner:
+            call = _in_flight[key] = _Call()
+
+    if not owner:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+        call.done.set()
+
+
+def in_flight(key: str) -> bool:
+    """True if a refresh for `key` is running"""
+    with _lock:
+        return key in _in_flight
+
+
+def refresh_in_background(key: str, fn) -> bool:
+    """Start a single-flight refresh of `key` in a daemon thread; False if one is already running"""
+    if in_flight(key):
+        return False
+
+    def run():
+        try:
+            single_flight(key, fn)
+        except Exception as e:
+            logger.error(f"✗ Background refresh failed for {key}: {e}")
+
+    threading.Thread(target=run, daemon=True, name=f"refresh-{key}").start()
+    return True
@@ -0,0 +1,136 @@
+"""
+Columnar option chain.
+
+One row per strike, with a NumPy structured array per side (CE and PE)
+holding parallel ltp/oi/iv/volume/bid/ask/token columns. Builders fill the
+columns directly from quotes or ticks, the live stream updates rows in place,
+and the Greeks engine, IV solver and signal evaluator work on whole columns
+without walking per-strike dicts.
+
+Chain-level metadata (ltp, atm_strike, expiry, data_source, version, ...)
+are plain attributes. to_dict() renders the legacy nested form
+({'strikes': [{'strike', 'ce': {...}, 'pe': {...}}], ...}) for serializers.
+"""
+import numpy as np
+
+OPTION_DTYPE = np.dtype([
+    ('ltp', 'f8'),
+    ('oi', 'i8'),
+    ('iv', 'f8'),
+    ('volume', 'i8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('token', 'i8'),  # Kite instrument token, 0 if unknown
+])
+OPTION_FIELDS = OPTION_DTYPE.names
+SIDES = ('ce', 'pe')
+
+
+def _plain_strike(strike):
+    """Integral strikes as int, matching the API contract"""
+    strike = float(strike)
+    return int(strike) if strike.is_integer() else strike
+
+
+class OptionChain:
+    """Array-backed option chain for one underlying and expiry"""
+
+    __slots__ = (
+        'symbol', 'strikes', 'ce', 'pe', 'ltp', 'atm_strike', 'expiry', 'lot_size',
+        'data_source', 'version', 'time_to_expiry',
+    )
+
+    def __init__(self, symbol: str, strikes, ltp: float = 0.0, atm_strike=None, expiry: str = None,
+                 lot_size: int = None, data_source: str = None, version=None, time_to_expiry: float = None):
+        self.symbol = symbol
+        self.strikes = np.asarray(strikes, dtype=float)
+        self.ce = np.zeros(len(self.strikes), dtype=OPTION_DTYPE)
+        self.pe = np.zeros(len(self.strikes), dtype=OPTION_DTYPE)
+        self.ltp = ltp
+        self.atm_strike = atm_strike
+        self.expiry = expiry
+        self.lot_size = lot_size
+        self.data_source = data_source
+        self.version = version
+        self.time_to_expiry = time_to_expiry
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def __repr__(self):
+        return f"OptionChain({self.symbol}, {len(self)} strikes, ltp={self.ltp}, atm={self.atm_strike}, {self.data_source})"
+
+    def side(self, option_type: str) -> np.ndarray:
+        """Structured array for 'CE'/'ce' or 'PE'/'pe'"""
+        return self.ce if option_type.lower() == 'ce' else self.pe
+
+    def column(self, option_type: str, field: str) -> np.ndarray:
+        """One column (a view, not a copy) of one side"""
+        return self.side(option_type)[field]
+
+    def interleaved(self, field: str) -> np.ndarray:
+        """Column over both sides in evaluation order: strike by strike, CE before PE"""
+        return np.column_stack((self.ce[field], self.pe[field])).ravel()
+
+    def option(self, row: int, option_type: str) -> dict:
+        """Plain dict of one option's fields"""
+        record = self.side(option_type)[row]
+        return {field: record[field].item() for field in OPTION_FIELDS}
+
+    def row_of(self, strike) -> int:
+        """Row index of a strike, or -1"""
+        i = int(np.searchsorted(self.strikes, strike))
+        return i if i < len(self.strikes) and self.strikes[i] == strike else -1
+
+    def _with_rows(self, rows) -> 'OptionChain':
+        chain = OptionChain(
+            self.symbol, self.strikes[rows], self.ltp, self.atm_strike, self.expiry, self.lot_size,
+            self.data_source, self.version, self.time_to_expiry,
+        )
+        chain.ce = self.ce[rows].copy()
+        chain.pe = self.pe[rows].copy()
+        return chain
+
+    def copy(self) -> 'OptionChain':
+        return self._with_rows(slice(None))
+
+    def window(self, low: float, high: float) -> 'OptionChain':
+        """Copy of the rows with low <= strike <= high"""
+        start = int(np.searchsorted(self.strikes, low, side='left'))
+        stop = int(np.searchsorted(self.strikes, high, side='right'))
+        return self._with_rows(slice(start, stop))
+
+    def to_dict(self) -> dict:
+        """Legacy nested representation"""
+        return {
+            'strikes': [
+                {
+                    'strike': _plain_strike(strike),
+                    'ce': self.option(row, 'ce'),
+                    'pe': self.option(row, 'pe'),
+                }
+                for row, strike in enumerate(self.strikes.tolist())
+            ],
+            'ltp': self.ltp,
+            'atm_strike': self.atm_strike,
+            'expiry': self.expiry,
+            'lot_size': self.lot_size,
+            'data_source': self.data_source,
+            'version': self.version,
+            'time_to_expiry': self.time_to_expiry,
+        }
+
+    @classmethod
+    def from_dict(cls, symbol: str, data: dict) -> 'OptionChain':
+        """Build from the legacy nested representation"""
+        rows = sorted(data.get('strikes', []), key=lambda row: row['strike'])
+        chain = cls(
+            symbol, [row['strike'] for row in rows], data.get('ltp', 0.0), data.get('atm_strike'),
+            data.get('expiry'), data.get('lot_size'), data.get('data_source'), data.get('version'),
+            data.get('time_to_expiry'),
+        )
+        for side in SIDES:
+            target = chain.side(side)
+            for field in OPTION_FIELDS:
+                target[field] = [row.get(side, {}).get(field) or 0 for row in rows]
+        return chain
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +10,8 @@ ZERODHA_API_SECRET = os.getenv('ZERODHA_API_SECRET', '9qlzwmum5f7pami0gacyxc7uxa
 ZERODHA_USERNAME = os.getenv('ZERODHA_USERNAME', '')
 ZERODHA_PASSWORD = os.getenv('ZERODHA_PASSWORD', '')
 REDIRECT_URL = os.getenv('REDIRECT_URL', 'http://127.0.0.1:8000/auth/callback')
+KITE_ROOT_URL = os.getenv('KITE_ROOT_URL') or None      # Kite REST root; point at kite_simulator.py for offline load tests
+KITE_TICKER_URL = os.getenv('KITE_TICKER_URL') or None  # Kite ticker WebSocket root (default wss://ws.kite.trade)
 
 # Signal thresholds for STRONG BUY (all must match)
 DEFAULT_THRESHOLDS = {
@@ -21,26 +24,144 @@ DEFAULT_THRESHOLDS = {
     'confidence_min': 0.80,   # Minimum confidence for STRONG BUY (80%)
 }
 
+# Black-Scholes inputs
+RISK_FREE_RATE = 0.05          # Risk-free rate (5%)
+DEFAULT_TIME_TO_EXPIRY = 0.038  # Years (≈ 10 trading days) when the chain carries no expiry
+
 # Symbol mappings - Zerodha instrument tokens
 SYMBOL_MAPPING = {
     'NIFTY': {
-        'token': '99926009',
+        'token': 256265,                  # Kite instrument token for NIFTY 50
         'strike_base': 20000,
         'expiry': 'current',
+        'quote_symbol': 'NSE:NIFTY 50',   # Underlying index as Kite quotes it
+        'exchange': 'NFO',                # Exchange the options trade on
+        'strike_interval': 50,
     },
     'BANKNIFTY': {
-        'token': '99926037',
+        'token': 260105,                  # NIFTY BANK
         'strike_base': 45000,
         'expiry': 'current',
+        'quote_symbol': 'NSE:NIFTY BANK',
+        'exchange': 'NFO',
+        'strike_interval': 100,
     },
     'SENSEX': {
-        'token': '99926000',
+        'token': 265,                     # SENSEX
         'strike_base': 70000,
         'expiry': 'current',
+        'quote_symbol': 'BSE:SENSEX',
+        'exchange': 'BFO',
+        'strike_interval': 100,
     },
 }
 
+# Option chain window
+OPTION_CHAIN_STRIKES_EACH_SIDE = int(os.getenv('OPTION_CHAIN_STRIKES_EACH_SIDE', '5'))  # ATM ± N strikes
+KITE_QUOTE_BATCH_LIMIT = 500  # Max instruments Kite accepts in one quote call
+
+# Persisted Zerodha session shared by all workers (see session_store.py)
+SESSION_FILE = os.getenv('SESSION_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'session.json'))
+SESSION_SYNC_INTERVAL = 2  # Seconds between checks for a login made by another worker
+
+# Instrument master (see instruments.py)
+INSTRUMENTS_DIR = os.getenv('INSTRUMENTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'instruments'))
+INSTRUMENTS_DOWNLOAD_TIMEOUT = float(os.getenv('INSTRUMENTS_DOWNLOAD_TIMEOUT', '60'))  # Seconds for one exchange's master download and CSV parse
+INSTRUMENTS_DOWNLOAD_RETRIES = 1  # Each retry is another full download, so keep this low
+
+# Streaming (see market_stream.py)
+STREAM_ENABLED = os.getenv('STREAM_ENABLED', 'true').lower() == 'true'
+STREAM_MAX_AGE = float(os.getenv('STREAM_MAX_AGE', '3'))  # Seconds a streamed snapshot stays valid without an index tick
+
+# Tick and chain recorder (see recorder.py)
+RECORDER_ENABLED = os.getenv('RECORDER_ENABLED', 'false').lower() == 'true'
+RECORDER_DIR = os.getenv('RECORDER_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'recordings'))
+RECORDER_QUEUE_SIZE = int(os.getenv('RECORDER_QUEUE_SIZE', '100000'))  # Pending events before new ones are dropped
+RECORDER_FLUSH_INTERVAL = 1.0  # Seconds the writer waits for events before flushing
+
 # Cache settings
 CACHE_DURATION = 5  # seconds
-PRICE_CACHE = {}
-OPTION_CHAIN_CACHE = {}
+CACHE_STALE_WHILE_REVALIDATE = os.getenv('CACHE_STALE_WHILE_REVALIDATE', 'true').lower() == 'true'  # Serve the last snapshot while one refresh runs
+CACHE_MAX_STALENESS = float(os.getenv('CACHE_MAX_STALENESS', '30'))  # Seconds after which a snapshot is never served
+
+# Market-hours-aware refresh (see market_hours.py)
+MARKET_HOURS_ENABLED = os.getenv('MARKET_HOURS_ENABLED', 'true').lower() == 'true'  # false: always treat the market as open (simulator, benchmarks)
+REFRESH_BASE_INTERVAL = float(os.getenv('REFRESH_BASE_INTERVAL', str(CACHE_DURATION)))  # In-session seconds at reference volatility, away from expiry
+REFRESH_MIN_INTERVAL = float(os.getenv('REFRESH_MIN_INTERVAL', '1'))     # Fastest in-session refresh (mind the 1 quote/s limit)
+REFRESH_MAX_INTERVAL = 10.0       # Slowest in-session refresh
+REFRESH_PRE_OPEN_INTERVAL = 10.0  # Seconds between refreshes in the 09:00-09:15 pre-open auction
+REFRESH_POST_CLOSE_INTERVAL = 30.0  # Seconds between refreshes in the 15:30-16:00 closing/post-close session
+REFRESH_CLOSED_INTERVAL = 60.0    # Seconds between session checks while closed (no Kite calls)
+REFRESH_REFERENCE_VOL = 0.15      # Annualized realized volatility at which the base interval applies
+REALIZED_VOL_WINDOW = 300         # Seconds of LTP samples behind the realized volatility estimate
+MARKET_HOLIDAYS = os.getenv('MARKET_HOLIDAYS', '')  # Extra closed days, comma-separated YYYY-MM-DD
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshots'))  # Frozen last-close chains
+
+# Cross-worker market-data cache (see shared_cache.py): 'local', 'shm' or 'redis'
+MARKET_CACHE_BACKEND = os.getenv('MARKET_CACHE_BACKEND', 'local')
+SHARED_CACHE_DIR = os.getenv('SHARED_CACHE_DIR', '/dev/shm/market-signals' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'market-signals'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+SHARED_CACHE_MAX_STALENESS = 30  # seconds a follower keeps serving a live fetcher's snapshot
+
+# In-process market-data cache (see cache.TTLCache)
+CACHE_TTLS = {                  # Seconds an entry stays fresh, per namespace
+    'ltp': CACHE_DURATION,
+    'option_chain': CACHE_DURATION,
+}
+MARKET_CACHE_MAX_ENTRIES = int(os.getenv('MARKET_CACHE_MAX_ENTRIES', '512'))  # LRU bound across all namespaces
+
+# Kite I/O settings (see kite_io.py)
+KITE_MAX_CONCURRENCY = int(os.getenv('KITE_MAX_CONCURRENCY', '8'))  # Max in-flight Kite REST calls per worker
+KITE_CALL_TIMEOUT = float(os.getenv('KITE_CALL_TIMEOUT', '3'))      # Seconds before a single Kite call is abandoned
+KITE_CONNECT_TIMEOUT = float(os.getenv('KITE_CONNECT_TIMEOUT', '1'))  # Seconds to open a connection to Kite
+KITE_READ_TIMEOUT = float(os.getenv('KITE_READ_TIMEOUT', str(KITE_CALL_TIMEOUT)))  # Seconds to wait for Kite's response
+KITE_POOL_SIZE = int(os.getenv('KITE_POOL_SIZE', str(KITE_MAX_CONCURRENCY)))  # Keep-alive connections to Kite per worker
+SIGNAL_WORKERS = int(os.getenv('SIGNAL_WORKERS', '4'))              # Threads running the signal path off the event loop
+SIGNAL_TIMEOUT = float(os.getenv('SIGNAL_TIMEOUT', '10'))           # Seconds before a whole signal request gives up
+
+# Kite request scheduler (see kite_scheduler.py); Kite's limits apply per API key
+KITE_QUOTE_RATE = float(os.getenv('KITE_QUOTE_RATE', '1'))        # Quote calls per second (0 = unlimited)
+KITE_API_RATE = float(os.getenv('KITE_API_RATE', '10'))           # Other REST calls per second (0 = unlimited)
+KITE_MAX_RETRIES = int(os.getenv('KITE_MAX_RETRIES', '3'))        # Retries after a 429, timeout or network error
+KITE_RETRY_BASE_DELAY = 0.5     # Seconds; backoff doubles per attempt, jittered
+KITE_RETRY_MAX_DELAY = 8.0      # Seconds; cap on a single backoff
+KITE_QUOTE_COALESCE = float(os.getenv('KITE_QUOTE_COALESCE', '0.02'))  # Seconds the dispatcher waits for more callers before a batch
+KITE_QUOTE_WAIT = float(os.getenv('KITE_QUOTE_WAIT', '8'))        # Seconds a caller waits for its quotes, retries included
+
+# Startup warm-up (see main.py): /health answers 503 until it has run
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', '30'))  # Seconds before the worker reports healthy regardless
+
+# Signal precomputation (see precompute.py)
+PRECOMPUTE_INTERVAL = float(os.getenv('PRECOMPUTE_INTERVAL', '0.5'))  # Seconds between snapshot checks per symbol
+PRECOMPUTE_MAX_AGE = 2.0             # Seconds a checked snapshot is served without re-checking the chain
+PRECOMPUTE_MAX_THRESHOLD_SETS = 64   # Memoized threshold sets per snapshot (LRU)
+
+# IV reuse (see implied_vol.solve_chain): an unchanged option price is re-solved once spot/time drift past these
+IV_REUSE_SPOT_TOLERANCE = 0.0005  # Relative spot move (0.05%)
+IV_REUSE_TIME_TOLERANCE = 60      # Seconds of time to expiry
+
+# Server-push signal stream (see signal_stream.py)
+SIGNAL_PUSH_INTERVAL = float(os.getenv('SIGNAL_PUSH_INTERVAL', '1'))  # Seconds between recomputes of a watched symbol
+SIGNAL_STREAM_QUEUE_SIZE = 8      # Pending updates per client before the oldest is dropped
+SIGNAL_STREAM_HEARTBEAT = 15      # Seconds of silence before a keepalive is sent
+DASHBOARD_THRESHOLDS = {          # /api/signal query defaults, used for pushed signals
+    'vega_min': 0.3,
+    'gamma_min': 0.05,
+    'theta_min': -0.5,
+    'iv_call_oi_min': 5000,
+    'confidence_min': 0.6,
+}
+
+# Named threshold profiles for /api/signals/screen (missing thresholds take DEFAULT_THRESHOLDS)
+THRESHOLD_PROFILES = {
+    'default': DEFAULT_THRESHOLDS,
+    'dashboard': DASHBOARD_THRESHOLDS,
+    'conservative': {'iv_call_oi_min': 100000, 'iv_min': 0.18, 'confidence_min': 0.9},
+    'aggressive': {'delta_min': 0.25, 'iv_call_oi_min': 10000, 'iv_min': 0.12, 'confidence_min': 0.6},
+}
+SCREEN_MAX_PROFILES = 32  # Profiles accepted by one screening request
+
+# Prometheus metrics at /metrics (see metrics.py)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_LOOP_LAG_INTERVAL = 0.5  # Seconds between event-loop lag probes
@@ -0,0 +1,193 @@
+"""
+Vectorized implied-volatility solver.
+
+Inverts Black-Scholes for a whole chain at once with a bracketed Newton
+method: each iteration takes a Newton step and falls back to bisection when
+the step leaves the bracket, so every row converges. Cold starts use the
+Corrado-Miller rational approximation; steady-state solves are warm-started
+from each instrument's previous IV. A row whose price has not moved is
+accepted after one price evaluation, without a Newton step; a row that moved
+by a tick or two typically needs two to four iterations (see
+benchmarks/bench_iv.py). solve_chain goes further for successive snapshots of
+one chain and only solves the rows whose inputs changed.
+"""
+import threading
+import numpy as np
+from config import RISK_FREE_RATE, IV_REUSE_SPOT_TOLERANCE, IV_REUSE_TIME_TOLERANCE
+from greeks import norm_cdf, norm_pdf
+
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+PRICE_TOLERANCE = 1e-4  # Absolute price error accepted as converged
+IV_TOLERANCE = 1e-5     # IV step small enough to stop (deep ITM rows where vega ~ 0)
+MIN_TIME_VALUE = 0.05  # One tick: below this the price carries no volatility information
+MAX_ITERATIONS = 50
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+_lock = threading.Lock()
+_solved = {}  # symbol -> (expiry, row codes, price, IV, spot, time to expiry) of each option's last solve, sorted by code
+
+
+def option_price(ltp, bid, ask) -> np.ndarray:
+    """Bid/ask mid where both sides are quoted and not crossed, otherwise LTP"""
+    ltp, bid, ask = (np.asarray(x, dtype=float) for x in (ltp, bid, ask))
+    quoted = (bid > 0) & (ask >= bid)
+    return np.where(quoted, 0.5 * (bid + ask), ltp)
+
+
+def _initial_guess(price, s, k, t, is_call, r):
+    """Corrado-Miller approximation, computed on the equivalent call price"""
+    discounted_k = k * np.exp(-r * t)
+    call = np.where(is_call, price, price + s - discounted_k)
+    moneyness = s - discounted_k
+    half = call - 0.5 * moneyness
+    root = np.sqrt(np.maximum(half * half - moneyness * moneyness / np.pi, 0.0))
+    guess = np.sqrt(2.0 * np.pi / t) / (s + discounted_k) * (half + root)
+    return np.clip(np.nan_to_num(guess, nan=0.3), 0.01, 3.0)
+
+
+def implied_volatility(price, spot, strike, time_to_expiry, is_call, initial=None,
+                       r: float = RISK_FREE_RATE, return_iterations: bool = False):
+    """
+    Implied volatility for arrays of option prices (inputs broadcast together).
+    `initial` optionally warm-starts rows with a previous IV (non-positive or
+    NaN entries use the rational guess). Rows whose price is outside the
+    no-arbitrage bounds (or within a tick of intrinsic value), or with
+    non-positive inputs, return NaN.
+    """
+    # Scalars (usually spot and time) stay scalars, which keeps every array op cheap
+    p, s, k, t = (np.asarray(x, dtype=float) for x in (price, spot, strike, time_to_expiry))
+    c = np.asarray(is_call, dtype=bool)
+    shape = np.broadcast_shapes(p.shape, s.shape, k.shape, t.shape, c.shape)
+    iterations = 0
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Loop invariants; puts are priced from the call via put-call parity
+        rt = r * t
+        discounted_k = k * np.exp(-rt)
+        parity = np.where(c, 0.0, discounted_k - s)
+        forward_intrinsic = s - discounted_k
+        floor = np.maximum(np.where(c, forward_intrinsic, -forward_intrinsic), 0.0)
+        upper = np.where(c, s, discounted_k)
+        active = np.broadcast_to(
+            (p - floor >= MIN_TIME_VALUE) & (p < upper) & (s > 0) & (k > 0) & (t > 0), shape
+        ).copy()
+        valid = active.copy()
+
+        sigma = None
+        if initial is not None:
+            warm = np.broadcast_to(np.asarray(initial, dtype=float), shape)
+            use_warm = (warm > IV_LOWER) & (warm < IV_UPPER)
+            if use_warm[valid].all():
+                sigma = warm.copy()
+        if sigma is None:
+            sigma = np.broadcast_to(_initial_guess(p, s, k, t, c, r), shape).copy()
+            if initial is not None:
+                sigma = np.where(use_warm, warm, sigma)
+        lo = np.full(shape, IV_LOWER)
+        hi = np.full(shape, IV_UPPER)
+
+        log_sk = np.log(s / k)
+        sqrt_t = np.sqrt(t)
+        log_target = np.log(p - floor)
+
+        while active.any() and iterations < MAX_ITERATIONS:
+            iterations += 1
+            vol_sqrt_t = sigma * sqrt_t
+            d1 = (log_sk + rt) / vol_sqrt_t + 0.5 * vol_sqrt_t
+            diff = s * norm_cdf(d1) - discounted_k * norm_cdf(d1 - vol_sqrt_t) + parity - p
+            active &= (np.abs(diff) >= PRICE_TOLERANCE) & (hi - lo > 1e-10)
+            if not active.any():
+                break  # e.g. a warm start whose prices have not moved
+
+            # Price is increasing in sigma, so the sign of the error tightens the bracket
+            above = diff > 0
+            hi = np.where(active & above, sigma, hi)
+            lo = np.where(active & ~above, sigma, lo)
+
+            # Newton on the log of time value: near-linear in sigma even in the wings,
+            # where plain Newton on price crawls
+            time_value = diff + p - floor
+            step = sigma - (np.log(time_value) - log_target) * time_value / (s * norm_pdf(d1) * sqrt_t)
+            inside = (step > lo) & (step < hi)
+            new_sigma = np.where(active, np.where(inside, step, 0.5 * (lo + hi)), sigma)
+            active &= np.abs(new_sigma - sigma) >= IV_TOLERANCE
+            sigma = new_sigma
+
+    iv = np.where(valid, sigma, np.nan)
+    return (iv, iterations) if return_iterations else iv
+
+
+def _row_codes(strike, is_call) -> np.ndarray:
+    """One number per option of a symbol's expiry: twice the strike, plus one for puts"""
+    return np.asarray(strike, dtype=float) * 2.0 + np.where(is_call, 0.0, 1.0)
+
+
+def solve_chain(symbol: str, expiry, price, spot, strike, time_to_expiry, is_call,
+                spot_tolerance: float = IV_REUSE_SPOT_TOLERANCE,
+                time_tolerance: float = IV_REUSE_TIME_TOLERANCE) -> np.ndarray:
+    """
+    IVs for a chain, solving only the rows that need it. A row keeps its
+    previous IV while its price is unchanged and spot and time to expiry are
+    within `spot_tolerance` (relative) and `time_tolerance` (seconds) of the
+    values it was solved at; every other row is solved, warm-started from its
+    previous IV. A spot-only tick therefore solves nothing, and a tick on one
+    option solves one row. State is kept per symbol for one expiry only, so it
+    is bounded by that expiry's listed strikes; when the expiry rolls over it
+    starts again cold.
+    """
+    price = np.asarray(price, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    codes = _row_codes(strike, is_call)
+    with _lock:
+        state = _solved.get(symbol)
+    if state is None or state[0] != expiry:
+        state = (expiry,) + tuple(np.empty(0) for _ in range(5))
+    _, known, solved_price, solved_iv, solved_spot, solved_time = state
+
+    if len(known):
+        at = np.minimum(np.searchsorted(known, codes), len(known) - 1)
+        found = known[at] == codes
+        iv = np.where(found, solved_iv[at], np.nan)
+        clean = (
+            found
+            & (solved_price[at] == price)
+            & (np.abs(spot / solved_spot[at] - 1.0) <= spot_tolerance)
+            & (np.abs(time_to_expiry - solved_time[at]) * SECONDS_PER_YEAR <= time_tolerance)
+        )
+        dirty = np.flatnonzero(~clean)
+    else:
+        iv = np.full(len(codes), np.nan)
+        dirty = np.arange(len(codes))
+    if not len(dirty):
+        return iv
+    iv[dirty] = implied_volatility(price[dirty], spot, strike[dirty], time_to_expiry, is_call[dirty], initial=iv[dirty])
+
+    with _lock:
+        current = _solved.get(symbol)
+        if current is not None and current[0] == expiry:
+            _, known, solved_price, solved_iv, solved_spot, solved_time = current
+        else:
+            known, solved_price, solved_iv, solved_spot, solved_time = (np.empty(0) for _ in range(5))
+        # Copy on write: concurrent solves of the same symbol may still be reading the old arrays
+        rows = np.concatenate([np.flatnonzero(~np.isin(known, codes[dirty])), len(known) + dirty])
+        known, solved_price, solved_iv, solved_spot, solved_time = (
+            np.concatenate([old, new])[rows]
+            for old, new in ((known, codes), (solved_price, price), (solved_iv, iv),
+                             (solved_spot, np.full(len(codes), float(spot))),
+                             (solved_time, np.full(len(codes), float(time_to_expiry))))
+        )
+        order = np.argsort(known, kind='stable')
+        _solved[symbol] = (expiry, known[order], solved_price[order], solved_iv[order],
+                           solved_spot[order], solved_time[order])
+    return iv
+
+
+def forget(symbol: str = None):
+    """Drop warm-start state (all of it, or one symbol's)"""
+    with _lock:
+        if symbol is None:
+            _solved.clear()
+        else:
+            _solved.pop(symbol, None)
@@ -0,0 +1,260 @@
+"""
+Daily instrument-master index.
+
+Downloads kite.instruments() for the exchanges our symbols trade on once per
+trading day, keeps only the rows we use (index options and the underlying
+indices) and persists them as a compact pickle. On restart the index loads
+from disk in milliseconds without touching the network.
+
+Lookups are keyed by (underlying, expiry, strike, CE/PE) and return the
+instrument token, tradingsymbol, exchange and lot size.
+"""
+import bisect
+import glob
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
+from config import SYMBOL_MAPPING, INSTRUMENTS_DIR, INSTRUMENTS_DOWNLOAD_TIMEOUT, INSTRUMENTS_DOWNLOAD_RETRIES
+import kite_scheduler
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo('Asia/Kolkata')
+
+Instrument = namedtuple('Instrument', ['token', 'tradingsymbol', 'exchange', 'lot_size'])
+
+_lock = threading.Lock()
+_index = None
+_last_download_attempt = 0.0
+_downloading = False  # one download at a time, without holding _lock
+_downloaded = threading.Event()  # set whenever no download is in flight
+_downloaded.set()
+DOWNLOAD_RETRY_INTERVAL = 300  # seconds between failed download retries
+EXPIRY_CUTOFF = dt_time(15, 30)  # expiring contracts stop trading at the close
+
+
+def live_expiry_from(moment: datetime) -> date:
+    """Earliest expiry date still trading at `moment`: today until the close, then tomorrow"""
+    local = moment.astimezone(IST)
+    return local.date() if local.time() < EXPIRY_CUTOFF else local.date() + timedelta(days=1)
+
+
+def _ist_today() -> date:
+    return datetime.now(IST).date()
+
+
+class InstrumentIndex:
+    """In-memory index over one day's instrument master"""
+
+    def __init__(self, rows: list, trading_day: date):
+        self.trading_day = trading_day
+        self._options = {}
+        self._underlyings = {}
+        self._lot_size = {}
+        expiries = {}
+        strikes = {}
+
+        for name, expiry, strike, option_type, token, tradingsymbol, exchange, lot_size in rows:
+            instrument = Instrument(token, tradingsymbol, exchange, lot_size)
+            if option_type is None:
+                self._underlyings[name] = instrument
+                continue
+            self._options[(name, expiry, strike, option_type)] = instrument
+            self._lot_size[name] = lot_size
+            expiries.setdefault(name, set()).add(expiry)
+            strikes.setdefault((name, expiry), set()).add(strike)
+
+        self._expiries = {name: sorted(values) for name, values in expiries.items()}
+        self._strikes = {key: sorted(values) for key, values in strikes.items()}
+
+    def __len__(self):
+        return len(self._options)
+
+    def lookup(self, name: str, expiry: date, strike: float, option_type: str):
+        """Instrument for an option contract, or None if it does not exist"""
+        return self._options.get((name, expiry, strike, option_type))
+
+    def underlying(self, name: str):
+        """Instrument for the underlying index, or None"""
+        return self._underlyings.get(name)
+
+    def nearest_expiry(self, name: str, moment: datetime = None):
+        """Nearest expiry still trading at `moment` (default now); a contract expires at the 15:30 IST close"""
+        expiries = self._expiries.get(name, [])
+        i = bisect.bisect_left(expiries, live_expiry_from(moment or datetime.now(IST)))
+        return expiries[i] if i < len(expiries) else None
+
+    def expiries(self, name: str) -> list:
+        return self._expiries.get(name, [])
+
+    def strike_grid(self, name: str, expiry: date) -> list:
+        """Sorted list of listed strikes for an expiry"""
+        return self._strikes.get((name, expiry), [])
+
+    def lot_size(self, name: str):
+        return self._lot_size.get(name)
+
+    def strike_window(self, name: str, expiry: date, ltp: float, strikes_each_side: int):
+        """ATM strike and the ATM ± N listed strikes around an LTP"""
+        grid = self.strike_grid(name, expiry)
+        if not grid:
+            return None, []
+        i = bisect.bisect_left(grid, ltp)
+        if i == len(grid) or (i > 0 and ltp - grid[i - 1] <= grid[i] - ltp):
+            i -= 1
+        return grid[i], grid[max(0, i - strikes_each_side):i + strikes_each_side + 1]
+
+
+def _wanted_exchanges() -> list:
+    """Option exchanges plus the exchanges quoting the underlying indices"""
+    exchanges = set()
+    for mapping in SYMBOL_MAPPING.values():
+        exchanges.add(mapping.get('exchange', 'NFO'))
+        exchanges.add(mapping.get('quote_symbol', 'NSE:').split(':')[0])
+    return sorted(exchanges)
+
+
+def _normalize_strike(strike):
+    """Integral strikes are stored as int so they serialize as the API contract expects"""
+    strike = float(strike)
+    return int(strike) if strike.is_integer() else strike
+
+
+def _compact_rows(instruments: list) -> list:
+    """Keep only options on our underlyings and the underlying index rows, as plain tuples"""
+    names = set(SYMBOL_MAPPING)
+    underlyings = {
+        tuple(m['quote_symbol'].split(':', 1)): symbol
+        for symbol, m in SYMBOL_MAPPING.items() if m.get('quote_symbol')
+    }
+    rows = []
+    for inst in instruments:
+        option_type = inst.get('instrument_type')
+        if option_type in ('CE', 'PE') and inst.get('name') in names:
+            rows.append((
+                inst['name'], inst['expiry'], _normalize_strike(inst['strike']), option_type,
+                int(inst['instrument_token']), inst['tradingsymbol'], inst['exchange'], int(inst['lot_size']),
+            ))
+            continue
+        symbol = underlyings.get((inst.get('exchange'), inst.get('tradingsymbol')))
+        if symbol:
+            rows.append((
+                symbol, None, None, None,
+                int(inst['instrument_token']), inst['tradingsymbol'], inst['exchange'], int(inst.get('lot_size') or 1),
+            ))
+    return rows
+
+
+def _path_for(trading_day: date) -> str:
+    return os.path.join(INSTRUMENTS_DIR, f"instruments-{trading_day.isoformat()}.pkl")
+
+
+def _save(rows: list, trading_day: date):
+    os.makedirs(INSTRUMENTS_DIR, exist_ok=True)
+    path = _path_for(trading_day)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    # Only the latest day is ever needed
+    for old in glob.glob(os.path.join(INSTRUMENTS_DIR, 'instruments-*.pkl')):
+        if old != path:
+            os.remove(old)
+
+
+def _load_latest_from_disk():
+    """(rows, trading_day) of the most recent saved master, or (None, None)"""
+    files = sorted(glob.glob(os.path.join(INSTRUMENTS_DIR, 'instruments-*.pkl')))
+    if not files:
+        return None, None
+    path = files[-1]
+    trading_day = date.fromisoformat(os.path.basename(path)[len('instruments-'):-len('.pkl')])
+    with open(path, 'rb') as f:
+        return pickle.load(f), trading_day
+
+
+def load_from_disk():
+    """Load the most recent saved master without network access"""
+    global _index
+    try:
+        start = time.perf_counter()
+        rows, trading_day = _load_latest_from_disk()
+        if rows is None:
+            return None
+        index = InstrumentIndex(rows, trading_day)
+        with _lock:
+            _index = index
+        logger.info(f"✓ Loaded {len(index)} instruments for {trading_day} in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return index
+    except Exception as e:
+        logger.error(f"✗ Could not load instrument master from disk: {e}")
+        return None
+
+
+def ensure_instruments(kite_client):
+    """
+    Return today's index, downloading the master from Kite at most once per
+    trading day. One caller downloads, outside the lock; meanwhile the others
+    get the index already loaded (possibly a previous day's) straight away,
+    and only wait for the download when there is none at all (a cold start).
+    Falls back to the last saved master if the download fails.
+    """
+    global _index, _last_download_attempt, _downloading
+    today = _ist_today()
+    if _index is not None and _index.trading_day == today:
+        return _index
+
+    with _lock:
+        if _index is not None and _index.trading_day == today:
+            return _index
+        if os.path.exists(_path_for(today)):
+            rows, _ = _load_latest_from_disk()
+            _index = InstrumentIndex(rows, today)
+            return _index
+        download = (
+            kite_client is not None and not _downloading
+            and time.time() - _last_download_attempt >= DOWNLOAD_RETRY_INTERVAL
+        )
+        if download:
+            _downloading = True
+            _downloaded.clear()
+            _last_download_attempt = time.time()
+
+    if download:
+        try:
+            start = time.perf_counter()
+            rows = []
+            for exchange in _wanted_exchanges():
+                # A bulk download: the short per-call timeout would abandon it mid-parse
+                # and every retry would start another one in the kite-io pool
+                rows += _compact_rows(kite_scheduler.call(
+                    kite_client.instruments, exchange,
+                    timeout=INSTRUMENTS_DOWNLOAD_TIMEOUT, retries=INSTRUMENTS_DOWNLOAD_RETRIES,
+                ))
+            _save(rows, today)
+            index = InstrumentIndex(rows, today)
+            with _lock:
+                _index = index
+            logger.info(f"✓ Downloaded instrument master: {len(index)} options in {time.perf_counter() - start:.1f}s")
+            return index
+        except Exception as e:
+            logger.error(f"✗ Failed to download instrument master: {e}")
+        finally:
+            _downloading = False
+            _downloaded.set()
+
+    index = _index or load_from_disk()
+    if index is None and _downloading:
+        _downloaded.wait(INSTRUMENTS_DOWNLOAD_TIMEOUT * (INSTRUMENTS_DOWNLOAD_RETRIES + 1) * len(_wanted_exchanges()))
+        index = _index
+    return index
+
+
+def get_index():
+    """Currently loaded index (may be from a previous day), or None"""
+    return _index
@@ -0,0 +1,59 @@
+"""
+Non-blocking access layer for the Kite REST client.
+
+KiteConnect is a synchronous, requests-based client. Every Kite call goes
+through a bounded I/O thread pool with a per-call timeout, and the async API
+handlers offload the whole signal path to a separate pool, so a slow Zerodha
+round-trip never stalls the event loop (or /health).
+"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from config import KITE_MAX_CONCURRENCY, KITE_CALL_TIMEOUT, SIGNAL_WORKERS, SIGNAL_TIMEOUT
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Kite calls and signal computation use separate pools: signal threads block
+# waiting on Kite threads, so sharing one pool could deadlock under load.
+_kite_pool = ThreadPoolExecutor(max_workers=KITE_MAX_CONCURRENCY, thread_name_prefix="kite-io")
+_signal_pool = ThreadPoolExecutor(max_workers=SIGNAL_WORKERS, thread_name_prefix="signal")
+
+
+class KiteTimeoutError(Exception):
+    """Raised when a Kite call does not complete within its timeout"""
+
+
+def kite_call(method, *args, timeout: float = KITE_CALL_TIMEOUT, **kwargs):
+    """Run a blocking Kite method on the I/O pool, waiting at most `timeout` seconds"""
+    name = getattr(method, '__name__', repr(method))
+    start = time.perf_counter()
+    future = _kite_pool.submit(method, *args, **kwargs)
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        metrics.KITE_SECONDS.observe(time.perf_counter() - start, name, 'timeout')
+        logger.warning(f"✗ Kite call {name} timed out after {timeout}s")
+        raise KiteTimeoutError(f"Kite call {name} timed out after {timeout}s")
+    except Exception as e:
+        outcome = 'rate_limited' if getattr(e, 'code', None) == 429 else 'error'
+        metrics.KITE_SECONDS.observe(time.perf_counter() - start, name, outcome)
+        raise
+    metrics.KITE_SECONDS.observe(time.perf_counter() - start, name, 'ok')
+    return result
+
+
+async def run_blocking(fn, *args, timeout: float = SIGNAL_TIMEOUT, **kwargs):
+    """Await a blocking function on the signal pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    return await asyncio.wait_for(loop.run_in_executor(_signal_pool, call), timeout=timeout)
+
+
+def shutdown():
+    """Stop accepting new work and release pool threads"""
+    _kite_pool.shutdown(wait=False, cancel_futures=True)
+    _signal_pool.shutdown(wait=False, cancel_futures=True)
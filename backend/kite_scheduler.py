@@ -0,0 +1,290 @@
+"""
+Rate-limited scheduler that owns all Kite REST traffic.
+
+Kite allows 1 quote call per second and 10 per second for the other REST
+endpoints, per API key, with at most 500 instruments in one quote call.
+Callers do not call kite.quote directly. They submit the instruments they
+need with a priority and wait. A single dispatcher thread takes one quote
+token at a time, fills the batch with the most urgent pending instruments
+from every caller (underlying spots first, then strikes by distance from
+ATM), and sends one call for all of them. Each caller gets back its own
+instruments. Several symbols refreshed together therefore cost one quote
+call instead of one each.
+
+A 429, timeout or network error pauses the whole endpoint for a jittered,
+exponentially growing backoff, and the batch's instruments are queued again
+at their original priority. After KITE_MAX_RETRIES the waiting callers get
+the error: nothing is replaced with simulated data here.
+
+Other REST calls (instrument master, session) go through call(), which
+applies the 10/s limit and the same retries in the caller's thread.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from kiteconnect.exceptions import KiteException, NetworkException
+from config import (
+    KITE_QUOTE_RATE, KITE_API_RATE, KITE_MAX_RETRIES, KITE_RETRY_BASE_DELAY, KITE_RETRY_MAX_DELAY,
+    KITE_QUOTE_COALESCE, KITE_QUOTE_WAIT, KITE_QUOTE_BATCH_LIMIT, KITE_MAX_CONCURRENCY, KITE_CALL_TIMEOUT,
+)
+from kite_io import kite_call, KiteTimeoutError
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_UNDERLYING = 0  # Strikes use 1 + their distance from ATM in strikes
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Spaces calls at most `rate` per second (a bucket of one token, so there
+    is never a burst above the limit). `pause()` holds back every caller,
+    e.g. after the server answered 429.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next slot; returns the seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + 1.0 / self.rate
+            return slot - now
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+_buckets = {'quote': TokenBucket(KITE_QUOTE_RATE), 'api': TokenBucket(KITE_API_RATE)}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limiting and transient server or network failures; not bad input or an expired session"""
+    if isinstance(error, (KiteTimeoutError, NetworkException, requests.exceptions.RequestException)):
+        return True
+    return isinstance(error, KiteException) and getattr(error, 'code', None) in RETRYABLE_STATUS
+
+
+def backoff(attempt: int) -> float:
+    """Jittered exponential backoff: between half and all of base * 2^attempt, capped"""
+    delay = min(KITE_RETRY_MAX_DELAY, KITE_RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def _reason(error: Exception) -> str:
+    if getattr(error, 'code', None) == 429:
+        return 'rate_limited'
+    return 'timeout' if isinstance(error, KiteTimeoutError) else 'error'
+
+
+def call(method, *args, limit: str = 'api', retries: int = KITE_MAX_RETRIES, timeout: float = KITE_CALL_TIMEOUT, **kwargs):
+    """Rate-limited Kite call with jittered retries, run in the caller's thread"""
+    bucket = _buckets[limit]
+    name = getattr(method, '__name__', repr(method))
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            return kite_call(method, *args, timeout=timeout, **kwargs)
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = backoff(attempt)
+            bucket.pause(delay)
+            metrics.KITE_RETRIES.inc(name, _reason(e))
+            logger.warning(f"✗ Kite {name} failed ({e}), retry {attempt + 1}/{retries} in {delay:.2f}s")
+
+
+# --- Batched quotes -------------------------------------------------------------
+
+class _QuoteRequest:
+    __slots__ = ('client', 'remaining', 'quotes', 'attempts', 'error', 'done')
+
+    def __init__(self, client, instruments: set):
+        self.client = client
+        self.remaining = set(instruments)
+        self.quotes = {}
+        self.attempts = 0
+        self.error = None
+        self.done = threading.Event()
+
+
+_cond = threading.Condition()  # re-entrant, so _cancel can run under it
+_queue = []                  # heap of (priority, seq, instrument); stale entries are skipped
+_waiting = {}                # instrument -> [_QuoteRequest] not yet sent
+_priorities = {}             # instrument -> best queued priority
+_seq = itertools.count()
+_dispatcher = None
+_batch_pool = ThreadPoolExecutor(max_workers=KITE_MAX_CONCURRENCY, thread_name_prefix="kite-batch")
+_stats = {'calls': 0, 'instruments': 0, 'requests': 0, 'merged_calls': 0, 'retries': 0, 'failures': 0}
+
+
+def _enqueue(instrument: str, priority: int, request: _QuoteRequest):
+    """Caller holds _cond"""
+    _waiting.setdefault(instrument, []).append(request)
+    if priority < _priorities.get(instrument, float('inf')):
+        _priorities[instrument] = priority
+        heapq.heappush(_queue, (priority, next(_seq), instrument))
+
+
+def quote(client, instruments: list, priorities=None, timeout: float = KITE_QUOTE_WAIT) -> dict:
+    """
+    Quotes for `instruments`, fetched in shared batches with every other
+    caller's pending instruments. `priorities` is one int for all instruments
+    or one per instrument; lower is fetched first. Instruments Kite does not
+    return are missing from the result, as with kite.quote.
+    """
+    names = list(dict.fromkeys(name for name in instruments if name))
+    if not names:
+        return {}
+    if priorities is None or isinstance(priorities, int):
+        priorities = [priorities or 0] * len(instruments)
+    ranked = {}
+    for name, priority in zip(instruments, priorities):
+        if name:
+            ranked[name] = min(priority, ranked.get(name, priority))
+
+    request = _QuoteRequest(client, names)
+    with _cond:
+        _start_dispatcher()
+        for name in names:
+            _enqueue(name, ranked[name], request)
+        _stats['requests'] += 1
+        _cond.notify()
+
+    if not request.done.wait(timeout):
+        _cancel(request)
+        raise KiteTimeoutError(f"Quotes for {len(names)} instruments not fetched within {timeout}s")
+    if request.error is not None:
+        raise request.error
+    return request.quotes
+
+
+def _cancel(request: _QuoteRequest):
+    """Withdraw a request whose caller gave up; its unshared instruments are dropped from the queue"""
+    with _cond:
+        for name in request.remaining:
+            waiters = _waiting.get(name)
+            if waiters and request in waiters:
+                waiters.remove(request)
+                if not waiters:
+                    del _waiting[name]
+                    _priorities.pop(name, None)
+
+
+def _take_batch():
+    """Up to KITE_QUOTE_BATCH_LIMIT most urgent instruments for one client. Caller holds _cond."""
+    batch, skipped, client = {}, [], None
+    while _queue and len(batch) < KITE_QUOTE_BATCH_LIMIT:
+        entry = heapq.heappop(_queue)
+        priority, _, name = entry
+        waiters = _waiting.get(name)
+        if not waiters or _priorities.get(name) != priority:
+            continue  # cancelled, already taken, or superseded by a more urgent entry
+        if client is None:
+            client = waiters[0].client
+        elif waiters[0].client is not client:
+            skipped.append(entry)  # a client swap is in progress; the old client's turn comes next
+            continue
+        batch[name] = (priority, _waiting.pop(name))
+        del _priorities[name]
+    for entry in skipped:
+        heapq.heappush(_queue, entry)
+    return client, batch
+
+
+def _run_batch(client, batch: dict):
+    names = list(batch)
+    requests_in_batch = {id(r): r for _, waiters in batch.values() for r in waiters}
+    try:
+        quotes = kite_call(client.quote, names) or {}
+    except Exception as e:
+        _batch_failed(batch, requests_in_batch.values(), e)
+        return
+
+    metrics.QUOTE_BATCH_SIZE.observe(len(names))
+    with _cond:
+        _stats['calls'] += 1
+        _stats['instruments'] += len(names)
+        if len(requests_in_batch) > 1:
+            _stats['merged_calls'] += 1
+        for name, (_, waiters) in batch.items():
+            for request in waiters:
+                if name in quotes:
+                    request.quotes[name] = quotes[name]
+                request.remaining.discard(name)
+                if not request.remaining and request.error is None:
+                    request.done.set()
+
+
+def _batch_failed(batch: dict, failed_requests, error: Exception):
+    retry = is_retryable(error)
+    if retry:
+        delay = backoff(min(r.attempts for r in failed_requests))
+        _buckets['quote'].pause(delay)
+        metrics.KITE_RETRIES.inc('quote', _reason(error))
+        logger.warning(f"✗ Kite quote batch of {len(batch)} failed ({error}), backing off {delay:.2f}s")
+    with _cond:
+        for request in failed_requests:
+            request.attempts += 1
+            if not retry or request.attempts > KITE_MAX_RETRIES:
+                request.error = error
+                request.done.set()
+                _cancel(request)
+                _stats['failures'] += 1
+        requeued = 0
+        for name, (priority, waiters) in batch.items():
+            for request in waiters:
+                if not request.done.is_set():
+                    _enqueue(name, priority, request)
+                    requeued += 1
+        if requeued:
+            _stats['retries'] += 1
+            _cond.notify()
+
+
+def _dispatch():
+    while True:
+        with _cond:
+            while not _queue:
+                _cond.wait()
+        # Give concurrent callers a moment to join this batch, then wait for a quote slot
+        if KITE_QUOTE_COALESCE > 0:
+            time.sleep(KITE_QUOTE_COALESCE)
+        _buckets['quote'].acquire()
+        with _cond:
+            client, batch = _take_batch()
+        if batch:
+            _batch_pool.submit(_run_batch, client, batch)
+
+
+def _start_dispatcher():
+    """Caller holds _cond"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = threading.Thread(target=_dispatch, daemon=True, name="kite-scheduler")
+        _dispatcher.start()
+        logger.info(f"✓ Kite scheduler started (quote {KITE_QUOTE_RATE}/s, other {KITE_API_RATE}/s)")
+
+
+def stats() -> dict:
+    """Scheduler counters and current backlog"""
+    with _cond:
+        return {**_stats, 'pending_instruments': len(_waiting)}
@@ -0,0 +1,486 @@
+"""
+Local Kite Connect simulator for offline, reproducible load testing.
+
+Serves the parts of the Kite REST API and ticker WebSocket protocol the
+backend uses, so the real network path (KiteConnect, KiteTicker, batching,
+timeouts, retries) can be exercised end to end without Zerodha:
+
+- POST /session/token                          any request_token gets an access token
+- GET  /user/profile
+- GET  /instruments, /instruments/{exchange}   instrument master CSV
+- GET  /quote?i=..., /quote/ltp?i=...          up to 500 instruments per call
+- WS   /ws?api_key=...&access_token=...        binary ltp/quote/full tick packets
+- GET  /sim/stats                              simulator counters (not a Kite route)
+
+Each underlying follows a seeded geometric Brownian motion stepped
+--tick-rate times a second (--speed compresses market time). Every step
+reprices all listed options with Black-Scholes on a fixed volatility smile,
+so option prices always agree with spot, and OI/volume drift from the same
+seeded generator: the same seed replays the same price path. Time to expiry
+runs on the simulator's own clock, which starts at 09:15 IST on the day the
+simulator starts and advances --speed / --tick-rate market seconds a step, so
+option prices replay too and --speed compresses theta. REST calls can
+be delayed (--latency-ms, --jitter-ms) and are rate limited per Kite's
+published limits (--quote-rps, --api-rps), answering 429 NetworkException
+when a bucket is empty.
+
+Run from backend/:
+    python kite_simulator.py --port 8765 --seed 7 --tick-rate 4 --latency-ms 40
+then start the backend with
+    KITE_ROOT_URL=http://127.0.0.1:8765 KITE_TICKER_URL=ws://127.0.0.1:8765/ws
+and authenticate with any request token:
+    curl -X POST 'http://127.0.0.1:8000/auth/callback?request_token=sim'
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import secrets
+import struct
+import time
+from urllib.parse import parse_qs
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from config import SYMBOL_MAPPING, KITE_QUOTE_BATCH_LIMIT
+from greeks import bs_price
+from instruments import IST
+
+logger = logging.getLogger(__name__)
+
+SPOTS = {'NIFTY': 25000.0, 'BANKNIFTY': 51200.0, 'SENSEX': 81200.0}
+LOT_SIZES = {'NIFTY': 75, 'BANKNIFTY': 35, 'SENSEX': 20}
+SEGMENTS = {'NSE': 1, 'NFO': 2, 'BSE': 4, 'BFO': 5}  # Kite exchange code kept in a token's low byte
+TICK = 0.05
+DEPTH_LEVELS = 5
+MARKET_OPEN = (9, 15)    # Simulated clock start
+MARKET_CLOSE = (15, 30)
+TRADING_YEAR_SECONDS = 252 * 375 * 60  # GBM time unit: 252 sessions of 6h15m
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+INSTRUMENT_COLUMNS = (
+    'instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry',
+    'strike', 'tick_size', 'lot_size', 'instrument_type', 'segment', 'exchange',
+)
+
+# Ticker packet layouts: big-endian, prices in paise
+_LTP_PACKET = struct.Struct('>II')
+_INDEX_QUOTE_PACKET = struct.Struct('>6Ii')
+_INDEX_FULL_PACKET = struct.Struct('>6IiI')
+_QUOTE_PACKET = struct.Struct('>11I')
+_FULL_PACKET = struct.Struct('>16I' + 'IIH2x' * 2 * DEPTH_LEVELS)
+MODES = ('ltp', 'quote', 'full')
+
+
+def _paise(price: float) -> int:
+    return int(round(price * 100))
+
+
+def _error(status_code: int, error_type: str, message: str) -> JSONResponse:
+    return JSONResponse({'status': 'error', 'message': message, 'data': None, 'error_type': error_type},
+                        status_code=status_code)
+
+
+def _success(data) -> JSONResponse:
+    return JSONResponse({'status': 'success', 'data': data})
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts up to `rate`; rate <= 0 means unlimited"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Market:
+    """Seeded spot paths for every underlying and Black-Scholes-consistent option quotes"""
+
+    def __init__(self, seed: int = 42, tick_rate: float = 2.0, volatility: float = 0.15, drift: float = 0.0,
+                 atm_iv: float = 0.14, smile: float = 0.8, speed: float = 1.0, expiry_days=(2, 9),
+                 strikes_each_side: int = 60, spots: dict = None):
+        self.rng = np.random.default_rng(seed)
+        self.step_seconds = speed / tick_rate  # market seconds per step
+        self.dt = self.step_seconds / TRADING_YEAR_SECONDS
+        self.volatility = volatility
+        self.drift = drift
+        self.atm_iv = atm_iv
+        self.smile = smile
+        self.step = 0
+        today = datetime.now(IST).date()
+        self.started_at = datetime(today.year, today.month, today.day, *MARKET_OPEN, tzinfo=IST)
+        self.expiries = [today + timedelta(days=days) for days in expiry_days]
+
+        self.symbols = list(SYMBOL_MAPPING)
+        spots = dict(SPOTS, **(spots or {}))
+        self.spot = np.array([spots.get(s, SYMBOL_MAPPING[s].get('strike_base', 20000)) for s in self.symbols], dtype=float)
+        self.spot_ohlc = np.tile(self.spot, (4, 1))  # open, high, low, close rows
+        self.index_tokens = [int(SYMBOL_MAPPING[s]['token']) for s in self.symbols]
+
+        self.names = {}  # 'EXCHANGE:TRADINGSYMBOL' -> ('index', i) or ('option', row)
+        self.tokens = {}  # instrument token -> same
+        self.listing = {}  # exchange -> instrument master rows
+        underlying, strike, is_call, expiry, token, lot = [], [], [], [], [], []
+        exchange_token = 35000
+        for i, symbol in enumerate(self.symbols):
+            mapping = SYMBOL_MAPPING[symbol]
+            index_exchange, index_name = mapping['quote_symbol'].split(':', 1)
+            self.names[mapping['quote_symbol']] = self.tokens[self.index_tokens[i]] = ('index', i)
+            self.listing.setdefault(index_exchange, []).append((
+                self.index_tokens[i], self.index_tokens[i] >> 8, index_name, index_name, 0.0, '',
+                0.0, 0.0, 0, 'EQ', 'INDICES', index_exchange,
+            ))
+            exchange = mapping.get('exchange', 'NFO')
+            interval = mapping['strike_interval']
+            atm = int(round(self.spot[i] / interval)) * interval
+            for e, expiry_date in enumerate(self.expiries):
+                for k in range(-strikes_each_side, strikes_each_side + 1):
+                    for option_type in ('CE', 'PE'):
+                        exchange_token += 1
+                        row = len(token)
+                        tradingsymbol = f"{symbol}{expiry_date:%y%b%d}{atm + k * interval}{option_type}".upper()
+                        token.append((exchange_token << 8) | SEGMENTS.get(exchange, 2))
+                        underlying.append(i)
+                        strike.append(atm + k * interval)
+                        is_call.append(option_type == 'CE')
+                        expiry.append(e)
+                        lot.append(LOT_SIZES.get(symbol, 1))
+                        self.names[f"{exchange}:{tradingsymbol}"] = self.tokens[token[-1]] = ('option', row)
+                        self.listing.setdefault(exchange, []).append((
+                            token[-1], exchange_token, tradingsymbol, symbol, 0.0, expiry_date.isoformat(),
+                            float(atm + k * interval), TICK, lot[-1], option_type, f"{exchange}-OPT", exchange,
+                        ))
+
+        self.underlying = np.array(underlying)
+        self.strike = np.array(strike, dtype=float)
+        self.is_call = np.array(is_call)
+        self.expiry = np.array(expiry)
+        self.token = np.array(token)
+        self.lot = np.array(lot)
+        n = len(token)
+        self.oi = self.rng.integers(200, 5000, n) * self.lot
+        self.volume = self.rng.integers(10, 1000, n) * self.lot
+        self.price = self._option_prices()
+        self.option_ohlc = np.tile(self.price, (4, 1))
+        self.updated_at = time.time()
+
+    def clock(self) -> datetime:
+        """Simulated market time: the session open plus the market seconds stepped so far"""
+        return self.started_at + timedelta(seconds=self.step * self.step_seconds)
+
+    def _option_prices(self) -> np.ndarray:
+        now = self.clock()
+        years = np.array([
+            max((datetime(e.year, e.month, e.day, *MARKET_CLOSE, tzinfo=IST) - now).total_seconds(), 60.0)
+            for e in self.expiries
+        ]) / (365 * 24 * 3600)
+        spot = self.spot[self.underlying]
+        iv = self.atm_iv + self.smile * ((self.strike - spot) / spot) ** 2
+        price = bs_price(spot, self.strike, iv, years[self.expiry], self.is_call)
+        return np.maximum(np.round(price / TICK) * TICK, TICK).round(2)
+
+    def advance(self):
+        """One GBM step for every underlying, then reprice the options and drift OI/volume"""
+        shock = self.rng.standard_normal(len(self.spot))
+        self.spot *= np.exp((self.drift - 0.5 * self.volatility ** 2) * self.dt + self.volatility * np.sqrt(self.dt) * shock)
+        self.oi = np.maximum(self.oi + self.rng.integers(-3, 4, len(self.oi)) * self.lot, 0)
+        self.volume += self.rng.poisson(2, len(self.volume)) * self.lot
+        self.step += 1
+        self.price = self._option_prices()
+        for ohlc, last in ((self.spot_ohlc, self.spot), (self.option_ohlc, self.price)):
+            ohlc[1] = np.maximum(ohlc[1], last)
+            ohlc[2] = np.minimum(ohlc[2], last)
+        self.updated_at = time.time()
+
+    def _depth(self, row: int) -> dict:
+        price, lot = float(self.price[row]), int(self.lot[row])
+        levels = range(1, DEPTH_LEVELS + 1)
+        return {
+            'buy': [{'price': round(max(price - i * TICK, TICK), 2), 'quantity': lot * (i + 2), 'orders': i} for i in levels],
+            'sell': [{'price': round(price + i * TICK, 2), 'quantity': lot * (i + 1), 'orders': i} for i in levels],
+        }
+
+    def quote(self, names: list) -> dict:
+        """REST /quote payload; unknown instruments are left out, as Kite does"""
+        timestamp = datetime.fromtimestamp(self.updated_at, IST).strftime(TIMESTAMP_FORMAT)
+        quotes = {}
+        for name in names:
+            kind, i = self.names.get(name, (None, None))
+            if kind == 'index':
+                last, ohlc = float(self.spot[i]), self.spot_ohlc[:, i]
+                quotes[name] = {
+                    'instrument_token': self.index_tokens[i], 'timestamp': timestamp, 'last_price': round(last, 2),
+                    'net_change': round(last - ohlc[3], 2),
+                    'ohlc': {'open': round(ohlc[0], 2), 'high': round(ohlc[1], 2), 'low': round(ohlc[2], 2), 'close': round(ohlc[3], 2)},
+                }
+            elif kind == 'option':
+                last, ohlc = float(self.price[i]), self.option_ohlc[:, i]
+                depth = self._depth(i)
+                quotes[name] = {
+                    'instrument_token': int(self.token[i]), 'timestamp': timestamp, 'last_trade_time': timestamp,
+                    'last_price': last, 'last_quantity': int(self.lot[i]), 'average_price': round((ohlc[1] + ohlc[2]) / 2, 2),
+                    'volume': int(self.volume[i]), 'oi': int(self.oi[i]), 'oi_day_high': int(self.oi[i]), 'oi_day_low': int(self.oi[i]),
+                    'buy_quantity': sum(level['quantity'] for level in depth['buy']),
+                    'sell_quantity': sum(level['quantity'] for level in depth['sell']),
+                    'net_change': round(last - ohlc[3], 2), 'lower_circuit_limit': TICK, 'upper_circuit_limit': round(ohlc[3] * 5, 2),
+                    'ohlc': {'open': float(ohlc[0]), 'high': float(ohlc[1]), 'low': float(ohlc[2]), 'close': float(ohlc[3])},
+                    'depth': depth,
+                }
+        return quotes
+
+    def ltp(self, names: list) -> dict:
+        """REST /quote/ltp payload"""
+        quotes = {}
+        for name in names:
+            kind, i = self.names.get(name, (None, None))
+            if kind == 'index':
+                quotes[name] = {'instrument_token': self.index_tokens[i], 'last_price': round(float(self.spot[i]), 2)}
+            elif kind == 'option':
+                quotes[name] = {'instrument_token': int(self.token[i]), 'last_price': float(self.price[i])}
+        return quotes
+
+    def instruments_csv(self, exchange: str = None) -> str:
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(INSTRUMENT_COLUMNS)
+        for name, rows in self.listing.items():
+            if exchange is None or name == exchange:
+                writer.writerows(rows)
+        return out.getvalue()
+
+    def packet(self, token: int, mode: str) -> bytes:
+        """One ticker packet in Kite's binary format, or b'' for an unknown token"""
+        kind, i = self.tokens.get(token, (None, None))
+        if kind == 'index':
+            last, ohlc = _paise(self.spot[i]), [_paise(value) for value in self.spot_ohlc[:, i]]
+            if mode == 'ltp':
+                return _LTP_PACKET.pack(token, last)
+            fields = (token, last, ohlc[1], ohlc[2], ohlc[0], ohlc[3], last - ohlc[3])
+            if mode == 'quote':
+                return _INDEX_QUOTE_PACKET.pack(*fields)
+            return _INDEX_FULL_PACKET.pack(*fields, int(self.updated_at))
+        if kind != 'option':
+            return b''
+
+        last = _paise(self.price[i])
+        if mode == 'ltp':
+            return _LTP_PACKET.pack(token, last)
+        ohlc = [_paise(value) for value in self.option_ohlc[:, i]]
+        depth = self._depth(i)
+        fields = (
+            token, last, int(self.lot[i]), (ohlc[1] + ohlc[2]) // 2, int(self.volume[i]),
+            sum(level['quantity'] for level in depth['buy']), sum(level['quantity'] for level in depth['sell']),
+            *ohlc,
+        )
+        if mode == 'quote':
+            return _QUOTE_PACKET.pack(*fields)
+        levels = []
+        for level in depth['buy'] + depth['sell']:
+            levels += (level['quantity'], _paise(level['price']), level['orders'])
+        oi = int(self.oi[i])
+        return _FULL_PACKET.pack(*fields, int(self.updated_at), oi, oi, oi, int(self.updated_at), *levels)
+
+
+def create_app(market: Market, tick_rate: float = 2.0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+               quote_rps: float = 1.0, api_rps: float = 10.0, seed: int = 42) -> FastAPI:
+    """FastAPI app serving `market` over the Kite REST and ticker protocols"""
+    app = FastAPI(title="Kite Connect Simulator")
+    delay_rng = np.random.default_rng(seed + 1)  # separate stream, so request timing never perturbs the price path
+    buckets = {'quote': TokenBucket(quote_rps), 'api': TokenBucket(api_rps)}
+    sessions = set()
+    stats = {'requests': 0, 'rate_limited': 0, 'quoted_instruments': 0, 'ticker_connections': 0}
+    stepped = asyncio.Condition()
+
+    async def step_market():
+        interval = 1.0 / tick_rate
+        next_step = time.monotonic()
+        while True:
+            next_step += interval
+            await asyncio.sleep(max(next_step - time.monotonic(), 0))
+            market.advance()
+            async with stepped:
+                stepped.notify_all()
+
+    @app.on_event("startup")
+    async def start_market():
+        app.state.stepper = asyncio.create_task(step_market())
+        logger.info(f"✓ Kite simulator ticking {len(market.spot)} underlyings and {len(market.token)} options at {tick_rate}/s")
+
+    @app.on_event("shutdown")
+    async def stop_market():
+        app.state.stepper.cancel()
+
+    async def gate(request: Request, bucket: str, authenticated: bool = True):
+        """Injected latency, then the auth check and rate limit; an error response or None"""
+        stats['requests'] += 1
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(latency_ms + delay_rng.uniform(-jitter_ms, jitter_ms), 0.0) / 1000)
+        if authenticated:
+            _, _, access_token = request.headers.get('authorization', '').partition(':')
+            if access_token not in sessions:
+                return _error(403, 'TokenException', 'Incorrect `api_key` or `access_token`.')
+        if not buckets[bucket].take():
+            stats['rate_limited'] += 1
+            return _error(429, 'NetworkException', 'Too many requests')
+        return None
+
+    @app.post("/session/token")
+    async def session_token(request: Request):
+        rejected = await gate(request, 'api', authenticated=False)
+        if rejected:
+            return rejected
+        form = {key: values[0] for key, values in parse_qs((await request.body()).decode()).items()}
+        access_token = secrets.token_hex(16)
+        sessions.add(access_token)
+        return _success({
+            'user_id': 'SIM001', 'user_name': 'Kite Simulator', 'user_shortname': 'Simulator', 'email': 'sim@localhost',
+            'user_type': 'individual', 'broker': 'ZERODHA', 'exchanges': sorted(SEGMENTS), 'products': ['NRML', 'MIS'],
+            'order_types': ['MARKET', 'LIMIT'], 'api_key': form.get('api_key', ''), 'access_token': access_token,
+            'public_token': secrets.token_hex(8), 'refresh_token': '', 'enctoken': '',
+            'login_time': datetime.now(IST).strftime(TIMESTAMP_FORMAT), 'meta': {'demat_consent': 'physical'},
+        })
+
+    @app.get("/user/profile")
+    async def profile(request: Request):
+        rejected = await gate(request, 'api')
+        return rejected or _success({'user_id': 'SIM001', 'user_name': 'Kite Simulator', 'broker': 'ZERODHA'})
+
+    @app.get("/instruments")
+    @app.get("/instruments/{exchange}")
+    async def instrument_master(request: Request, exchange: str = None):
+        rejected = await gate(request, 'api')
+        return rejected or Response(market.instruments_csv(exchange), media_type='text/csv')
+
+    async def quote_request(request: Request, names: list, render):
+        rejected = await gate(request, 'quote')
+        if rejected:
+            return rejected
+        if len(names) > KITE_QUOTE_BATCH_LIMIT:
+            return _error(400, 'InputException', f"Maximum {KITE_QUOTE_BATCH_LIMIT} instruments allowed per request")
+        stats['quoted_instruments'] += len(names)
+        return _success(render(names))
+
+    @app.get("/quote")
+    async def quote(request: Request, i: list = Query(default=[])):
+        return await quote_request(request, i, market.quote)
+
+    @app.get("/quote/ltp")
+    async def quote_ltp(request: Request, i: list = Query(default=[])):
+        return await quote_request(request, i, market.ltp)
+
+    @app.get("/sim/stats")
+    async def simulator_stats():
+        return {
+            **stats, 'step': market.step, 'clock': market.clock().isoformat(), 'sessions': len(sessions),
+            'spot': {symbol: round(float(spot), 2) for symbol, spot in zip(market.symbols, market.spot)},
+        }
+
+    @app.websocket("/ws")
+    async def ticker(websocket: WebSocket, access_token: str = Query('')):
+        if access_token not in sessions:
+            await websocket.close(code=1008)  # rejected handshake, as Kite does for a bad token
+            return
+        await websocket.accept()
+        stats['ticker_connections'] += 1
+        modes = {}  # subscribed token -> 'ltp' | 'quote' | 'full'
+
+        async def receive():
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    return
+                try:
+                    request = json.loads(message.get('text') or message.get('bytes') or b'{}')
+                    action, value = request.get('a'), request.get('v')
+                    if action == 'subscribe':
+                        for token in value:
+                            modes.setdefault(int(token), 'quote')
+                    elif action == 'unsubscribe':
+                        for token in value:
+                            modes.pop(int(token), None)
+                    elif action == 'mode' and value[0] in MODES:
+                        for token in value[1]:
+                            if int(token) in modes:
+                                modes[int(token)] = value[0]
+                except Exception as e:
+                    await websocket.send_text(json.dumps({'type': 'error', 'data': f"Invalid message: {e}"}))
+
+        reader = asyncio.create_task(receive())
+        last_sent = time.monotonic()
+        try:
+            while not reader.done():
+                async with stepped:
+                    await stepped.wait()
+                packets = [packet for packet in (market.packet(token, mode) for token, mode in list(modes.items())) if packet]
+                if packets:
+                    body = struct.pack('>H', len(packets)) + b''.join(struct.pack('>H', len(p)) + p for p in packets)
+                    await websocket.send_bytes(body)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= 1.0:
+                    await websocket.send_bytes(b'\x00')  # heartbeat
+                    last_sent = time.monotonic()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            reader.cancel()
+            stats['ticker_connections'] -= 1
+
+    return app
+
+
+def _spot_overrides(values: list) -> dict:
+    spots = {}
+    for value in values:
+        symbol, _, price = value.partition('=')
+        spots[symbol.strip().upper()] = float(price)
+    return spots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Kite REST + ticker simulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the spot paths and OI/volume drift')
+    parser.add_argument('--tick-rate', type=float, default=2.0, help='Market steps (and ticker pushes) per second')
+    parser.add_argument('--speed', type=float, default=1.0, help='Market seconds per wall-clock second')
+    parser.add_argument('--volatility', type=float, default=0.15, help='Annualized volatility of the spot process')
+    parser.add_argument('--drift', type=float, default=0.0, help='Annualized drift of the spot process')
+    parser.add_argument('--atm-iv', type=float, default=0.14, help='At-the-money implied volatility used for pricing')
+    parser.add_argument('--smile', type=float, default=0.8, help='Smile curvature: iv = atm_iv + smile * moneyness²')
+    parser.add_argument('--spot', action='append', default=[], metavar='SYMBOL=PRICE', help='Starting spot override')
+    parser.add_argument('--expiry-days', default='2,9', help='Listed expiries, in days from today')
+    parser.add_argument('--strikes-each-side', type=int, default=60, help='Listed strikes each side of the starting spot')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean delay added to every REST call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform ± jitter around --latency-ms')
+    parser.add_argument('--quote-rps', type=float, default=1.0, help='Quote calls per second before 429s (0 = unlimited)')
+    parser.add_argument('--api-rps', type=float, default=10.0, help='Other REST calls per second before 429s (0 = unlimited)')
+    args = parser.parse_args()
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    market = Market(
+        seed=args.seed, tick_rate=args.tick_rate, volatility=args.volatility, drift=args.drift, atm_iv=args.atm_iv,
+        smile=args.smile, speed=args.speed, expiry_days=[int(d) for d in args.expiry_days.split(',')],
+        strikes_each_side=args.strikes_each_side, spots=_spot_overrides(args.spot),
+    )
+    app = create_app(market, args.tick_rate, args.latency_ms, args.jitter_ms, args.quote_rps, args.api_rps, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
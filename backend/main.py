@@ -1,9 +1,25 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional, Union
 import asyncio
 import logging
-from config import DEFAULT_THRESHOLDS
-from zerodha_api import generate_signal_from_market_data, get_auth_url, set_access_token, check_connection
+from config import (
+    DEFAULT_THRESHOLDS, DASHBOARD_THRESHOLDS, THRESHOLD_PROFILES, SCREEN_MAX_PROFILES,
+    SIGNAL_STREAM_HEARTBEAT, RECORDER_ENABLED, WARMUP_ENABLED, WARMUP_TIMEOUT,
+)
+from zerodha_api import get_auth_url, set_access_token, check_connection, refresh_market_data, market_cache, warm_up
+import kite_io
+import market_stream
+import shared_cache
+import market_hours
+import precompute
+import recorder
+import metrics
+from signal_stream import SignalBroadcaster, HEARTBEAT
+from serialization import negotiate, encoded_response, dumps_envelope, dumps
+from kite_io import run_blocking
 
 app = FastAPI(title="Market Signals API - Live Zerodha", version="2.0.0")
 
@@ -25,10 +41,63 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestTimingMiddleware)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# /health reports 503 until the startup warm-up has run
+warmed_up = not WARMUP_ENABLED
+_warm_up_task = None
+
+
+def _warm_up_worker():
+    """Kite connections, instruments and market caches, then the precomputed signals"""
+    # Only symbols with a primed chain: a follower must not fetch one from Kite here
+    for symbol in warm_up():
+        precompute.refresh(symbol)
+
+
+async def _run_warm_up():
+    global warmed_up
+    try:
+        await run_blocking(_warm_up_worker, timeout=WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"✗ Warm-up did not finish within {WARMUP_TIMEOUT}s; reporting healthy anyway")
+    except Exception as e:
+        logger.error(f"✗ Warm-up failed: {e}")
+    warmed_up = True
+    # Started only now, so a follower's precompute cannot fetch from Kite while warm-up waits for the fetcher
+    precompute.start()
+
+
+@app.on_event("startup")
+async def start_background_work():
+    """Warm up, join the market-data fetcher election, start precomputing signals and (optionally) recording"""
+    global _warm_up_task
+    if RECORDER_ENABLED:
+        recorder.start()
+    shared_cache.start_fetcher(refresh_market_data, market_hours.refresh_interval)
+    if WARMUP_ENABLED:
+        _warm_up_task = asyncio.create_task(_run_warm_up())
+    else:
+        precompute.start()
+    metrics.start_loop_monitor()
+
+
+@app.on_event("shutdown")
+async def shutdown_kite_io():
+    """Stop fetching, close the tick stream and release the Kite I/O and signal thread pools"""
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+    shared_cache.stop_fetcher()
+    precompute.stop()
+    metrics.stop_loop_monitor()
+    await signal_broadcaster.stop()
+    market_stream.stop()
+    recorder.stop()
+    kite_io.shutdown()
+
 
 @app.get("/")
 async def root():
@@ -180,10 +249,18 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint; 503 until the startup warm-up has finished."""
+    if not warmed_up:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "service": "market-signals-api-zerodha-live"})
     return {"status": "healthy", "service": "market-signals-api-zerodha-live"}
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage, Kite, cache, data-source, event-loop and endpoint metrics"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/api/connection")
 async def get_connection_status():
     """Check Zerodha API connection status"""
@@ -205,7 +282,10 @@ async def get_login_url():
 @app.post("/auth/callback")
 async def auth_callback(request_token: str):
     """Handle Zerodha callback with request token"""
-    result = set_access_token(request_token)
+    try:
+        result = await run_blocking(set_access_token, request_token)
+    except asyncio.TimeoutError:
+        result = None
     if result:
         return {"status": "authenticated", "access_token": result.get('access_token')}
     return {"error": "Failed to authenticate"}
@@ -213,6 +293,7 @@ async def auth_callback(request_token: str):
 
 @app.get("/api/signal")
 async def get_signal(
+    request: Request,
     symbol: str = Query("NIFTY", description="Stock symbol (NIFTY, BANKNIFTY, SENSEX)"),
     vega_min: float = Query(0.3),
     gamma_min: float = Query(0.05),
@@ -231,7 +312,8 @@ async def get_signal(
     - iv_call_oi_min: Minimum IV Call OI
     - confidence_min: Minimum confidence score (0-1)
     
-    Returns signal with Greeks, OI, strike prices, and buy/sell recommendation.
+    Returns signal with Greeks, OI, strike prices, and buy/sell recommendation,
+    as JSON or, with `Accept: application/msgpack`, MessagePack.
     """
     if symbol not in ["NIFTY", "BANKNIFTY", "SENSEX"]:
         raise HTTPException(status_code=400, detail="Invalid symbol")
@@ -244,36 +326,192 @@ async def get_signal(
         'confidence_min': confidence_min,
     }
     
-    signal = generate_signal_from_market_data(symbol, params)
+    fmt = negotiate(request.headers.get("accept"))
+    try:
+        signal, body = await precompute.get_encoded_async(symbol, params, fmt)
+    except asyncio.TimeoutError:
+        logger.error(f"Signal computation for {symbol} timed out")
+        raise HTTPException(status_code=504, detail="Market data request timed out")
     
     if not signal:
         # No STRONG BUY signal found - return null/empty response
         logger.info(f"No STRONG BUY signal for {symbol} - criteria not met")
-        return None
-    
-    logger.info(f"Generated signal for {symbol}: {signal['side']} (confidence: {signal['confidence']}, source: {signal['data_source']})")
+    else:
+        logger.info(f"Generated signal for {symbol}: {signal['side']} (confidence: {signal['confidence']}, source: {signal['data_source']})")
     
-    return signal
+    return encoded_response(body, fmt)
 
 
 @app.get("/api/signals")
 async def get_signals_batch(
+    request: Request,
     symbols: str = Query("NIFTY,BANKNIFTY,SENSEX"),
     count: int = Query(1, ge=1, le=10),
 ):
-    """Get multiple signals for multiple symbols using live data."""
-    symbol_list = symbols.split(",")
-    signals = []
+    """
+    Get the top `count` STRONG BUY candidates (CE and PE) per symbol using live data.
     
-    for symbol in symbol_list:
+    Symbols are evaluated concurrently, each from one ranked pass over its chain,
+    so batch latency follows the slowest symbol rather than the sum. Signals are
+    listed symbol by symbol, best candidate first.
+    """
+    fmt = negotiate(request.headers.get("accept"))
+    symbol_list = []
+    for symbol in symbols.split(","):
         symbol = symbol.strip().upper()
-        if symbol in ["NIFTY", "BANKNIFTY", "SENSEX"]:
-            for _ in range(count):
-                signal = generate_signal_from_market_data(symbol, DEFAULT_THRESHOLDS)
-                if signal:
-                    signals.append(signal)
+        if symbol in ["NIFTY", "BANKNIFTY", "SENSEX"] and symbol not in symbol_list:
+            symbol_list.append(symbol)
+    
+    results = await asyncio.gather(
+        *(precompute.get_encoded_async(symbol, DEFAULT_THRESHOLDS, fmt, top_n=count) for symbol in symbol_list),
+        return_exceptions=True,
+    )
+    
+    signals = []
+    for symbol, result in zip(symbol_list, results):
+        if isinstance(result, asyncio.TimeoutError):
+            logger.error(f"Signal computation for {symbol} timed out")
+            continue
+        if isinstance(result, Exception):
+            logger.error(f"Signal computation for {symbol} failed: {result}")
+            continue
+        _, bodies = result
+        signals.extend(bodies)
+    
+    # Splice the per-signal bodies instead of re-encoding them
+    return encoded_response(dumps_envelope("signals", signals, fmt), fmt)
+
+
+class ThresholdProfile(BaseModel):
+    """Custom screening profile; thresholds left out take DEFAULT_THRESHOLDS"""
+    name: Optional[str] = None
+    vega_min: Optional[float] = None
+    gamma_min: Optional[float] = None
+    theta_min: Optional[float] = None
+    delta_min: Optional[float] = None
+    iv_call_oi_min: Optional[float] = None
+    iv_min: Optional[float] = None
+    confidence_min: Optional[float] = None
+
+
+class ScreenRequest(BaseModel):
+    symbol: str = "NIFTY"
+    profiles: List[Union[str, ThresholdProfile]]  # Saved profile names and/or custom profiles
+
+
+def _resolve_profile(index: int, profile) -> tuple:
+    """(name, full thresholds) for a saved profile name or a custom profile"""
+    if isinstance(profile, str):
+        if profile not in THRESHOLD_PROFILES:
+            raise HTTPException(status_code=400, detail=f"Unknown profile: {profile}")
+        return profile, {**DEFAULT_THRESHOLDS, **THRESHOLD_PROFILES[profile]}
+    overrides = {name: getattr(profile, name) for name in DEFAULT_THRESHOLDS if getattr(profile, name) is not None}
+    return profile.name or f"custom-{index + 1}", {**DEFAULT_THRESHOLDS, **overrides}
+
+
+@app.get("/api/profiles")
+async def get_threshold_profiles():
+    """Saved threshold profiles usable by name in /api/signals/screen"""
+    return {name: {**DEFAULT_THRESHOLDS, **profile} for name, profile in THRESHOLD_PROFILES.items()}
+
+
+@app.post("/api/signals/screen")
+async def screen_signals(request: Request, body: ScreenRequest):
+    """
+    Best STRONG BUY signal per threshold profile for one symbol.
+    
+    All profiles are evaluated together against one shared option-chain
+    snapshot (Greeks once, thresholds as a profiles x strikes matrix), so ten
+    profiles cost about the same as one. `profiles` mixes saved names (see
+    /api/profiles) and custom threshold objects.
+    """
+    symbol = body.symbol.upper()
+    if symbol not in ["NIFTY", "BANKNIFTY", "SENSEX"]:
+        raise HTTPException(status_code=400, detail="Invalid symbol")
+    if not body.profiles or len(body.profiles) > SCREEN_MAX_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {SCREEN_MAX_PROFILES} profiles")
+    
+    profiles = [_resolve_profile(i, profile) for i, profile in enumerate(body.profiles)]
+    try:
+        chain, signals = await run_blocking(precompute.screen, symbol, [thresholds for _, thresholds in profiles])
+    except asyncio.TimeoutError:
+        logger.error(f"Screening {symbol} timed out")
+        raise HTTPException(status_code=504, detail="Market data request timed out")
+    if chain is None:
+        raise HTTPException(status_code=503, detail="Option chain unavailable")
+    
+    results = [
+        {"profile": name, "thresholds": thresholds, "signal": signal}
+        for (name, thresholds), signal in zip(profiles, signals)
+    ]
+    fmt = negotiate(request.headers.get("accept"))
+    return encoded_response(dumps({
+        "symbol": symbol,
+        "ltp": chain.ltp,
+        "data_source": chain.data_source,
+        "results": results,
+        "count": sum(1 for signal in signals if signal),
+    }, fmt), fmt)
+
+
+# One computation per symbol per market update, shared by every connected dashboard
+signal_broadcaster = SignalBroadcaster(lambda symbol: precompute.get_signal_async(symbol, DASHBOARD_THRESHOLDS))
+
+
+@app.websocket("/ws/signals")
+async def stream_signals_ws(websocket: WebSocket, symbol: str = Query("NIFTY")):
+    """
+    Push the dashboard signal for a symbol whenever it changes.
+    Messages: {"type": "signal", "symbol", "signal" (null if no STRONG BUY), "sent_at"}
+    and {"type": "heartbeat"} after SIGNAL_STREAM_HEARTBEAT seconds of silence.
+    """
+    symbol = symbol.upper()
+    if symbol not in ["NIFTY", "BANKNIFTY", "SENSEX"]:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    queue = signal_broadcaster.subscribe(symbol)
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=SIGNAL_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                message = HEARTBEAT
+            await websocket.send_text(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        signal_broadcaster.unsubscribe(symbol, queue)
+
+
+@app.get("/api/signals/stream")
+async def stream_signals_sse(request: Request, symbol: str = Query("NIFTY")):
+    """Server-Sent Events fallback for /ws/signals (same messages as `data:` events)"""
+    symbol = symbol.upper()
+    if symbol not in ["NIFTY", "BANKNIFTY", "SENSEX"]:
+        raise HTTPException(status_code=400, detail="Invalid symbol")
+    
+    async def events():
+        # Subscribed here, not in the handler: if the client leaves before the
+        # first iteration the generator never starts, and nothing is left behind
+        queue = signal_broadcaster.subscribe(symbol)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SIGNAL_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            signal_broadcaster.unsubscribe(symbol, queue)
     
-    return {"signals": signals, "count": len(signals)}
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/api/symbols")
@@ -294,7 +532,11 @@ async def get_api_status():
         "data_source": "ZERODHA_LIVE",
         "api_key_configured": True,
         "symbols": ["NIFTY", "BANKNIFTY", "SENSEX"],
-        "refresh_interval": "10 seconds"
+        "refresh_interval": round(market_hours.refresh_interval(), 2),
+        "market": market_hours.status(),
+        "cache": market_cache.stats(),
+        "stream_subscribers": signal_broadcaster.subscriber_count(),
+        "recorder": recorder.stats(),
     }
 
 
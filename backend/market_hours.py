@@ -0,0 +1,208 @@
+"""
+NSE/BSE session calendar and the adaptive market-data refresh interval.
+
+Sessions, in IST on weekdays that are not exchange holidays:
+- pre_open    09:00-09:15  call auction, indicative prices
+- open        09:15-15:30  continuous trading
+- post_close  15:30-16:00  closing price and post-close session
+- closed      any other time, weekends and holidays
+
+While open, a symbol's refresh interval starts at REFRESH_BASE_INTERVAL. It
+shrinks as realized volatility rises above REFRESH_REFERENCE_VOL and as the
+nearest expiry approaches (half the interval on expiry day), clamped to
+[REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL]. The fetcher uses the shortest
+interval of any symbol, because one merged quote call covers them all. While
+closed nothing is fetched: zerodha_api serves the frozen last-close snapshot
+and the fetcher only wakes up to check the session.
+
+The holiday lists follow the exchanges' annual circulars; add unscheduled
+closures with MARKET_HOLIDAYS. MARKET_HOURS_ENABLED=false treats every moment
+as 'open' (offline simulator runs, benchmarks).
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta, time as dt_time
+from config import (
+    SYMBOL_MAPPING, MARKET_HOURS_ENABLED, REFRESH_BASE_INTERVAL, REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL,
+    REFRESH_PRE_OPEN_INTERVAL, REFRESH_POST_CLOSE_INTERVAL, REFRESH_CLOSED_INTERVAL,
+    REFRESH_REFERENCE_VOL, REALIZED_VOL_WINDOW, MARKET_HOLIDAYS,
+)
+import instruments
+from instruments import IST
+
+logger = logging.getLogger(__name__)
+
+PRE_OPEN = dt_time(9, 0)
+OPEN = dt_time(9, 15)
+CLOSE = dt_time(15, 30)
+POST_CLOSE_END = dt_time(16, 0)
+
+# Trading seconds in a year, for annualizing realized volatility
+TRADING_SECONDS_PER_YEAR = 252 * 6.25 * 3600
+
+# Equity and equity-derivative trading holidays (NSE and BSE publish the same list)
+HOLIDAYS = frozenset([
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10), date(2025, 4, 14),
+    date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15), date(2025, 8, 27), date(2025, 10, 2),
+    date(2025, 10, 21), date(2025, 10, 22), date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26), date(2026, 3, 31), date(2026, 4, 3),
+    date(2026, 4, 14), date(2026, 5, 1), date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14),
+    date(2026, 10, 2), date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+]) | frozenset(date.fromisoformat(day.strip()) for day in MARKET_HOLIDAYS.split(',') if day.strip())
+
+_lock = threading.Lock()
+_samples = {symbol: deque(maxlen=4096) for symbol in SYMBOL_MAPPING}  # symbol -> (timestamp, log LTP)
+_cached_interval = (0.0, None)  # (monotonic expiry, value)
+_cached_session = (0.0, None)
+
+
+def now_ist() -> datetime:
+    return datetime.now(IST)
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def session(moment: datetime = None) -> str:
+    """'pre_open', 'open', 'post_close' or 'closed' at `moment` (default now, re-evaluated at most once a second)"""
+    global _cached_session
+    if not MARKET_HOURS_ENABLED:
+        return 'open'
+    if moment is None:
+        if time.monotonic() < _cached_session[0]:
+            return _cached_session[1]
+        current = _session_at(now_ist())
+        _cached_session = (time.monotonic() + 1.0, current)
+        return current
+    return _session_at(moment.astimezone(IST))
+
+
+def _session_at(moment: datetime) -> str:
+    if not is_trading_day(moment.date()):
+        return 'closed'
+    clock = moment.time()
+    if PRE_OPEN <= clock < OPEN:
+        return 'pre_open'
+    if OPEN <= clock < CLOSE:
+        return 'open'
+    if CLOSE <= clock < POST_CLOSE_END:
+        return 'post_close'
+    return 'closed'
+
+
+def is_closed(moment: datetime = None) -> bool:
+    return session(moment) == 'closed'
+
+
+def last_close(moment: datetime = None) -> datetime:
+    """The most recent 15:30 IST close at or before `moment`"""
+    moment = (moment or now_ist()).astimezone(IST)
+    day = moment.date()
+    if moment.time() < CLOSE:
+        day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return datetime.combine(day, CLOSE, tzinfo=IST)
+
+
+def next_open(moment: datetime = None) -> datetime:
+    """The next 09:15 IST open after `moment`"""
+    moment = (moment or now_ist()).astimezone(IST)
+    day = moment.date()
+    if moment.time() >= OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return datetime.combine(day, OPEN, tzinfo=IST)
+
+
+def observe(symbol: str, ltp: float, timestamp: float = None):
+    """Record an underlying price for the realized volatility estimate (at most one sample a second)"""
+    if not ltp or ltp <= 0 or symbol not in _samples:
+        return
+    timestamp = timestamp or time.time()
+    with _lock:
+        samples = _samples[symbol]
+        if samples and timestamp - samples[-1][0] < 1.0:
+            return
+        samples.append((timestamp, math.log(ltp)))
+
+
+def realized_vol(symbol: str, now: float = None):
+    """Annualized realized volatility over the last REALIZED_VOL_WINDOW seconds, or None with too few samples"""
+    now = now or time.time()
+    with _lock:
+        samples = [sample for sample in _samples.get(symbol, ()) if now - sample[0] <= REALIZED_VOL_WINDOW]
+    if len(samples) < 10:
+        return None
+    # Sum of squared log returns over elapsed time handles irregular sampling
+    variance = sum((b[1] - a[1]) ** 2 for a, b in zip(samples, samples[1:]))
+    elapsed = samples[-1][0] - samples[0][0]
+    return math.sqrt(variance / elapsed * TRADING_SECONDS_PER_YEAR) if elapsed > 0 else None
+
+
+def days_to_expiry(symbol: str, moment: datetime = None):
+    """Calendar days to the symbol's nearest live expiry, or None without an instrument master"""
+    index = instruments.get_index()
+    if index is None:
+        return None
+    moment = (moment or now_ist()).astimezone(IST)
+    expiry = index.nearest_expiry(symbol, moment)
+    return (expiry - moment.date()).days if expiry is not None else None
+
+
+def symbol_interval(symbol: str, moment: datetime = None) -> float:
+    """In-session refresh interval for one symbol"""
+    vol = realized_vol(symbol)
+    vol_factor = min(max(vol / REFRESH_REFERENCE_VOL, 1.0), 4.0) if vol else 1.0
+    days = days_to_expiry(symbol, moment)
+    expiry_factor = 1.0 + 1.0 / (1 + days) if days is not None else 1.0
+    interval = REFRESH_BASE_INTERVAL / (vol_factor * expiry_factor)
+    return min(max(interval, REFRESH_MIN_INTERVAL), REFRESH_MAX_INTERVAL)
+
+
+def refresh_interval(moment: datetime = None) -> float:
+    """Seconds between market-data refreshes right now (recomputed at most once a second)"""
+    global _cached_interval
+    if moment is None and time.monotonic() < _cached_interval[0]:
+        return _cached_interval[1]
+    current = session(moment)
+    if current == 'open':
+        interval = min(symbol_interval(symbol, moment) for symbol in SYMBOL_MAPPING)
+    elif current == 'pre_open':
+        interval = REFRESH_PRE_OPEN_INTERVAL
+    elif current == 'post_close':
+        interval = REFRESH_POST_CLOSE_INTERVAL
+    else:
+        interval = REFRESH_CLOSED_INTERVAL
+    if moment is None:
+        _cached_interval = (time.monotonic() + 1.0, interval)
+    return interval
+
+
+def status() -> dict:
+    """Session, refresh interval and its inputs, for /api/status"""
+    moment = now_ist()
+    current = session(moment)
+    symbols = {}
+    for symbol in SYMBOL_MAPPING:
+        vol = realized_vol(symbol)
+        symbols[symbol] = {
+            'realized_vol': round(vol, 4) if vol else None,
+            'days_to_expiry': days_to_expiry(symbol, moment),
+            'refresh_interval': round(symbol_interval(symbol, moment), 2) if current == 'open' else None,
+        }
+    return {
+        'session': current,
+        'frozen': current == 'closed',
+        'trading_day': is_trading_day(moment.date()),
+        'last_close': last_close(moment).isoformat(),
+        'next_open': next_open(moment).isoformat(),
+        'symbols': symbols,
+    }
@@ -0,0 +1,281 @@
+"""
+KiteTicker streaming ingest with an in-memory live chain.
+
+A background KiteTicker connection in full mode subscribes to the underlying
+index tokens from SYMBOL_MAPPING and the option tokens of each symbol's
+ATM ± N window. Every tick updates an in-memory chain, so get_ltp and
+get_option_chain can serve requests with zero network I/O while the stream
+is fresh. Option ticks are written in place into the columns of a
+per-symbol OptionChain, so a tick allocates nothing. When the ATM strike
+moves, the window is reloaded and the option subscriptions are swapped in
+the background.
+"""
+import logging
+import threading
+import time
+import numpy as np
+from kiteconnect import KiteTicker
+from config import SYMBOL_MAPPING, OPTION_CHAIN_STRIKES_EACH_SIDE, STREAM_MAX_AGE, KITE_TICKER_URL
+from chain import OptionChain
+import recorder
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_ticker = None
+_ticker_token = None  # access token the current ticker was started with
+_window_loader = None
+_reloading = set()
+
+# instrument_token -> symbol for the underlying indices
+_underlying_tokens = {int(m['token']): symbol for symbol, m in SYMBOL_MAPPING.items()}
+# instrument_token -> (symbol, row, 'ce' | 'pe') for subscribed options
+_option_tokens = {}
+# symbol -> live state, updated tick by tick
+_chains = {
+    symbol: {'ltp': None, 'updated_at': 0.0, 'window_atm': None, 'chain': None, 'version': 0}
+    for symbol in SYMBOL_MAPPING
+}
+
+
+def set_window_loader(loader):
+    """
+    Register the function used to (re)load a symbol's option window.
+    loader(symbol, ltp) must return an OptionChain whose ce/pe token columns are filled.
+    """
+    global _window_loader
+    _window_loader = loader
+
+
+def _nearest_row(strikes: np.ndarray, ltp: float) -> int:
+    """
+    Row of the listed strike closest to `ltp`, ties to the lower strike as in
+    InstrumentIndex.strike_window, so it matches the ATM the window was loaded with
+    """
+    i = int(np.searchsorted(strikes, ltp))
+    if i == len(strikes) or (i > 0 and ltp - strikes[i - 1] <= strikes[i] - ltp):
+        i -= 1
+    return i
+
+
+def _best_price(levels: list) -> float:
+    return levels[0].get('price', 0) if levels else 0
+
+
+def _apply_tick(options, row: int, tick: dict):
+    """Write a full-mode option tick into one row of a chain side in place (IV is solved on read)"""
+    if 'last_price' in tick:
+        options['ltp'][row] = tick['last_price']
+    if 'oi' in tick:
+        options['oi'][row] = tick['oi']
+    if 'volume_traded' in tick:
+        options['volume'][row] = tick['volume_traded']
+    depth = tick.get('depth')
+    if depth:
+        options['bid'][row] = _best_price(depth.get('buy', []))
+        options['ask'][row] = _best_price(depth.get('sell', []))
+
+
+def _on_ticks(ws, ticks):
+    now = time.time()
+    shifted = []
+    recorded = [] if recorder.is_recording() else None
+    with _lock:
+        for tick in ticks:
+            token = tick.get('instrument_token')
+            symbol = _underlying_tokens.get(token)
+            if symbol:
+                chain = _chains[symbol]
+                chain['ltp'] = tick['last_price']
+                chain['updated_at'] = now
+                chain['version'] += 1
+                # Compared on the listed strikes, not the nominal interval, which can differ or have gaps
+                window = chain['chain']
+                if window is None or not len(window) or window.strikes[_nearest_row(window.strikes, chain['ltp'])] != chain['window_atm']:
+                    shifted.append((symbol, chain['ltp']))
+                if recorded is not None:
+                    recorded.append((symbol, token, recorder.UNDERLYING, 0.0, tick['last_price'], 0, 0, 0.0, 0.0))
+                continue
+
+            entry = _option_tokens.get(token)
+            if entry:
+                symbol, row, side = entry
+                live = _chains[symbol]
+                options = live['chain'].side(side)
+                _apply_tick(options, row, tick)
+                live['version'] += 1
+                if recorded is not None:
+                    recorded.append((
+                        symbol, token, recorder.CE if side == 'ce' else recorder.PE, live['chain'].strikes[row],
+                        options['ltp'][row], options['oi'][row], options['volume'][row], options['bid'][row], options['ask'][row],
+                    ))
+
+    if recorded:
+        recorder.record_ticks(recorded, now)
+    for symbol, ltp in shifted:
+        _schedule_reload(symbol, ltp)
+
+
+def _on_connect(ws, response):
+    tokens = list(_underlying_tokens) + list(_option_tokens)
+    logger.info(f"✓ KiteTicker connected, subscribing {len(tokens)} instruments")
+    ws.subscribe(tokens)
+    ws.set_mode(ws.MODE_FULL, tokens)
+
+
+def _on_close(ws, code, reason):
+    logger.warning(f"KiteTicker closed ({code}): {reason}")
+
+
+def _on_error(ws, code, reason):
+    logger.error(f"✗ KiteTicker error ({code}): {reason}")
+
+
+def _on_noreconnect(ws):
+    """KiteTicker gave up reconnecting: forget it, so the next start() builds a new one"""
+    global _ticker, _ticker_token
+    logger.error("✗ KiteTicker stopped reconnecting")
+    if ws is _ticker:
+        _ticker, _ticker_token = None, None
+
+
+def _call_in_reactor(fn, *args):
+    """Twisted is not thread-safe: run subscription changes on the reactor thread"""
+    from twisted.internet import reactor
+    reactor.callFromThread(fn, *args)
+
+
+def _schedule_reload(symbol: str, ltp: float):
+    """Reload the option window around the new ATM off the ticker thread"""
+    with _lock:
+        if symbol in _reloading or _window_loader is None:
+            return
+        _reloading.add(symbol)
+    threading.Thread(target=_reload_window, args=(symbol, ltp), daemon=True, name=f"stream-{symbol}").start()
+
+
+def _reload_window(symbol: str, ltp: float):
+    try:
+        chain = _window_loader(symbol, ltp)
+        track_window(symbol, chain)
+    except Exception as e:
+        logger.error(f"✗ Could not reload stream window for {symbol}: {e}")
+    finally:
+        with _lock:
+            _reloading.discard(symbol)
+
+
+def track_window(symbol: str, chain: OptionChain):
+    """Seed the live chain from a REST snapshot and swap option subscriptions to its strikes"""
+    with _lock:
+        live = _chains[symbol]
+        old_tokens = {t for t, entry in _option_tokens.items() if entry[0] == symbol}
+        live_chain = chain.copy()
+        new_tokens = set()
+        for side in ('ce', 'pe'):
+            for row, token in enumerate(live_chain.column(side, 'token').tolist()):
+                if token:
+                    _option_tokens[token] = (symbol, row, side)
+                    new_tokens.add(token)
+        for token in old_tokens - new_tokens:
+            _option_tokens.pop(token, None)
+
+        live['chain'] = live_chain
+        live['window_atm'] = chain.atm_strike
+        live['version'] += 1
+        if live['ltp'] is None and chain.ltp:
+            live['ltp'] = chain.ltp
+
+    if _ticker is not None and _ticker.is_connected():
+        removed = list(old_tokens - new_tokens)
+        added = list(new_tokens - old_tokens)
+        if removed:
+            _call_in_reactor(_ticker.unsubscribe, removed)
+        if added:
+            _call_in_reactor(_ticker.subscribe, added)
+            _call_in_reactor(_ticker.set_mode, _ticker.MODE_FULL, added)
+    logger.info(f"✓ Streaming {symbol} window around ATM {chain.atm_strike} ({len(new_tokens)} options)")
+
+
+def start(api_key: str, access_token: str):
+    """
+    Connect KiteTicker in a background thread. A ticker already started with
+    this token is left alone, even while it is connecting or reconnecting, so
+    KiteTicker keeps its reconnect backoff; a new token replaces it.
+    """
+    global _ticker, _ticker_token
+    if _ticker is not None:
+        if _ticker_token == access_token:
+            return True
+        stop()
+    try:
+        _ticker = KiteTicker(api_key, access_token, root=KITE_TICKER_URL)
+        _ticker_token = access_token
+        _ticker.on_ticks = _on_ticks
+        _ticker.on_connect = _on_connect
+        _ticker.on_close = _on_close
+        _ticker.on_error = _on_error
+        _ticker.on_noreconnect = _on_noreconnect
+        _ticker.connect(threaded=True)
+        logger.info("✓ KiteTicker streaming started")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Failed to start KiteTicker: {e}")
+        _ticker, _ticker_token = None, None
+        return False
+
+
+def stop():
+    """Close the streaming connection"""
+    global _ticker, _ticker_token
+    if _ticker is not None:
+        try:
+            _ticker.stop_retry()
+            _ticker.close()
+        except Exception as e:
+            logger.debug(f"Error closing KiteTicker: {e}")
+        _ticker, _ticker_token = None, None
+
+
+def is_started() -> bool:
+    """True from start() until stop() (or until KiteTicker gives up), connected or not"""
+    return _ticker is not None
+
+
+def is_streaming() -> bool:
+    """True while the ticker is actually connected"""
+    return _ticker is not None and _ticker.is_connected()
+
+
+def _is_fresh(live: dict) -> bool:
+    return live['ltp'] is not None and time.time() - live['updated_at'] <= STREAM_MAX_AGE
+
+
+def get_live_ltp(symbol: str):
+    """Underlying LTP from the stream, or None if the stream is down or stale"""
+    with _lock:
+        live = _chains.get(symbol)
+        if live and _is_fresh(live):
+            return live['ltp']
+    return None
+
+
+def get_live_chain(symbol: str):
+    """Option chain snapshot (an OptionChain copy of the ATM ± N rows) from the stream, or None if it is down, stale or not loaded yet"""
+    with _lock:
+        live = _chains.get(symbol)
+        if not live or not _is_fresh(live) or live['chain'] is None or not len(live['chain']):
+            return None
+        ltp = live['ltp']
+        strikes = live['chain'].strikes
+        row = _nearest_row(strikes, ltp)
+        window = live['chain'].window(
+            strikes[max(row - OPTION_CHAIN_STRIKES_EACH_SIDE, 0)],
+            strikes[min(row + OPTION_CHAIN_STRIKES_EACH_SIDE, len(strikes) - 1)],
+        )
+        window.ltp = ltp
+        atm_strike = strikes[row].item()
+        window.atm_strike = int(atm_strike) if atm_strike.is_integer() else atm_strike
+        window.data_source = 'ZERODHA_LIVE'
+        window.version = f"stream-{live['version']}"  # Changes with every applied tick
+        return window
@@ -0,0 +1,236 @@
+"""
+Prometheus metrics that cost next to nothing until they are scraped.
+
+Instruments record into in-process counters and fixed-bucket histograms: an
+observation is a bisect and a few additions under a lock. Nothing is
+formatted until /metrics is requested. Cache hit/miss counters are not
+duplicated; TTLCache already keeps them, and registered caches are read at
+scrape time. Every worker process serves its own numbers, so aggregate them
+in Prometheus with sum().
+
+Families:
+- signal_stage_seconds{stage}                     option_chain, implied_vol, greeks, evaluate, serialize, total
+- kite_request_seconds{method, outcome}           every Kite REST call made through kite_io.kite_call
+- kite_retries_total{method, reason}               Kite calls retried by kite_scheduler after backoff
+- kite_quote_batch_instruments                     instruments per batched quote call
+- market_data_loads_total{kind, source}           live, stale, failed or simulated LTP / option chain loads
+- signal_evaluations_total{source}                data source of every evaluated chain snapshot
+- market_cache_*_total{cache, namespace}          hits, stale hits, misses, evictions, expirations
+- event_loop_lag_seconds                          how late the event loop runs a scheduled wakeup
+- http_request_seconds{method, endpoint, status}  time to response headers, per endpoint
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from config import METRICS_ENABLED, METRICS_LOOP_LAG_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+CACHE_COUNTERS = ('hits', 'stale_hits', 'misses', 'evictions', 'expirations')
+
+_registry = []
+_caches = {}  # name -> TTLCache read at scrape time
+_loop_monitor = None
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+
+    def observe(self, value: float, *labels):
+        if not METRICS_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *labels) -> _Timer:
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram('signal_stage_seconds', 'Seconds spent in each stage of signal generation', ('stage',))
+KITE_SECONDS = Histogram('kite_request_seconds', 'Kite REST call latency, including I/O pool queueing', ('method', 'outcome'))
+KITE_RETRIES = Counter('kite_retries_total', 'Kite calls retried after a 429, timeout or network error', ('method', 'reason'))
+QUOTE_BATCH_SIZE = Histogram('kite_quote_batch_instruments', 'Instruments per batched Kite quote call', buckets=BATCH_BUCKETS)
+DATA_LOADS = Counter('market_data_loads_total', 'LTP and option chain loads by data source', ('kind', 'source'))
+SIGNAL_SOURCES = Counter('signal_evaluations_total', 'Chain snapshots evaluated for signals, by data source', ('source',))
+LOOP_LAG = Histogram('event_loop_lag_seconds', 'Delay of scheduled event-loop wakeups beyond their due time')
+HTTP_SECONDS = Histogram('http_request_seconds', 'Seconds to response headers, per endpoint', ('method', 'endpoint', 'status'))
+
+
+def register_cache(name: str, cache):
+    """Expose a TTLCache's hit/miss counters (read from cache.stats() at scrape time)"""
+    _caches[name] = cache
+
+
+def _cache_lines() -> list:
+    lines = []
+    stats = {name: cache.stats()['namespaces'] for name, cache in _caches.items()}
+    for counter in CACHE_COUNTERS:
+        metric = f"market_cache_{counter}_total"
+        lines += [f"# HELP {metric} Cache {counter.replace('_', ' ')} per namespace", f"# TYPE {metric} counter"]
+        for name, namespaces in stats.items():
+            for namespace, counters in namespaces.items():
+                lines.append(f'{metric}{{cache="{_escape(name)}",namespace="{_escape(namespace)}"}} {counters[counter]}')
+    lines += ["# HELP market_cache_entries Entries currently cached per namespace", "# TYPE market_cache_entries gauge"]
+    for name, namespaces in stats.items():
+        for namespace, counters in namespaces.items():
+            lines.append(f'market_cache_entries{{cache="{_escape(name)}",namespace="{_escape(namespace)}"}} {counters["entries"]}')
+    return lines
+
+
+def render() -> str:
+    """Prometheus text exposition of every metric"""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    lines += _cache_lines()
+    return '\n'.join(lines) + '\n'
+
+
+async def _monitor_event_loop(interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(loop.time() - due, 0.0))
+
+
+def start_loop_monitor(interval: float = METRICS_LOOP_LAG_INTERVAL):
+    """Probe event-loop lag from the running loop (idempotent; call from async code)"""
+    global _loop_monitor
+    if not METRICS_ENABLED or _loop_monitor is not None:
+        return
+    _loop_monitor = asyncio.get_running_loop().create_task(_monitor_event_loop(interval))
+    logger.info(f"✓ Event-loop lag monitor started (every {interval}s)")
+
+
+def stop_loop_monitor():
+    global _loop_monitor
+    if _loop_monitor is not None:
+        _loop_monitor.cancel()
+        _loop_monitor = None
+
+
+def _endpoint(scope: dict) -> str:
+    """Route handler name, set by the router; bounded cardinality unlike raw paths"""
+    endpoint = scope.get('endpoint')
+    return getattr(endpoint, '__name__', 'unmatched') if endpoint is not None else 'unmatched'
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware observing each HTTP request's time to response headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        observed = False
+
+        async def timed_send(message):
+            nonlocal observed
+            if message['type'] == 'http.response.start' and not observed:
+                observed = True
+                HTTP_SECONDS.observe(time.perf_counter() - start, scope['method'], _endpoint(scope), str(message['status']))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            if not observed:
+                HTTP_SECONDS.observe(time.perf_counter() - start, scope['method'], _endpoint(scope), '500')
@@ -0,0 +1,244 @@
+"""
+Background signal precomputation with per-threshold memoization.
+
+A scheduler thread polls every configured symbol's option chain and, when
+the market snapshot changes (the chain's 'version'), recomputes the signals
+for the standard threshold sets. Results are memoized by
+(symbol, snapshot version, normalized thresholds), so serving /api/signal is
+a dictionary lookup. Custom threshold sets are computed on first use against
+the current snapshot and stay cached until the next one. Each memoized signal
+also keeps its encoded response body per format, so a snapshot is serialized
+once however many clients read it. Top-N candidate lists for the batch
+endpoint are memoized the same way, under the threshold key plus N.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from config import (
+    SYMBOL_MAPPING, DEFAULT_THRESHOLDS, DASHBOARD_THRESHOLDS,
+    PRECOMPUTE_INTERVAL, PRECOMPUTE_MAX_AGE, PRECOMPUTE_MAX_THRESHOLD_SETS,
+)
+from kite_io import run_blocking
+from cache import single_flight
+from serialization import dumps
+import metrics
+import signal_engine
+import zerodha_api
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTED_THRESHOLDS = [DEFAULT_THRESHOLDS, DASHBOARD_THRESHOLDS]
+
+_lock = threading.Lock()
+# symbol -> {'version', 'chain', 'checked_at', 'signals': OrderedDict(memo key -> signal or candidate list),
+#            'encoded': {(memo key, format) -> bytes, or a tuple of per-candidate bytes}}
+_snapshots = {}
+_thread = None
+_stop = threading.Event()
+
+
+def normalize_thresholds(params: dict) -> tuple:
+    """Hashable threshold key; missing thresholds take the STRONG BUY defaults"""
+    return tuple(
+        (name, float(params.get(name, default)))
+        for name, default in sorted(DEFAULT_THRESHOLDS.items())
+    )
+
+
+def _memo_key(params: dict, top_n: int = None) -> tuple:
+    """Memo key: the normalized thresholds, plus N for a top-N candidate list"""
+    key = normalize_thresholds(params)
+    return key if top_n is None else key + (('top_n', top_n),)
+
+
+def _encode(value, top_n: int, fmt: str):
+    """A signal encodes to bytes; a candidate list to per-candidate bytes the batch endpoint splices"""
+    with metrics.STAGE_SECONDS.time('serialize'):
+        if top_n is None:
+            return dumps(value, fmt)
+        return tuple(dumps(candidate, fmt) for candidate in value)
+
+
+def _version(chain):
+    return chain.version or id(chain)
+
+
+def _install_snapshot(symbol: str, chain) -> dict:
+    """Make `chain` the symbol's current snapshot (dropping older results) and return its memo"""
+    version = _version(chain)
+    now = time.monotonic()
+    with _lock:
+        snapshot = _snapshots.get(symbol)
+        if snapshot is None or snapshot['version'] != version:
+            snapshot = {'version': version, 'chain': chain, 'checked_at': now, 'signals': OrderedDict(), 'encoded': {}}
+            _snapshots[symbol] = snapshot
+        else:
+            snapshot['checked_at'] = now
+        return snapshot
+
+
+def _signal_for(symbol: str, snapshot: dict, params: dict, top_n: int = None):
+    """Memoized signal (or top-N candidates) for a snapshot; concurrent first uses compute it once"""
+    thresholds = normalize_thresholds(params)
+    key = _memo_key(params, top_n)
+    with _lock:
+        if key in snapshot['signals']:
+            snapshot['signals'].move_to_end(key)
+            return snapshot['signals'][key]
+
+    def compute():
+        if top_n is None:
+            signal = zerodha_api.generate_signal_from_market_data(
+                symbol, dict(thresholds), option_chain=snapshot['chain']
+            )
+        else:
+            signal = zerodha_api.generate_candidates_from_market_data(
+                symbol, dict(thresholds), top_n, option_chain=snapshot['chain']
+            )
+        with _lock:
+            snapshot['signals'][key] = signal
+            while len(snapshot['signals']) > PRECOMPUTE_MAX_THRESHOLD_SETS:
+                evicted, _ = snapshot['signals'].popitem(last=False)
+                for encoded_key in [k for k in snapshot['encoded'] if k[0] == evicted]:
+                    del snapshot['encoded'][encoded_key]
+        return signal
+
+    return single_flight(f"signal_{symbol}_{snapshot['version']}_{key}", compute)
+
+
+def _current(symbol: str, key: tuple):
+    """Current snapshot if it has a memoized signal for `key`, otherwise None. Caller holds the lock."""
+    snapshot = _snapshots.get(symbol)
+    if snapshot is None or time.monotonic() - snapshot['checked_at'] > PRECOMPUTE_MAX_AGE:
+        return None
+    if key not in snapshot['signals']:
+        return None
+    snapshot['signals'].move_to_end(key)
+    return snapshot
+
+
+def lookup(symbol: str, params: dict, top_n: int = None):
+    """(True, signal) if a current precomputed result exists, otherwise (False, None)"""
+    key = _memo_key(params, top_n)
+    with _lock:
+        snapshot = _current(symbol, key)
+        if snapshot is None:
+            return False, None
+        return True, snapshot['signals'][key]
+
+
+def lookup_encoded(symbol: str, params: dict, fmt: str, top_n: int = None):
+    """(True, signal, body) for a current precomputed result, encoding it on first use; else (False, None, None)"""
+    key = _memo_key(params, top_n)
+    with _lock:
+        snapshot = _current(symbol, key)
+        if snapshot is None:
+            return False, None, None
+        signal = snapshot['signals'][key]
+        body = snapshot['encoded'].get((key, fmt))
+    if body is None:
+        body = _encode(signal, top_n, fmt)
+        with _lock:
+            if key in snapshot['signals']:
+                snapshot['encoded'][(key, fmt)] = body
+    return True, signal, body
+
+
+def _current_snapshot(symbol: str):
+    """The symbol's current snapshot, re-checking the chain if it is older than PRECOMPUTE_MAX_AGE; None if unavailable"""
+    with _lock:
+        snapshot = _snapshots.get(symbol)
+        if snapshot is not None and time.monotonic() - snapshot['checked_at'] <= PRECOMPUTE_MAX_AGE:
+            return snapshot
+    with metrics.STAGE_SECONDS.time('option_chain'):
+        chain = zerodha_api.get_option_chain(symbol)
+    if chain is None or not len(chain):
+        logger.error(f"Failed to get option chain for {symbol}")
+        return None
+    return _install_snapshot(symbol, chain)
+
+
+def get_signal(symbol: str, params: dict, top_n: int = None):
+    """Signal (or top-N candidate list) for the current snapshot, computing and memoizing it if needed"""
+    found, signal = lookup(symbol, params, top_n)
+    if found:
+        return signal
+    snapshot = _current_snapshot(symbol)
+    if snapshot is None:
+        return None if top_n is None else []
+    return _signal_for(symbol, snapshot, params, top_n)
+
+
+def screen(symbol: str, profiles: list):
+    """
+    (chain, [signal or None per profile]) for K threshold param sets against
+    the current snapshot, evaluated together in one pass; (None, []) without a chain
+    """
+    snapshot = _current_snapshot(symbol)
+    if snapshot is None:
+        return None, []
+    chain = snapshot['chain']
+    return chain, signal_engine.evaluate_profiles(symbol, chain, profiles)
+
+
+async def get_signal_async(symbol: str, params: dict):
+    """Dictionary lookup when precomputed, otherwise compute off the event loop"""
+    found, signal = lookup(symbol, params)
+    if found:
+        return signal
+    return await run_blocking(get_signal, symbol, params)
+
+
+async def get_encoded_async(symbol: str, params: dict, fmt: str, top_n: int = None):
+    """
+    (signal, encoded body) for the current snapshot; the body is shared by
+    every request for it. With `top_n`, (candidate list, per-candidate bodies).
+    """
+    found, signal, body = lookup_encoded(symbol, params, fmt, top_n)
+    if found:
+        return signal, body
+    signal = await run_blocking(get_signal, symbol, params, top_n)
+    found, memoized, body = lookup_encoded(symbol, params, fmt, top_n)
+    if found and memoized is signal:
+        return signal, body
+    return signal, _encode(signal, top_n, fmt)
+
+
+def refresh(symbol: str):
+    """Check the symbol's snapshot and precompute the standard threshold sets if it changed"""
+    with metrics.STAGE_SECONDS.time('option_chain'):
+        chain = zerodha_api.get_option_chain(symbol)
+    if chain is None or not len(chain):
+        return
+    snapshot = _install_snapshot(symbol, chain)
+    for params in PRECOMPUTED_THRESHOLDS:
+        _signal_for(symbol, snapshot, params)
+
+
+def _run(interval: float):
+    while not _stop.is_set():
+        started = time.monotonic()
+        for symbol in SYMBOL_MAPPING:
+            try:
+                refresh(symbol)
+            except Exception as e:
+                logger.error(f"✗ Precompute failed for {symbol}: {e}")
+        _stop.wait(max(interval - (time.monotonic() - started), 0.05))
+
+
+def start(interval: float = PRECOMPUTE_INTERVAL):
+    """Run the precompute scheduler in a background thread (idempotent)"""
+    global _thread
+    if _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(interval,), daemon=True, name="signal-precompute")
+    _thread.start()
+    logger.info(f"✓ Signal precompute scheduler started ({len(SYMBOL_MAPPING)} symbols every {interval}s)")
+
+
+def stop():
+    global _thread
+    _stop.set()
+    _thread = None
@@ -0,0 +1,336 @@
+"""
+Append-only recorder for underlying ticks and option-chain snapshots.
+
+Everything the fetcher receives (REST LTPs and chains stored through
+_cache_store, and raw KiteTicker ticks) is appended to fixed-width binary
+segment files, so signals can be analysed and replayed after the fact.
+
+Callers only timestamp the event and put it on a bounded queue, which costs
+a few microseconds and never blocks: when the queue is full the event is
+dropped and counted. A background thread turns queued events into
+RECORD_DTYPE rows and appends them to one segment per IST trading day:
+
+    RECORDER_DIR/<YYYY-MM-DD>.seg   RECORD_DTYPE rows, no header
+    RECORDER_DIR/<YYYY-MM-DD>.idx   INDEX_DTYPE row per appended batch
+
+A chain snapshot is one UNDERLYING row (ltp = spot, strike = ATM strike)
+followed by a CE and a PE row per strike, all sharing `seq`. A streamed tick
+is one row with its own `seq`. Readers memory-map a segment and use the
+index to narrow a time range before touching any rows.
+"""
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from config import RECORDER_DIR, RECORDER_QUEUE_SIZE, RECORDER_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# kind
+UNDERLYING, CE, PE = 0, 1, 2
+# source
+SNAPSHOT, TICK = 0, 1
+
+RECORD_DTYPE = np.dtype([
+    ('ts', 'f8'),              # Epoch seconds when the data was received
+    ('seq', 'u8'),             # Event number: rows of one chain snapshot share it
+    ('symbol', 'S12'),
+    ('token', 'i8'),           # Kite instrument token, 0 if unknown
+    ('kind', 'u1'),            # UNDERLYING, CE or PE
+    ('source', 'u1'),          # SNAPSHOT or TICK
+    ('simulated', '?'),
+    ('strike', 'f8'),          # ATM strike on a snapshot's UNDERLYING row
+    ('ltp', 'f8'),
+    ('oi', 'i8'),
+    ('iv', 'f8'),
+    ('volume', 'i8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('time_to_expiry', 'f8'),  # Years, on a snapshot's UNDERLYING row
+])
+INDEX_DTYPE = np.dtype([('first_ts', 'f8'), ('last_ts', 'f8'), ('row', 'i8'), ('count', 'i8')])
+
+IST_OFFSET = 5.5 * 3600  # IST has no DST, so a trading day is a fixed UTC window
+SECONDS_PER_DAY = 86400
+BATCH_EVENTS = 4096  # Max queued events turned into one appended batch
+
+_queue = queue.Queue(maxsize=RECORDER_QUEUE_SIZE)
+_thread = None
+_stop = threading.Event()
+_seq_lock = threading.Lock()
+_seq = 0
+_stats = {'recorded': 0, 'dropped': 0, 'rows_written': 0, 'bytes_written': 0, 'batches': 0}
+
+
+def is_recording() -> bool:
+    return _thread is not None
+
+
+def _next_seq() -> int:
+    global _seq
+    with _seq_lock:
+        _seq += 1
+        return _seq
+
+
+def _offer(event: tuple):
+    """Queue an event without blocking; a full queue drops it"""
+    try:
+        _queue.put_nowait(event)
+        _stats['recorded'] += 1
+    except queue.Full:
+        _stats['dropped'] += 1
+
+
+def record_ltp(symbol: str, ltp: float, timestamp: float = None, simulated: bool = False):
+    """Record an underlying LTP snapshot"""
+    if _thread is not None:
+        _offer(('ltp', timestamp or time.time(), _next_seq(), symbol, ltp, simulated))
+
+
+def record_chain(symbol: str, chain, timestamp: float = None):
+    """Record an option-chain snapshot (an OptionChain that is no longer mutated)"""
+    if _thread is not None:
+        _offer(('chain', timestamp or time.time(), _next_seq(), symbol, chain))
+
+
+def record_ticks(ticks: list, timestamp: float = None):
+    """
+    Record streamed ticks, each a (symbol, token, kind, strike, ltp, oi, volume, bid, ask)
+    tuple (kind is UNDERLYING, CE or PE).
+    """
+    if _thread is not None and ticks:
+        _offer(('ticks', timestamp or time.time(), _next_seq(), ticks))
+
+
+def _ltp_rows(ts, seq, symbol, ltp, simulated) -> np.ndarray:
+    rows = np.zeros(1, dtype=RECORD_DTYPE)
+    rows[0] = (ts, seq, symbol.encode(), 0, UNDERLYING, SNAPSHOT, simulated, 0, ltp, 0, 0, 0, 0, 0, 0)
+    return rows
+
+
+def _chain_rows(ts, seq, symbol, chain) -> np.ndarray:
+    """One UNDERLYING row, then CE and PE interleaved strike by strike"""
+    n = len(chain)
+    rows = np.zeros(1 + 2 * n, dtype=RECORD_DTYPE)
+    rows['ts'] = ts
+    rows['seq'] = seq
+    rows['symbol'] = symbol.encode()
+    rows['simulated'] = chain.data_source == 'SIMULATED'
+    rows[0]['ltp'] = chain.ltp or 0
+    rows[0]['strike'] = chain.atm_strike or 0
+    rows[0]['time_to_expiry'] = chain.time_to_expiry or 0
+    options = rows[1:]
+    options['kind'][0::2] = CE
+    options['kind'][1::2] = PE
+    options['strike'] = np.repeat(chain.strikes, 2)
+    for field in ('ltp', 'oi', 'iv', 'volume', 'bid', 'ask', 'token'):
+        options[field] = chain.interleaved(field)
+    return rows
+
+
+def _tick_rows(ts, seq, ticks) -> np.ndarray:
+    rows = np.zeros(len(ticks), dtype=RECORD_DTYPE)
+    for i, (symbol, token, kind, strike, ltp, oi, volume, bid, ask) in enumerate(ticks):
+        rows[i] = (ts, seq, symbol.encode(), token, kind, TICK, False, strike, ltp, oi, 0, volume, bid, ask, 0)
+    return rows
+
+
+def _rows(event) -> np.ndarray:
+    kind, ts, seq = event[:3]
+    if kind == 'ltp':
+        return _ltp_rows(ts, seq, *event[3:])
+    if kind == 'chain':
+        return _chain_rows(ts, seq, *event[3:])
+    return _tick_rows(ts, seq, *event[3:])
+
+
+def _day_number(ts):
+    return np.floor((np.asarray(ts) + IST_OFFSET) / SECONDS_PER_DAY).astype(np.int64)
+
+
+def _day_name(day_number: int) -> str:
+    return datetime.fromtimestamp(int(day_number) * SECONDS_PER_DAY, timezone.utc).date().isoformat()
+
+
+def trading_day(ts: float = None) -> str:
+    """IST date (YYYY-MM-DD) a timestamp's rows are stored under"""
+    return _day_name(_day_number(time.time() if ts is None else ts))
+
+
+def _paths(day: str, directory: str = None) -> tuple:
+    directory = directory or RECORDER_DIR
+    return os.path.join(directory, f"{day}.seg"), os.path.join(directory, f"{day}.idx")
+
+
+class _Segment:
+    """Open append handles for one day's segment and index"""
+
+    def __init__(self, day: str):
+        self.day = day
+        seg_path, idx_path = _paths(day)
+        self.seg = open(seg_path, 'ab')
+        self.idx = open(idx_path, 'ab')
+        # A crash can leave a partial trailing row; cut it so rows stay aligned
+        for handle, dtype in ((self.seg, RECORD_DTYPE), (self.idx, INDEX_DTYPE)):
+            size = os.fstat(handle.fileno()).st_size
+            if size % dtype.itemsize:
+                handle.truncate(size - size % dtype.itemsize)
+        self.rows = os.fstat(self.seg.fileno()).st_size // RECORD_DTYPE.itemsize
+
+    def append(self, rows: np.ndarray):
+        self.seg.write(rows.tobytes())
+        # The index is written after its rows, so it never points past the data
+        entry = np.array([(rows['ts'].min(), rows['ts'].max(), self.rows, len(rows))], dtype=INDEX_DTYPE)
+        self.idx.write(entry.tobytes())
+        self.rows += len(rows)
+
+    def flush(self):
+        self.seg.flush()
+        self.idx.flush()
+
+    def close(self):
+        self.seg.close()
+        self.idx.close()
+
+
+def _write(segments: dict, events: list):
+    rows = np.concatenate([_rows(event) for event in events])
+    rows = rows[np.argsort(rows['ts'], kind='stable')]
+    days = _day_number(rows['ts'])
+    for day_number in np.unique(days):
+        day = _day_name(day_number)
+        segment = segments.get(day)
+        if segment is None:
+            # A new day rolls the segment; yesterday's is finished
+            for old in segments.values():
+                old.close()
+            segments.clear()
+            segment = segments[day] = _Segment(day)
+        part = rows[days == day_number]
+        segment.append(part)
+        _stats['rows_written'] += len(part)
+        _stats['bytes_written'] += part.nbytes
+    _stats['batches'] += 1
+
+
+def _drain(limit: int) -> list:
+    events = []
+    while len(events) < limit:
+        try:
+            events.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return events
+
+
+def _run(flush_interval: float):
+    os.makedirs(RECORDER_DIR, exist_ok=True)
+    segments = {}
+    try:
+        while not _stop.is_set() or not _queue.empty():
+            try:
+                first = _queue.get(timeout=flush_interval)
+            except queue.Empty:
+                continue
+            events = [first] + _drain(BATCH_EVENTS - 1)
+            try:
+                _write(segments, events)
+                for segment in segments.values():
+                    segment.flush()
+            except Exception as e:
+                logger.error(f"✗ Recorder failed to write {len(events)} events: {e}")
+    finally:
+        for segment in segments.values():
+            segment.close()
+
+
+def start(flush_interval: float = RECORDER_FLUSH_INTERVAL):
+    """Start the background writer (idempotent)"""
+    global _thread
+    if _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(flush_interval,), daemon=True, name="recorder")
+    _thread.start()
+    logger.info(f"✓ Recording ticks and chains to {RECORDER_DIR}")
+
+
+def stop(timeout: float = 5.0):
+    """Stop accepting events, write what is queued and close the segment"""
+    global _thread
+    thread, _thread = _thread, None
+    if thread is not None:
+        _stop.set()
+        thread.join(timeout)
+
+
+def stats() -> dict:
+    return {**_stats, 'queued': _queue.qsize(), 'recording': is_recording()}
+
+
+# Reading
+
+def days(directory: str = None) -> list:
+    """Recorded trading days, oldest first"""
+    paths = glob.glob(os.path.join(directory or RECORDER_DIR, '*.seg'))
+    return sorted(os.path.basename(path)[:-len('.seg')] for path in paths)
+
+
+def open_segment(day: str, directory: str = None) -> np.ndarray:
+    """Read-only memory map of a day's rows (rows appended later are not visible)"""
+    seg_path, _ = _paths(day, directory)
+    rows = os.path.getsize(seg_path) // RECORD_DTYPE.itemsize if os.path.exists(seg_path) else 0
+    if rows == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(seg_path, dtype=RECORD_DTYPE, mode='r', shape=(rows,))
+
+
+def load_index(day: str, directory: str = None) -> np.ndarray:
+    _, idx_path = _paths(day, directory)
+    if not os.path.exists(idx_path):
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.fromfile(idx_path, dtype=INDEX_DTYPE, count=os.path.getsize(idx_path) // INDEX_DTYPE.itemsize)
+
+
+def read(day: str, start: float = None, end: float = None, symbol: str = None, token: int = None,
+         directory: str = None) -> np.ndarray:
+    """
+    A day's rows with start <= ts <= end, optionally for one symbol and/or
+    instrument token. The index narrows the mapped range first; with no
+    filters the result is a zero-copy view of the mapping, otherwise only the
+    matching rows are copied.
+    """
+    rows = open_segment(day, directory)
+    lo, hi = 0, len(rows)
+    if (start is not None or end is not None) and hi:
+        index = load_index(day, directory)
+        index = index[index['row'] < hi]
+        selected = np.ones(len(index), dtype=bool)
+        if start is not None:
+            selected &= index['last_ts'] >= start
+        if end is not None:
+            selected &= index['first_ts'] <= end
+        batches = np.flatnonzero(selected)
+        if not len(batches):
+            return rows[0:0]
+        lo = int(index['row'][batches[0]])
+        hi = min(int(index['row'][batches[-1]] + index['count'][batches[-1]]), hi)
+    view = rows[lo:hi]
+
+    mask = None
+    if start is not None:
+        mask = view['ts'] >= start
+    if end is not None:
+        mask = (view['ts'] <= end) if mask is None else mask & (view['ts'] <= end)
+    if symbol is not None:
+        match = view['symbol'] == symbol.encode()
+        mask = match if mask is None else mask & match
+    if token is not None:
+        match = view['token'] == token
+        mask = match if mask is None else mask & match
+    return view if mask is None else view[mask]
@@ -0,0 +1,416 @@
+"""
+Historical replay of the signal logic.
+
+Feeds recorded market data (recorder.py segments) or imported CSV/candle
+data through OptionChain and the same evaluation steps as evaluate_signal
+(signal_engine's chain_columns, row_greeks, qualify and signal_dict), as fast as the data can
+be read: market time comes from the data, never from the wall clock, and
+nothing touches Kite. Chains are rebuilt in order, then thousands of
+snapshots are evaluated per vectorized pass, so the per-snapshot cost is not
+dominated by NumPy call overhead on a 20-row chain.
+
+Trading days are independent, so they are replayed in parallel by a process
+pool. Each day produces a timeline of signal entries (a new best candidate
+appearing) with the forward P&L of buying it at its LTP and exiting at the
+first snapshot at or after each horizon.
+
+CSV input has one row per option per timestamp:
+    timestamp, symbol, spot, strike, option_type (CE/PE), ltp or close
+and optionally oi, iv, volume, bid, ask, token, and time_to_expiry (years)
+or expiry (YYYY-MM-DD). Naive timestamps are IST. Missing IVs are solved
+from the option prices.
+
+    python replay.py --days 2025-01-06 2025-01-07 --horizons 5,15,30
+    python replay.py --csv minute_chains.csv --param confidence_min=0.7 --output replay.json
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from config import DEFAULT_THRESHOLDS, RECORDER_DIR
+from chain import OptionChain, OPTION_FIELDS
+import implied_vol
+import instruments
+import recorder
+import signal_engine
+from implied_vol import SECONDS_PER_YEAR
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZONS = (5, 15, 30)  # minutes
+BATCH_FRAMES = 4096  # Frames evaluated per vectorized pass
+SIDE_NAMES = {recorder.CE: 'ce', recorder.PE: 'pe'}
+
+
+def _build_chain(symbol: str, seq: int, rows: np.ndarray) -> OptionChain:
+    """OptionChain from one recorded snapshot (an UNDERLYING row plus CE/PE rows in any order)"""
+    kinds = rows['kind']
+    underlying = rows[kinds == recorder.UNDERLYING]
+    strikes = np.unique(rows['strike'][kinds != recorder.UNDERLYING])
+    spot = float(underlying['ltp'][0]) if len(underlying) else 0.0
+    atm = float(underlying['strike'][0]) if len(underlying) and underlying['strike'][0] else None
+    if atm is None and len(strikes) and spot:
+        atm = float(strikes[np.argmin(np.abs(strikes - spot))])
+    time_to_expiry = float(underlying['time_to_expiry'][0]) if len(underlying) else 0.0
+    chain = OptionChain(
+        symbol, strikes, spot, atm, data_source='SIMULATED' if rows['simulated'].any() else 'REPLAY',
+        version=int(seq), time_to_expiry=time_to_expiry or None,
+    )
+    for kind, side in SIDE_NAMES.items():
+        part = rows[kinds == kind]
+        target = chain.side(side)
+        # Recorded snapshots list every strike in order; only imported data needs placing
+        rows_at = slice(None) if len(part) == len(strikes) and np.array_equal(part['strike'], strikes) \
+            else np.searchsorted(strikes, part['strike'])
+        for field in OPTION_FIELDS:
+            target[field][rows_at] = part[field]
+    return chain
+
+
+def _apply_tick(chain: OptionChain, row) -> bool:
+    """Apply one recorded option tick to the symbol's current chain; False if it has no such option"""
+    i = chain.row_of(row['strike'])
+    if i < 0:
+        return False
+    options = chain.side(SIDE_NAMES[int(row['kind'])])
+    for field in ('ltp', 'oi', 'volume', 'bid', 'ask'):
+        options[field][i] = row[field]
+    return True
+
+
+def _market_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, instruments.IST).strftime('%H:%M:%S')
+
+
+def _events(rows: np.ndarray):
+    """Rows grouped into recorded events (one snapshot or one tick batch), in market-time order"""
+    if not len(rows):
+        return
+    rows = rows[np.lexsort((rows['kind'], rows['seq'], rows['ts']))]
+    starts = np.concatenate(([0], np.flatnonzero(rows['seq'][1:] != rows['seq'][:-1]) + 1, [len(rows)]))
+    for a, b in zip(starts[:-1].tolist(), starts[1:].tolist()):
+        yield rows[a:b]
+
+
+def _frames(rows: np.ndarray, interval: float) -> list:
+    """
+    Rebuild each symbol's chain through the day and return the evaluation
+    points as (ts, symbol, chain, spot) frames, at most one per symbol per
+    `interval` seconds. A frame's chain is never mutated afterwards: ticks
+    copy the chain first if it was already handed out.
+    """
+    chains, spots, shared, last_frame = {}, {}, set(), {}
+    frames = []
+    for event in _events(rows):
+        ts = float(event['ts'][0])
+        touched = set()
+        if event['source'][0] == recorder.SNAPSHOT:
+            symbol = event['symbol'][0].decode()
+            if len(event) == 1:
+                # LTP-only snapshot
+                spots[symbol] = float(event['ltp'][0])
+            else:
+                chains[symbol] = _build_chain(symbol, event['seq'][0], event)
+                spots[symbol] = chains[symbol].ltp
+                shared.discard(symbol)
+            touched.add(symbol)
+        else:
+            for row in event:
+                symbol = row['symbol'].decode()
+                if row['kind'] == recorder.UNDERLYING:
+                    spots[symbol] = float(row['ltp'])
+                    touched.add(symbol)
+                    continue
+                if symbol not in chains:
+                    continue
+                if symbol in shared:
+                    chains[symbol] = chains[symbol].copy()
+                    shared.discard(symbol)
+                if _apply_tick(chains[symbol], row):
+                    touched.add(symbol)
+
+        for symbol in touched:
+            if symbol not in chains or ts - last_frame.get(symbol, -np.inf) < interval:
+                continue
+            last_frame[symbol] = ts
+            frames.append((ts, symbol, chains[symbol], spots[symbol]))
+            shared.add(symbol)
+    return frames
+
+
+def _evaluate_frames(frames: list, thresholds: dict):
+    """
+    Evaluate many frames in one vectorized pass with the live path's
+    primitives (chain_columns, row_greeks, qualify). Returns the per-row
+    arrays, each frame's row offset, its (spot, data_source) and its best
+    row (-1 if nothing qualified), which is the row evaluate_signal picks.
+    """
+    inputs = [signal_engine.chain_inputs(symbol, chain, spot) for _, symbol, chain, spot in frames]
+    columns = [signal_engine.chain_columns(chain) for _, _, chain, _ in frames]
+    sizes = np.array([len(cols[0]) for cols in columns])
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    strikes, is_call, oi, iv = (np.concatenate([cols[i] for cols in columns]) for i in range(4))
+    spot = np.repeat([ltp for ltp, _, _ in inputs], sizes)
+    time_to_expiry = np.repeat([t for _, t, _ in inputs], sizes)
+
+    # Imported data may carry prices without IVs: solve those rows
+    missing = iv <= 0
+    if missing.any():
+        chains = [chain for _, _, chain, _ in frames]
+        price = implied_vol.option_price(*(np.concatenate([c.interleaved(f) for c in chains]) for f in ('ltp', 'bid', 'ask')))
+        missing &= price > 0
+        iv = iv.copy()
+        solved = implied_vol.implied_volatility(
+            price[missing], spot[missing], strikes[missing], time_to_expiry[missing], is_call[missing]
+        )
+        iv[missing] = np.round(np.nan_to_num(solved, nan=0.0), 4)
+
+    vega, gamma, theta, delta = signal_engine.row_greeks(spot, strikes, iv, time_to_expiry, is_call)
+    qualified, confidence = signal_engine.qualify(vega, gamma, theta, delta, oi, iv, thresholds)
+
+    # First row with the highest qualified confidence in each frame (ties keep row order, as argmax does)
+    best = np.full(len(frames), -1)
+    frame_of = np.repeat(np.arange(len(frames)), sizes)
+    score = np.where(qualified, confidence, -1.0)
+    nonempty = sizes > 0
+    if not nonempty.any():
+        return (vega, gamma, theta, delta, confidence, iv), offsets, inputs, best
+    top = np.full(len(frames), -1.0)
+    top[nonempty] = np.maximum.reduceat(score, offsets[:-1][nonempty])
+    candidates = np.flatnonzero(qualified & (score == top[frame_of]))
+    frame_ids, first = np.unique(frame_of[candidates], return_index=True)
+    best[frame_ids] = candidates[first] - offsets[frame_ids]
+    return (vega, gamma, theta, delta, confidence, iv), offsets, inputs, best
+
+
+def _forward_price(frames_by_symbol: dict, symbol: str, option_type: str, strike: float, ts: float):
+    """LTP of an option at the first frame at or after `ts` that still lists it, or None"""
+    times, chains = frames_by_symbol[symbol]
+    for i in range(int(np.searchsorted(times, ts, side='left')), len(chains)):
+        row = chains[i].row_of(strike)
+        if row >= 0:
+            ltp = float(chains[i].side(option_type)['ltp'][row])
+            return ltp if ltp > 0 else None
+    return None
+
+
+def replay_rows(day: str, rows: np.ndarray, params: dict, horizons=DEFAULT_HORIZONS, interval: float = 0.0,
+                batch_frames: int = BATCH_FRAMES) -> dict:
+    """
+    Replay one day of RECORD_DTYPE rows. Each symbol is evaluated after every
+    snapshot or tick batch (at most once per `interval` seconds of market
+    time); a signal whose option differs from the symbol's previous signal is
+    a timeline entry, with forward P&L at each horizon (in minutes).
+    """
+    started = time.perf_counter()
+    thresholds = signal_engine.signal_thresholds(params)
+    frames = _frames(rows, interval)
+    timeline = []
+    current = {}
+
+    for start in range(0, len(frames), batch_frames):
+        batch = frames[start:start + batch_frames]
+        (vega, gamma, theta, delta, confidence, iv), offsets, inputs, best = _evaluate_frames(batch, thresholds)
+        for i, (ts, symbol, chain, _) in enumerate(batch):
+            row = int(best[i])
+            if row < 0:
+                current[symbol] = None
+                continue
+            key = (row % 2, float(chain.strikes[row // 2]))
+            if key == current.get(symbol):
+                continue
+            current[symbol] = key
+            # The signal reports the frame's IVs, so write solved ones back into this chain
+            a, b = offsets[i], offsets[i + 1]
+            chain.ce['iv'], chain.pe['iv'] = iv[a:b:2], iv[a + 1:b:2]
+            k = a + row
+            ltp, _, data_source = inputs[i]
+            signal = signal_engine.signal_dict(
+                symbol, chain, row, vega[k], gamma[k], theta[k], delta[k], confidence[k], ltp, data_source
+            )
+            signal['timestamp'] = _market_time(ts)
+            timeline.append({'day': day, 'ts': ts, 'signal': signal})
+
+    frames_by_symbol = {}
+    for ts, symbol, chain, _ in frames:
+        times, chains = frames_by_symbol.setdefault(symbol, ([], []))
+        times.append(ts)
+        chains.append(chain)
+    frames_by_symbol = {symbol: (np.array(times), chains) for symbol, (times, chains) in frames_by_symbol.items()}
+    for entry in timeline:
+        signal = entry['signal']
+        entry_price = signal['ltp_option']
+        forward = {}
+        for minutes in horizons:
+            exit_price = _forward_price(
+                frames_by_symbol, signal['symbol'], signal['option_type'], float(signal['strike']), entry['ts'] + minutes * 60
+            )
+            if exit_price is None or not entry_price:
+                forward[f"{minutes}m"] = None
+                continue
+            pnl = exit_price - entry_price
+            forward[f"{minutes}m"] = {'exit': exit_price, 'pnl': round(pnl, 2), 'return': round(pnl / entry_price, 4)}
+        entry['forward'] = forward
+
+    return {
+        'day': day,
+        'frames': len(frames),
+        'rows': len(rows),
+        'timeline': timeline,
+        'elapsed': round(time.perf_counter() - started, 3),
+    }
+
+
+def load_csv(path: str) -> np.ndarray:
+    """RECORD_DTYPE rows (one UNDERLYING row per timestamp and symbol, plus the options) from a CSV file"""
+    import pandas as pd
+
+    EPOCH = pd.Timestamp(0, tz='UTC')
+    df = pd.read_csv(path)
+    df.columns = [column.strip().lower() for column in df.columns]
+    if 'ltp' not in df and 'close' in df:
+        df['ltp'] = df['close']
+    missing = {'timestamp', 'symbol', 'spot', 'strike', 'option_type', 'ltp'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path}: missing columns {sorted(missing)}")
+
+    if pd.api.types.is_numeric_dtype(df['timestamp']):
+        ts = df['timestamp'].astype(float)
+    else:
+        stamps = pd.to_datetime(df['timestamp'])
+        if stamps.dt.tz is None:
+            stamps = stamps.dt.tz_localize(instruments.IST)
+        ts = (stamps - EPOCH).dt.total_seconds()
+    df['ts'] = ts.to_numpy()
+    df['symbol'] = df['symbol'].astype(str).str.upper()
+    if 'time_to_expiry' not in df:
+        if 'expiry' in df:
+            close = pd.to_datetime(df['expiry']).dt.tz_localize(instruments.IST) + pd.Timedelta(hours=15, minutes=30)
+            df['time_to_expiry'] = ((close - EPOCH).dt.total_seconds() - df['ts']).clip(lower=60.0) / SECONDS_PER_YEAR
+        else:
+            df['time_to_expiry'] = 0.0
+    df['seq'] = df.groupby(['ts', 'symbol'], sort=True).ngroup() + 1
+
+    options = np.zeros(len(df), dtype=recorder.RECORD_DTYPE)
+    options['ts'] = df['ts']
+    options['seq'] = df['seq']
+    options['symbol'] = df['symbol'].str.encode('ascii')
+    options['kind'] = np.where(df['option_type'].astype(str).str.upper() == 'CE', recorder.CE, recorder.PE)
+    options['strike'] = df['strike']
+    options['ltp'] = df['ltp']
+    for field in ('oi', 'iv', 'volume', 'bid', 'ask', 'token'):
+        if field in df:
+            options[field] = df[field].fillna(0)
+
+    first = df.groupby('seq', sort=True).first()
+    underlying = np.zeros(len(first), dtype=recorder.RECORD_DTYPE)
+    underlying['ts'] = first['ts']
+    underlying['seq'] = first.index
+    underlying['symbol'] = first['symbol'].str.encode('ascii')
+    underlying['kind'] = recorder.UNDERLYING
+    underlying['ltp'] = first['spot']
+    underlying['time_to_expiry'] = first['time_to_expiry']
+    return np.concatenate((underlying, options))
+
+
+def _split_days(rows: np.ndarray) -> dict:
+    days = recorder._day_number(rows['ts'])
+    return {recorder._day_name(day): rows[days == day] for day in np.unique(days)}
+
+
+def _run_task(task: tuple, params: dict, horizons, interval: float) -> dict:
+    logging.getLogger('signal_engine').setLevel(logging.WARNING)  # signal_dict logs every match
+    day, source = task
+    rows = recorder.open_segment(day, source) if isinstance(source, str) else source
+    return replay_rows(day, rows, params, horizons, interval)
+
+
+def summarize(results: list, horizons=DEFAULT_HORIZONS) -> dict:
+    """Forward P&L per horizon over every entry that has an exit price"""
+    entries = [entry for result in results for entry in result['timeline']]
+    summary = {
+        'days': len(results),
+        'evaluations': sum(result['frames'] for result in results),
+        'signals': len(entries),
+        'by_symbol': {},
+        'forward': {},
+    }
+    for entry in entries:
+        symbol = entry['signal']['symbol']
+        summary['by_symbol'][symbol] = summary['by_symbol'].get(symbol, 0) + 1
+    for minutes in horizons:
+        outcomes = [entry['forward'][f"{minutes}m"] for entry in entries if entry['forward'].get(f"{minutes}m")]
+        pnl = np.array([outcome['pnl'] for outcome in outcomes])
+        returns = np.array([outcome['return'] for outcome in outcomes])
+        summary['forward'][f"{minutes}m"] = {
+            'trades': len(outcomes),
+            'total_pnl': round(float(pnl.sum()), 2),
+            'mean_pnl': round(float(pnl.mean()), 2) if len(pnl) else None,
+            'mean_return': round(float(returns.mean()), 4) if len(returns) else None,
+            'hit_rate': round(float((pnl > 0).mean()), 3) if len(pnl) else None,
+        }
+    return summary
+
+
+def replay(days: list = None, csv_paths: list = None, params: dict = None, horizons=DEFAULT_HORIZONS,
+           interval: float = 0.0, workers: int = None, directory: str = None) -> dict:
+    """
+    Replay recorded days (from `directory`, default RECORDER_DIR) and/or CSV
+    files across a process pool. Returns {'summary', 'days': [per-day results]}.
+    """
+    params = dict(params or DEFAULT_THRESHOLDS)
+    directory = directory or RECORDER_DIR
+    tasks = [(day, directory) for day in (days or [])]
+    for path in csv_paths or []:
+        tasks.extend(_split_days(load_csv(path)).items())
+    started = time.perf_counter()
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks) or 1)
+    if workers <= 1:
+        results = [_run_task(task, params, horizons, interval) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_task, task, params, horizons, interval) for task in tasks]
+            results = [future.result() for future in futures]
+
+    results.sort(key=lambda result: result['day'])
+    summary = summarize(results, horizons)
+    summary['workers'] = workers
+    summary['elapsed'] = round(time.perf_counter() - started, 3)
+    return {'summary': summary, 'days': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or imported market data through the signal logic")
+    parser.add_argument('--days', nargs='*', help="Recorded trading days (YYYY-MM-DD); default: all recorded days unless --csv is given")
+    parser.add_argument('--csv', nargs='*', default=[], help="CSV files to import (one row per option per timestamp)")
+    parser.add_argument('--recordings', default=RECORDER_DIR, help="Recorder directory")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help="Override a threshold, e.g. confidence_min=0.7 (repeatable)")
+    parser.add_argument('--horizons', default=','.join(map(str, DEFAULT_HORIZONS)), help="Forward P&L horizons in minutes")
+    parser.add_argument('--interval', type=float, default=0.0, help="Min seconds of market time between evaluations of a symbol")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument('--output', help="Write the full result (timeline included) as JSON")
+    args = parser.parse_args()
+
+    params = dict(DEFAULT_THRESHOLDS)
+    for override in args.param:
+        name, _, value = override.partition('=')
+        params[name.strip()] = float(value)
+    days = args.days if args.days is not None else ([] if args.csv else recorder.days(args.recordings))
+    horizons = [int(h) for h in args.horizons.split(',') if h.strip()]
+
+    result = replay(days, args.csv, params, horizons, args.interval, args.workers, args.recordings)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(dumps(result))
+    print(dumps(result['summary']).decode())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,92 @@
+"""
+Response serialization for the signal endpoints.
+
+Signals are encoded to bytes once and the bytes are reused for every client,
+instead of FastAPI running each response dict through jsonable_encoder and
+json.dumps per request. precompute keeps the encoded form next to each
+memoized signal, so a snapshot is encoded at most once per format.
+
+Formats (picked from the request's Accept header):
+- 'json':    orjson when installed, otherwise the stdlib encoder
+- 'msgpack': MessagePack for internal consumers (application/msgpack)
+"""
+import json
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, MessagePack is only offered when installed
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+MEDIA_TYPES = {JSON: 'application/json', MSGPACK: 'application/msgpack'}
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def _default(value):
+    """NumPy scalars and arrays that slip into a payload"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(obj, fmt: str = JSON) -> bytes:
+    """Encode `obj` in the given format"""
+    if fmt == MSGPACK:
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def dumps_text(obj) -> str:
+    """JSON text for WebSocket text frames and SSE `data:` lines"""
+    return dumps(obj, JSON).decode()
+
+
+def negotiate(accept: str = None) -> str:
+    """Response format for an Accept header; JSON unless MessagePack is asked for and available"""
+    if accept and msgpack is not None:
+        for part in accept.split(','):
+            if part.split(';')[0].strip().lower() in MSGPACK_MEDIA_TYPES:
+                return MSGPACK
+    return JSON
+
+
+def encoded_response(body: bytes, fmt: str = JSON, status_code: int = 200) -> Response:
+    """Response around already-encoded bytes (varies by Accept, since the format does)"""
+    return Response(content=body, status_code=status_code, media_type=MEDIA_TYPES[fmt], headers={'Vary': 'Accept'})
+
+
+def _msgpack_array_header(n: int) -> bytes:
+    if n < 16:
+        return bytes([0x90 | n])
+    if n < 1 << 16:
+        return b'\xdc' + n.to_bytes(2, 'big')
+    return b'\xdd' + n.to_bytes(4, 'big')
+
+
+def dumps_list(items, fmt: str = JSON) -> bytes:
+    """Splice already-encoded items into an encoded list without decoding them"""
+    items = list(items)
+    if fmt == MSGPACK:
+        return _msgpack_array_header(len(items)) + b''.join(items)
+    return b'[' + b','.join(items) + b']'
+
+
+def dumps_envelope(key: str, items, fmt: str = JSON) -> bytes:
+    """Encoded {key: [items...], 'count': n} built from already-encoded items"""
+    items = list(items)
+    body = dumps_list(items, fmt)
+    if fmt == MSGPACK:
+        return b'\x82' + dumps(key, fmt) + body + dumps('count', fmt) + dumps(len(items), fmt)
+    return b'{' + dumps(key) + b':' + body + b',"count":' + str(len(items)).encode() + b'}'
@@ -0,0 +1,103 @@
+"""
+Persisted Zerodha session shared by every worker process.
+
+Only the worker that handles /auth/callback sees the request token, so the
+access token it gets back is written to SESSION_FILE (mode 0600, atomic
+rename). Every worker polls the file's mtime and adopts a new token, and a
+restarted worker restores it, until Kite invalidates it at 6 AM IST the next
+morning. The file is tied to ZERODHA_API_KEY; a session for another key is
+ignored.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta, time as dt_time
+from config import SESSION_FILE, ZERODHA_API_KEY
+from instruments import IST
+
+logger = logging.getLogger(__name__)
+
+SESSION_RESET_TIME = dt_time(6, 0)  # Kite flushes every access token daily at 6 AM IST
+
+_seen_mtime = None
+
+
+def expiry_after(moment: datetime) -> datetime:
+    """The first 6 AM IST strictly after `moment`"""
+    local = moment.astimezone(IST)
+    reset = datetime.combine(local.date(), SESSION_RESET_TIME, tzinfo=IST)
+    return reset if local < reset else reset + timedelta(days=1)
+
+
+def save(access_token: str, user_id: str = None) -> dict:
+    """Persist a fresh session for every worker (and the next restart)"""
+    global _seen_mtime
+    now = datetime.now(IST)
+    session = {
+        'access_token': access_token,
+        'api_key': ZERODHA_API_KEY,
+        'user_id': user_id,
+        'created_at': now.isoformat(),
+        'expires_at': expiry_after(now).isoformat(),
+    }
+    directory = os.path.dirname(SESSION_FILE)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    tmp = f"{SESSION_FILE}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # in case a stale temp file had looser permissions
+    with os.fdopen(fd, 'w') as f:
+        json.dump(session, f)
+    os.replace(tmp, SESSION_FILE)
+    _seen_mtime = os.stat(SESSION_FILE).st_mtime_ns
+    logger.info(f"✓ Session saved to {SESSION_FILE} (expires {session['expires_at']})")
+    return session
+
+
+def load() -> dict:
+    """The stored session if it is for our API key and not yet expired, otherwise None"""
+    try:
+        with open(SESSION_FILE) as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"✗ Unreadable session file {SESSION_FILE}: {e}")
+        return None
+    if session.get('api_key') != ZERODHA_API_KEY or not session.get('access_token'):
+        return None
+    if datetime.fromisoformat(session['expires_at']) <= datetime.now(IST):
+        logger.info(f"Stored session expired at {session['expires_at']}")
+        return None
+    return session
+
+
+def clear(access_token: str = None):
+    """Remove the stored session; with `access_token`, only if it is still that session"""
+    global _seen_mtime
+    if access_token is not None:
+        session = load()
+        if session is None or session['access_token'] != access_token:
+            return
+    try:
+        os.remove(SESSION_FILE)
+        logger.info("✓ Stored session removed")
+    except FileNotFoundError:
+        pass
+    _seen_mtime = None
+
+
+def poll():
+    """
+    (True, session or None) when the file changed since this process last
+    looked (written, replaced or removed), otherwise (False, None). A stat
+    call, cheap enough to run on the request path.
+    """
+    global _seen_mtime
+    try:
+        mtime = os.stat(SESSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime == _seen_mtime:
+        return False, None
+    _seen_mtime = mtime
+    return True, load() if mtime is not None else None
@@ -0,0 +1,226 @@
+"""
+Cross-process market-data cache with an elected fetcher.
+
+gunicorn runs several Uvicorn workers; without sharing, each one fetches and
+caches Zerodha data on its own. Here one worker wins a leader election and
+refreshes every symbol on a fixed cadence into a shared backend, and every
+worker reads from that backend, so Kite traffic stays constant however many
+workers we run.
+
+Backends (MARKET_CACHE_BACKEND):
+- 'local': in-process dict, no sharing (single worker / development)
+- 'shm':   pickled entries in a tmpfs directory (/dev/shm), election by flock
+- 'redis': any Redis-compatible server at REDIS_URL, election by SET NX EX
+"""
+import fcntl
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from config import MARKET_CACHE_BACKEND, SHARED_CACHE_DIR, REDIS_URL, CACHE_DURATION
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for the 'redis' backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = '__fetcher_heartbeat__'
+ELECTION_INTERVAL = 5  # seconds between leadership attempts by followers
+HEARTBEAT_INTERVAL = CACHE_DURATION  # seconds between fetcher heartbeats, even when refreshing less often
+
+
+class LocalBackend:
+    """In-process backend: this worker is always the fetcher"""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key: str):
+        return self._data.get(key)
+
+    def set(self, key: str, value, timestamp: float = None):
+        self._data[key] = (timestamp or time.time(), value)
+
+    def try_acquire_leadership(self) -> bool:
+        return True
+
+
+class SharedMemoryBackend:
+    """One pickle file per key on tmpfs; writes are atomic renames, so readers never see partial entries"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key: str, value, timestamp: float = None):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump((timestamp or time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def try_acquire_leadership(self) -> bool:
+        """Hold an exclusive flock for the life of the process; the OS releases it if we die"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(os.path.join(self.directory, 'fetcher.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+
+class RedisBackend:
+    """Redis-compatible backend; leadership is a key renewed by the fetcher loop"""
+
+    LEADER_KEY = 'market-signals:fetcher'
+    PREFIX = 'market-signals:cache:'
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("MARKET_CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lease = max(3 * CACHE_DURATION, 15)
+
+    def get(self, key: str):
+        raw = self._client.get(self.PREFIX + key)
+        return pickle.loads(raw) if raw else None
+
+    def set(self, key: str, value, timestamp: float = None):
+        payload = pickle.dumps((timestamp or time.time(), value), protocol=pickle.HIGHEST_PROTOCOL)
+        self._client.set(self.PREFIX + key, payload, ex=3600)
+
+    def try_acquire_leadership(self) -> bool:
+        if self._client.set(self.LEADER_KEY, self._id, nx=True, ex=self._lease):
+            return True
+        if self._client.get(self.LEADER_KEY) == self._id.encode():
+            self._client.expire(self.LEADER_KEY, self._lease)
+            return True
+        return False
+
+
+def _create_backend():
+    try:
+        if MARKET_CACHE_BACKEND == 'shm':
+            return SharedMemoryBackend(SHARED_CACHE_DIR)
+        if MARKET_CACHE_BACKEND == 'redis':
+            return RedisBackend(REDIS_URL)
+    except Exception as e:
+        logger.error(f"✗ Could not create '{MARKET_CACHE_BACKEND}' cache backend, using local: {e}")
+    return LocalBackend()
+
+
+backend = _create_backend()
+_is_fetcher = False
+_fetcher_thread = None
+_stop = threading.Event()
+_elected = threading.Event()  # set once the first leadership attempt has an answer
+
+
+def read(key: str):
+    """(timestamp, value) from the shared backend, or None"""
+    try:
+        return backend.get(key)
+    except Exception as e:
+        logger.debug(f"Shared cache read failed for {key}: {e}")
+        return None
+
+
+def publish(key: str, value, timestamp: float = None):
+    """Publish a value to every worker"""
+    try:
+        backend.set(key, value, timestamp)
+    except Exception as e:
+        logger.warning(f"Shared cache write failed for {key}: {e}")
+
+
+def is_fetcher() -> bool:
+    """True if this process is the elected fetcher"""
+    return _is_fetcher
+
+
+def wait_for_election(timeout: float) -> bool:
+    """is_fetcher() once this process's first leadership attempt has run (or `timeout` passed)"""
+    _elected.wait(timeout)
+    return _is_fetcher
+
+
+def fetcher_alive() -> bool:
+    """True if some process has refreshed the shared cache recently"""
+    heartbeat = read(HEARTBEAT_KEY)
+    return heartbeat is not None and time.time() - heartbeat[0] < 3 * max(CACHE_DURATION, 1)
+
+
+def _fetcher_loop(refresh, interval):
+    global _is_fetcher
+    last_refresh, healthy = None, False
+    while not _stop.is_set():
+        try:
+            leader = backend.try_acquire_leadership()
+        except Exception as e:
+            logger.warning(f"Leadership check failed: {e}")
+            leader = False
+        if leader != _is_fetcher:
+            _is_fetcher = leader
+            last_refresh = None
+            logger.info(f"✓ Worker {os.getpid()} is now the market-data fetcher" if leader
+                        else f"Worker {os.getpid()} lost market-data fetcher role")
+        _elected.set()
+        if not leader:
+            _stop.wait(ELECTION_INTERVAL)
+            continue
+
+        # The interval can change between refreshes (see market_hours); the
+        # heartbeat is still published at least every HEARTBEAT_INTERVAL
+        period = interval() if callable(interval) else interval
+        if last_refresh is None or time.time() - last_refresh >= period:
+            last_refresh = time.time()
+            try:
+                refresh()
+                healthy = True
+            except Exception as e:
+                healthy = False
+                logger.error(f"✗ Fetcher refresh failed: {e}")
+        if healthy:
+            publish(HEARTBEAT_KEY, os.getpid())
+        _stop.wait(min(max(last_refresh + period - time.time(), 0.1), HEARTBEAT_INTERVAL))
+
+
+def start_fetcher(refresh, interval=CACHE_DURATION):
+    """
+    Run the election/refresh loop in a background thread. `refresh()` is
+    called every `interval` seconds while this process holds leadership;
+    `interval` may be a function returning the current interval.
+    """
+    global _fetcher_thread
+    if _fetcher_thread is not None:
+        return
+    _stop.clear()
+    _fetcher_thread = threading.Thread(target=_fetcher_loop, args=(refresh, interval), daemon=True, name="market-fetcher")
+    _fetcher_thread.start()
+    logger.info(f"✓ Market-data fetcher election started ({type(backend).__name__})")
+
+
+def stop_fetcher():
+    global _fetcher_thread
+    _stop.set()
+    _fetcher_thread = None
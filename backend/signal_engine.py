@@ -0,0 +1,229 @@
+"""
+Signal evaluation: Greeks, threshold matching and confidence scoring for
+option chain snapshots.
+
+Pure functions of an OptionChain and threshold params, with no Kite client,
+session or instrument state, so importing this module does nothing. The live
+path (zerodha_api), precompute and replay all evaluate chains through it.
+Rows are ordered strike by strike, CE before PE (see chain_columns).
+"""
+import logging
+from datetime import datetime
+import numpy as np
+from config import SYMBOL_MAPPING, DEFAULT_TIME_TO_EXPIRY
+from chain import OptionChain, _plain_strike
+from greeks import bs_greeks
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def calculate_greeks(ltp: float, strike: float, iv: float, time_to_expiry: float = DEFAULT_TIME_TO_EXPIRY, option_type: str = 'CE') -> dict:
+    """
+    Calculate Greeks for a single option using Black-Scholes
+    time_to_expiry: 0.038 years ≈ 10 trading days (standard for weekly options)
+    """
+    try:
+        greeks = bs_greeks(ltp, strike, iv, time_to_expiry, option_type == 'CE')
+        return {
+            'delta': round(float(greeks['delta']), 4),
+            'gamma': round(float(greeks['gamma']), 6),
+            'theta': round(float(greeks['theta']), 4),
+            'vega': round(float(greeks['vega']), 4),
+            'rho': round(float(greeks['rho']), 4),
+        }
+    except Exception as e:
+        logger.error(f"Error calculating Greeks: {e}")
+        return {'delta': 0.0, 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0, 'rho': 0.0}
+
+
+def _score(values: np.ndarray, threshold) -> np.ndarray:
+    """
+    Fraction of a threshold reached, capped at 1 (non-positive thresholds always score 1).
+    `threshold` may be a (K, 1) column of per-profile thresholds, giving a (K, rows) result.
+    """
+    if np.ndim(threshold) == 0:
+        if threshold <= 0:
+            return np.ones_like(values)
+        return np.minimum(values / threshold, 1.0)
+    positive = threshold > 0
+    return np.where(positive, np.minimum(values / np.where(positive, threshold, 1.0), 1.0), 1.0)
+
+
+def signal_thresholds(params: dict) -> dict:
+    """Signal thresholds from request params, with the STRONG BUY defaults"""
+    return {
+        'vega_min': params.get('vega_min', 0.3),
+        'gamma_min': params.get('gamma_min', 0.05),
+        'theta_max': params.get('theta_min', -0.5),  # theta is negative
+        'delta_min': params.get('delta_min', 0.4),
+        'oi_min': params.get('iv_call_oi_min', 50000),
+        'iv_min': params.get('iv_min', 0.20),
+        'confidence_min': params.get('confidence_min', 0.80),  # High threshold for STRONG BUY
+    }
+
+
+def chain_columns(option_chain: OptionChain) -> tuple:
+    """(strikes, is_call, oi, iv) arrays, one row per option: strike by strike, CE before PE"""
+    return (
+        np.repeat(option_chain.strikes, 2),
+        np.tile([True, False], len(option_chain)),
+        option_chain.interleaved('oi').astype(float),
+        option_chain.interleaved('iv'),
+    )
+
+
+def row_greeks(ltp: float, strikes: np.ndarray, iv: np.ndarray, time_to_expiry: float, is_call: np.ndarray) -> tuple:
+    """(vega, gamma, theta, delta) arrays, rounded as the signal reports them"""
+    with metrics.STAGE_SECONDS.time('greeks'):
+        greeks = bs_greeks(ltp, strikes, iv, time_to_expiry, is_call)
+    return (
+        np.round(greeks['vega'], 4),
+        np.round(greeks['gamma'], 6),
+        np.round(greeks['theta'], 4),
+        np.round(greeks['delta'], 4),
+    )
+
+
+def qualify(vega, gamma, theta, delta, oi, iv, thresholds: dict) -> tuple:
+    """
+    (qualified mask, confidence) per row: ALL Greeks + OI + IV must match and confidence must clear its minimum.
+    With (K, 1) threshold columns (see stack_thresholds) both results are (K, rows), one row per profile.
+    """
+    matches = (
+        (oi > 0)
+        & (np.abs(vega) >= thresholds['vega_min'])
+        & (gamma >= thresholds['gamma_min'])
+        & (theta <= thresholds['theta_max'])
+        & (np.abs(delta) >= thresholds['delta_min'])
+        & (oi >= thresholds['oi_min'])
+        & (iv >= thresholds['iv_min'])
+    )
+    confidence = (
+        _score(np.abs(vega), thresholds['vega_min']) * 0.20
+        + _score(gamma, thresholds['gamma_min']) * 0.20
+        + _score(np.abs(delta), thresholds['delta_min']) * 0.20
+        + _score(oi, thresholds['oi_min']) * 0.25
+        + _score(iv, thresholds['iv_min']) * 0.15
+    )
+    confidence = np.round(np.minimum(confidence, 1.0), 2)
+    qualified = matches & (confidence >= thresholds['confidence_min']) & (confidence > 0)
+    return qualified, confidence
+
+
+def stack_thresholds(profiles: list) -> dict:
+    """Thresholds for K param sets as (K, 1) columns, which broadcast against per-row arrays"""
+    thresholds = [signal_thresholds(params) for params in profiles]
+    return {name: np.array([t[name] for t in thresholds], dtype=float).reshape(-1, 1) for name in thresholds[0]}
+
+
+def ranked_rows(qualified: np.ndarray, confidence: np.ndarray, count: int) -> np.ndarray:
+    """Up to `count` qualified rows, highest confidence first (ties keep row order, CE before PE)"""
+    rows = np.flatnonzero(qualified)
+    return rows[np.argsort(-confidence[rows], kind='stable')][:count]
+
+
+def signal_dict(symbol: str, option_chain: OptionChain, row: int, vega: float, gamma: float, theta: float,
+                 delta: float, confidence: float, ltp: float, data_source: str) -> dict:
+    """Signal for interleaved row `row` of a chain (even rows are CE, odd rows PE)"""
+    option_type = 'CE' if row % 2 == 0 else 'PE'
+    strike = _plain_strike(option_chain.strikes[row // 2])
+    option_data = option_chain.option(row // 2, option_type)
+    signal = {
+        'symbol': symbol,
+        'timestamp': datetime.utcnow().strftime('%H:%M:%S'),
+        'option_type': option_type,
+        'strike': strike,
+        'vega': float(vega),
+        'gamma': float(gamma),
+        'theta': float(theta),
+        'delta': float(delta),
+        'oi': option_data['oi'],
+        'iv': option_data['iv'],
+        'ltp_option': option_data.get('ltp', 0),
+        'side': f'STRONG BUY {option_type}',
+        'confidence': float(confidence),
+        'ltp': round(ltp, 2),
+        'data_source': data_source,
+    }
+    logger.info(f"✓ STRONG {option_type} MATCH: {symbol} Strike {strike} | Confidence: {signal['confidence']*100:.0f}% | OI: {signal['oi']}")
+    return signal
+
+
+def chain_inputs(symbol: str, option_chain: OptionChain, ltp: float = None) -> tuple:
+    """(ltp, time_to_expiry, data_source) used to evaluate a chain"""
+    ltp = ltp or option_chain.ltp
+    if not ltp or ltp <= 0:
+        ltp = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
+    time_to_expiry = option_chain.time_to_expiry or DEFAULT_TIME_TO_EXPIRY
+    data_source = option_chain.data_source or 'UNKNOWN'
+    return ltp, time_to_expiry, data_source
+
+
+def evaluate_signal(symbol: str, option_chain: OptionChain, params: dict, ltp: float = None) -> dict:
+    """
+    Evaluate one option chain snapshot against thresholds and return the best
+    STRONG BUY signal, or None. Greeks for every CE and PE are computed in one
+    vectorized pass; rows are ordered strike by strike, CE before PE, so ties
+    resolve to the first candidate as before.
+    """
+    if not len(option_chain):
+        return None
+    ltp, time_to_expiry, data_source = chain_inputs(symbol, option_chain, ltp)
+    
+    strikes, is_call, oi, iv = chain_columns(option_chain)
+    
+    vega, gamma, theta, delta = row_greeks(ltp, strikes, iv, time_to_expiry, is_call)
+    qualified, confidence = qualify(vega, gamma, theta, delta, oi, iv, signal_thresholds(params))
+    if not qualified.any():
+        return None
+    
+    best = int(np.argmax(np.where(qualified, confidence, -1.0)))
+    return signal_dict(
+        symbol, option_chain, best, vega[best], gamma[best], theta[best], delta[best],
+        confidence[best], ltp, data_source,
+    )
+
+
+def evaluate_candidates(symbol: str, option_chain: OptionChain, params: dict, count: int, ltp: float = None) -> list:
+    """
+    Top `count` STRONG BUY candidates (CE and PE) of one chain snapshot, best
+    first, from the same single vectorized pass as evaluate_signal. The first
+    candidate is the signal evaluate_signal returns.
+    """
+    if not len(option_chain):
+        return []
+    ltp, time_to_expiry, data_source = chain_inputs(symbol, option_chain, ltp)
+    
+    strikes, is_call, oi, iv = chain_columns(option_chain)
+    
+    vega, gamma, theta, delta = row_greeks(ltp, strikes, iv, time_to_expiry, is_call)
+    qualified, confidence = qualify(vega, gamma, theta, delta, oi, iv, signal_thresholds(params))
+    return [
+        signal_dict(symbol, option_chain, row, vega[row], gamma[row], theta[row], delta[row], confidence[row], ltp, data_source)
+        for row in ranked_rows(qualified, confidence, count).tolist()
+    ]
+
+
+def evaluate_profiles(symbol: str, option_chain: OptionChain, profiles: list, ltp: float = None) -> list:
+    """
+    Best STRONG BUY signal (or None) for each of K threshold param sets
+    against one chain snapshot. Greeks do not depend on thresholds, so they
+    are computed once; qualification and confidence are one K x rows matrix
+    operation. Each result equals evaluate_signal with that param set.
+    """
+    if not len(option_chain) or not profiles:
+        return [None] * len(profiles)
+    ltp, time_to_expiry, data_source = chain_inputs(symbol, option_chain, ltp)
+    
+    strikes, is_call, oi, iv = chain_columns(option_chain)
+    
+    vega, gamma, theta, delta = row_greeks(ltp, strikes, iv, time_to_expiry, is_call)
+    qualified, confidence = qualify(vega, gamma, theta, delta, oi, iv, stack_thresholds(profiles))
+    best = np.argmax(np.where(qualified, confidence, -1.0), axis=1)
+    return [
+        signal_dict(
+            symbol, option_chain, row, vega[row], gamma[row], theta[row], delta[row], confidence[k, row], ltp, data_source,
+        ) if qualified[k, row] else None
+        for k, row in enumerate(best.tolist())
+    ]
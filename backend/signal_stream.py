@@ -0,0 +1,120 @@
+"""
+Server-push signal stream.
+
+Instead of every open dashboard polling /api/signal, one background task
+per worker computes each subscribed symbol's signal at most once per
+SIGNAL_PUSH_INTERVAL and fans it out to every subscriber, sending only when
+the signal actually changed. Compute cost therefore follows market updates,
+not the number of connected viewers.
+
+Each subscriber has a small bounded queue. A slow client never blocks the
+broadcast: when its queue is full the oldest pending update is dropped,
+since only the latest signal matters.
+
+Messages are encoded to JSON text once in _publish and the same string is
+queued for every subscriber, so fan-out does no per-client serialization.
+"""
+import asyncio
+import logging
+import time
+from config import SIGNAL_PUSH_INTERVAL, SIGNAL_STREAM_QUEUE_SIZE
+from serialization import dumps_text
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = dumps_text({'type': 'heartbeat'})
+
+
+def _fingerprint(signal):
+    """Signal contents that matter for change detection (the wall-clock timestamp does not)"""
+    if not signal:
+        return None
+    return tuple(sorted((k, v) for k, v in signal.items() if k != 'timestamp'))
+
+
+class SignalBroadcaster:
+    """Computes signals once per symbol and pushes changes to subscriber queues"""
+
+    def __init__(self, compute, interval: float = SIGNAL_PUSH_INTERVAL, queue_size: int = SIGNAL_STREAM_QUEUE_SIZE):
+        self._compute = compute  # async (symbol) -> signal dict or None
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers = {}   # symbol -> set of asyncio.Queue
+        self._latest = {}        # symbol -> last message sent (encoded JSON text)
+        self._fingerprints = {}  # symbol -> fingerprint of the last signal sent
+        self._task = None
+        self.dropped = 0
+
+    def subscribe(self, symbol: str) -> asyncio.Queue:
+        """Register a subscriber; it immediately gets the latest signal if there is one"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(symbol, set()).add(queue)
+        if symbol in self._latest:
+            queue.put_nowait(self._latest[symbol])
+        self._ensure_running()
+        return queue
+
+    def unsubscribe(self, symbol: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(symbol)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[symbol]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _offer(self, queue: asyncio.Queue, message: str):
+        """Non-blocking put; a full queue loses its oldest update"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message)
+
+    async def _publish(self, symbol: str):
+        try:
+            signal = await self._compute(symbol)
+        except asyncio.TimeoutError:
+            logger.error(f"✗ Streamed signal for {symbol} timed out")
+            return
+        except Exception as e:
+            logger.error(f"✗ Streamed signal for {symbol} failed: {e}")
+            return
+
+        fingerprint = _fingerprint(signal)
+        if symbol in self._latest and fingerprint == self._fingerprints.get(symbol):
+            return
+        message = dumps_text({'type': 'signal', 'symbol': symbol, 'signal': signal, 'sent_at': time.time()})
+        self._latest[symbol] = message
+        self._fingerprints[symbol] = fingerprint
+        for queue in list(self._subscribers.get(symbol, ())):
+            self._offer(queue, message)
+
+    async def _run(self):
+        """Recompute subscribed symbols every interval; exits when nobody is listening"""
+        while self._subscribers:
+            started = time.monotonic()
+            symbols = list(self._subscribers)
+            await asyncio.gather(*(self._publish(symbol) for symbol in symbols))
+            # Forget symbols nobody watches so a new subscriber never gets an old snapshot
+            for symbol in list(self._latest):
+                if symbol not in self._subscribers:
+                    self._latest.pop(symbol, None)
+                    self._fingerprints.pop(symbol, None)
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0.05))
@@ -0,0 +1,60 @@
+"""
+Shared test setup.
+
+Like the benchmarks, the tests run offline and isolated: no tick stream,
+recorder or market hours, an in-process shared cache, throwaway instrument
+master, session and recording directories, and no Kite rate limits. Kite is
+the in-process FakeKite from benchmarks/fake_kite.py.
+
+Run from backend/:  python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, 'benchmarks')]
+
+_scratch = tempfile.mkdtemp(prefix='backend-tests-')
+os.environ.update({
+    'STREAM_ENABLED': 'false',
+    'RECORDER_ENABLED': 'false',
+    'MARKET_CACHE_BACKEND': 'local',
+    'INSTRUMENTS_DIR': os.path.join(_scratch, 'instruments'),
+    'SESSION_FILE': os.path.join(_scratch, 'session', 'session.json'),
+    'SNAPSHOT_DIR': os.path.join(_scratch, 'snapshots'),
+    'RECORDER_DIR': os.path.join(_scratch, 'recordings'),
+    'KITE_QUOTE_RATE': '0',
+    'KITE_API_RATE': '0',
+    'KITE_QUOTE_COALESCE': '0',
+    'KITE_MAX_RETRIES': '2',
+    'WARMUP_ENABLED': 'false',
+    'MARKET_HOURS_ENABLED': 'false',
+    'OPTION_CHAIN_STRIKES_EACH_SIDE': '20',
+})
+
+import pytest  # noqa: E402
+from fake_kite import FakeKite  # noqa: E402
+
+SYMBOL = 'NIFTY'
+
+
+@pytest.fixture(scope='session')
+def fake_kite():
+    """FakeKite installed as the authenticated Kite client"""
+    import zerodha_api
+    kite = FakeKite()
+    zerodha_api.set_kite_client(kite)
+    yield kite
+    zerodha_api.set_kite_client(None, authenticated=False)
+
+
+@pytest.fixture
+def live_chain(fake_kite):
+    """A NIFTY chain fetched and IV-solved through the live REST path"""
+    import implied_vol
+    import zerodha_api
+    implied_vol.forget(SYMBOL)
+    chain = zerodha_api._fetch_live_chain(SYMBOL, fake_kite.spots[SYMBOL])
+    chain.data_source = 'ZERODHA_LIVE'
+    return zerodha_api._attach_implied_vols(SYMBOL, chain)
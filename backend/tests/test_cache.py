@@ -0,0 +1,159 @@
+import threading
+import time
+import pytest
+from cache import TTLCache, single_flight, refresh_in_background, in_flight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_namespace_ttl():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, default_ttl=5, ttls={'ltp': 1}, clock=clock)
+    cache.set('ltp', 'NIFTY', 1.0)
+    cache.set('option_chain', 'NIFTY', 'chain')
+    clock.now += 2
+    assert cache.get('ltp', 'NIFTY') is None
+    assert cache.get('option_chain', 'NIFTY') == 'chain'
+    clock.now += 4
+    assert cache.get('option_chain', 'NIFTY') is None
+
+
+def test_stale_reads_are_served_within_retention():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, default_ttl=1, retention={'ltp': 30}, clock=clock)
+    cache.set('ltp', 'NIFTY', 1.0)
+    clock.now += 10
+    assert cache.get('ltp', 'NIFTY') is None
+    assert cache.get_stale('ltp', 'NIFTY', max_age=15) == 1.0
+    assert cache.get_stale('ltp', 'NIFTY', max_age=5) is None
+    clock.now += 25
+    assert cache.peek('ltp', 'NIFTY') is None
+    assert cache.stats()['namespaces']['ltp']['expirations'] == 1
+
+
+def test_backdated_entries_age_from_when_they_were_produced():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, default_ttl=5, clock=clock)
+    cache.set('ltp', 'NIFTY', 1.0, age=4)
+    clock.now += 2
+    assert cache.get('ltp', 'NIFTY') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    clock = Clock()
+    cache = TTLCache(max_entries=2, default_ttl=60, clock=clock)
+    cache.set('ltp', 'a', 1)
+    cache.set('ltp', 'b', 2)
+    assert cache.get('ltp', 'a') == 1  # 'b' is now least recently used
+    cache.set('ltp', 'c', 3)
+    assert len(cache) == 2
+    assert cache.get('ltp', 'b') is None
+    assert cache.get('ltp', 'a') == 1 and cache.get('ltp', 'c') == 3
+    assert cache.stats()['namespaces']['ltp']['evictions'] == 1
+
+
+def test_expired_entries_are_purged_before_evicting_live_ones():
+    clock = Clock()
+    cache = TTLCache(max_entries=2, default_ttl=60, ttls={'ltp': 1}, clock=clock)
+    cache.set('option_chain', 'a', 1)
+    cache.set('ltp', 'b', 2)
+    clock.now += 2
+    cache.set('option_chain', 'c', 3)
+    assert cache.get('option_chain', 'a') == 1
+    stats = cache.stats()['namespaces']
+    assert stats['ltp']['expirations'] == 1
+    assert stats['option_chain']['evictions'] == 0
+
+
+def test_single_flight_runs_one_call_for_concurrent_callers():
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(5)
+        return 'fresh'
+
+    threads = [threading.Thread(target=lambda: results.append(single_flight('test-coalesce', refresh)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not in_flight('test-coalesce') and time.monotonic() < deadline:
+        time.sleep(0.001)
+    time.sleep(0.05)  # let every caller reach the in-flight call
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == ['fresh'] * 8
+    assert not in_flight('test-coalesce')
+
+
+def test_single_flight_waiters_see_the_owners_error():
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def refresh():
+        started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    def call():
+        try:
+            single_flight('test-error', refresh)
+        except ValueError as e:
+            errors.append(e)
+
+    owner = threading.Thread(target=call)
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert len(errors) == 2 and errors[0] is errors[1]
+    with pytest.raises(ValueError):
+        single_flight('test-error', refresh)  # not cached: the next call runs again
+
+
+def test_refresh_in_background_does_not_start_a_second_refresh():
+    release = threading.Event()
+    done = threading.Event()
+
+    def refresh():
+        release.wait(5)
+        done.set()
+
+    assert refresh_in_background('test-background', refresh)
+    deadline = time.monotonic() + 5
+    while not in_flight('test-background') and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not refresh_in_background('test-background', refresh)
+    release.set()
+    assert done.wait(5)
+
+
+def test_refresh_in_background_logs_failures_instead_of_raising():
+    finished = threading.Event()
+
+    def refresh():
+        finished.set()
+        raise RuntimeError('kite down')
+
+    assert refresh_in_background('test-background-error', refresh)
+    assert finished.wait(5)
+    deadline = time.monotonic() + 5
+    while in_flight('test-background-error') and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not in_flight('test-background-error')
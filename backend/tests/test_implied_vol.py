@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+import implied_vol
+from greeks import bs_price, bs_greeks
+
+SPOT = 25012.35
+TIME_TO_EXPIRY = 7 / 365
+STRIKES = np.repeat(np.arange(24000.0, 26050.0, 50.0), 2)
+IS_CALL = np.tile([True, False], len(STRIKES) // 2)
+SIGMA = 0.12 + 0.8 * ((STRIKES - SPOT) / SPOT) ** 2
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    implied_vol.forget()
+    yield
+    implied_vol.forget()
+
+
+@pytest.fixture
+def solves(monkeypatch):
+    """Rows handed to the Newton solver, per call"""
+    rows = []
+    solve = implied_vol.implied_volatility
+
+    def counting(price, *args, **kwargs):
+        rows.append(len(price))
+        return solve(price, *args, **kwargs)
+
+    monkeypatch.setattr(implied_vol, 'implied_volatility', counting)
+    return rows
+
+
+def test_solve_chain_recovers_the_pricing_volatility():
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    iv = implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    # Deep in-the-money rows carry almost no time value; the rest must round-trip
+    has_time_value = price - np.maximum(np.where(IS_CALL, SPOT - STRIKES, STRIKES - SPOT), 0) > 1.0
+    assert has_time_value.sum() > len(price) // 2
+    np.testing.assert_allclose(iv[has_time_value], SIGMA[has_time_value], atol=1e-4)
+    np.testing.assert_allclose(
+        bs_price(SPOT, STRIKES, iv, TIME_TO_EXPIRY, IS_CALL)[has_time_value], price[has_time_value], atol=2e-4,
+    )
+
+
+def test_prices_outside_arbitrage_bounds_have_no_iv():
+    strike = np.array([25000.0, 25000.0, 25000.0])
+    is_call = np.array([True, True, False])
+    price = np.array([0.0, SPOT + 1.0, 30000.0])
+    iv = implied_vol.implied_volatility(price, SPOT, strike, TIME_TO_EXPIRY, is_call)
+    assert np.isnan(iv).all()
+
+
+def test_unchanged_prices_are_not_solved_again(solves):
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    first = implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    # A spot tick within tolerance, a few seconds later
+    later = TIME_TO_EXPIRY - 5 / implied_vol.SECONDS_PER_YEAR
+    again = implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT + 2, STRIKES, later, IS_CALL)
+    assert solves == [len(price)]
+    np.testing.assert_array_equal(first, again)
+
+
+def test_only_repriced_options_are_solved(solves):
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    first = implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    ticked = price.copy()
+    ticked[40] += 0.05
+    iv = implied_vol.solve_chain('TEST', '2025-01-09', ticked, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    assert solves == [len(price), 1]
+    assert iv[40] > first[40]
+    np.testing.assert_array_equal(np.delete(iv, 40), np.delete(first, 40))
+
+
+def test_spot_move_beyond_tolerance_solves_every_option(solves):
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    moved = SPOT * (1 + 2 * implied_vol.IV_REUSE_SPOT_TOLERANCE)
+    iv = implied_vol.solve_chain('TEST', '2025-01-09', price, moved, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    assert solves == [len(price), len(price)]
+    valid = ~np.isnan(iv)
+    np.testing.assert_allclose(iv[valid], implied_vol.implied_volatility(price, moved, STRIKES, TIME_TO_EXPIRY, IS_CALL)[valid],
+                               atol=1e-6)
+
+
+def test_shifted_window_solves_only_new_strikes(solves):
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    implied_vol.solve_chain('TEST', '2025-01-09', price[:40], SPOT, STRIKES[:40], TIME_TO_EXPIRY, IS_CALL[:40])
+    implied_vol.solve_chain('TEST', '2025-01-09', price[10:50], SPOT, STRIKES[10:50], TIME_TO_EXPIRY, IS_CALL[10:50])
+    assert solves == [40, 10]
+
+
+def test_expiry_rollover_starts_cold(solves):
+    price = bs_price(SPOT, STRIKES, SIGMA, TIME_TO_EXPIRY, IS_CALL)
+    implied_vol.solve_chain('TEST', '2025-01-09', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    implied_vol.solve_chain('TEST', '2025-01-16', price, SPOT, STRIKES, TIME_TO_EXPIRY, IS_CALL)
+    assert solves == [len(price), len(price)]
+    assert len(implied_vol._solved['TEST'][1]) == len(price)
+
+
+@pytest.mark.parametrize('is_call', [True, False])
+def test_greeks_match_finite_differences(is_call):
+    strike = np.array([24500.0, 25000.0, 25500.0])
+    sigma, t, r = 0.15, 14 / 365, 0.05
+    greeks = bs_greeks(SPOT, strike, sigma, t, is_call, r=r)
+
+    def price(s=SPOT, vol=sigma, years=t, rate=r):
+        return bs_price(s, strike, vol, years, is_call, r=rate)
+
+    ds, dv, dt, dr = 1.0, 1e-4, 1e-5, 1e-5
+    delta = (price(s=SPOT + ds) - price(s=SPOT - ds)) / (2 * ds)
+    gamma = (price(s=SPOT + ds) - 2 * price() + price(s=SPOT - ds)) / ds ** 2
+    vega = (price(vol=sigma + dv) - price(vol=sigma - dv)) / (2 * dv) / 100
+    theta = -(price(years=t + dt) - price(years=t - dt)) / (2 * dt) / 252
+    rho = (price(rate=r + dr) - price(rate=r - dr)) / (2 * dr) / 100
+
+    np.testing.assert_allclose(greeks['delta'], delta, rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(greeks['gamma'], gamma, rtol=1e-3)
+    np.testing.assert_allclose(greeks['vega'], vega, rtol=1e-4)
+    np.testing.assert_allclose(greeks['theta'], theta, rtol=1e-4)
+    np.testing.assert_allclose(greeks['rho'], rho, rtol=1e-4)
+    if not is_call:
+        assert (greeks['delta'] < 0).all() and (greeks['rho'] < 0).all()
+
+
+def test_put_call_parity():
+    strike = np.array([24500.0, 25000.0, 25500.0])
+    t, r = 14 / 365, 0.05
+    call = bs_price(SPOT, strike, 0.15, t, True, r=r)
+    put = bs_price(SPOT, strike, 0.15, t, False, r=r)
+    np.testing.assert_allclose(call - put, SPOT - strike * np.exp(-r * t), atol=1e-4)
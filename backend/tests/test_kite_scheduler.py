@@ -0,0 +1,113 @@
+import threading
+import pytest
+from kiteconnect.exceptions import KiteException, NetworkException, TokenException
+import kite_scheduler
+
+
+class RecordingClient:
+    """Quotes every instrument it is asked for (bar `missing`), failing the first calls with `errors`"""
+
+    def __init__(self, errors=(), missing=()):
+        self.errors = list(errors)
+        self.missing = set(missing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def quote(self, names):
+        with self._lock:
+            self.calls.append(list(names))
+            if self.errors:
+                raise self.errors.pop(0)
+        return {name: {'last_price': float(len(name))} for name in names if name not in self.missing}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(kite_scheduler, 'backoff', lambda attempt: 0.0)
+
+
+def test_concurrent_callers_share_one_quote_call(monkeypatch):
+    monkeypatch.setattr(kite_scheduler, 'KITE_QUOTE_COALESCE', 0.05)
+    client = RecordingClient()
+    results = {}
+
+    def fetch(symbol):
+        results[symbol] = kite_scheduler.quote(client, [f"NSE:{symbol}", f"NFO:{symbol}CE"])
+
+    threads = [threading.Thread(target=fetch, args=(symbol,)) for symbol in ('BATCH_A', 'BATCH_B')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(client.calls) == 1
+    assert sorted(client.calls[0]) == ['NFO:BATCH_ACE', 'NFO:BATCH_BCE', 'NSE:BATCH_A', 'NSE:BATCH_B']
+    assert set(results['BATCH_A']) == {'NSE:BATCH_A', 'NFO:BATCH_ACE'}
+    assert set(results['BATCH_B']) == {'NSE:BATCH_B', 'NFO:BATCH_BCE'}
+
+
+def test_batches_take_the_most_urgent_instruments_first(monkeypatch):
+    monkeypatch.setattr(kite_scheduler, 'KITE_QUOTE_BATCH_LIMIT', 2)
+    client = RecordingClient()
+    names = ['PRIO:far', 'PRIO:spot', 'PRIO:near', 'PRIO:atm']
+    quotes = kite_scheduler.quote(client, names, [3, kite_scheduler.PRIORITY_UNDERLYING, 2, 1])
+    # Batches run concurrently, so only their membership is deterministic
+    assert sorted(sorted(call) for call in client.calls) == [['PRIO:atm', 'PRIO:spot'], ['PRIO:far', 'PRIO:near']]
+    assert set(quotes) == set(names)
+
+
+def test_instruments_kite_does_not_return_are_left_out():
+    client = RecordingClient(missing={'MISS:gone'})
+    quotes = kite_scheduler.quote(client, ['MISS:here', 'MISS:gone'])
+    assert set(quotes) == {'MISS:here'}
+
+
+def test_failed_batch_is_requeued_and_retried():
+    client = RecordingClient(errors=[NetworkException('connection reset'), KiteException('Too many requests', code=429)])
+    retries = kite_scheduler.stats()['retries']
+    quotes = kite_scheduler.quote(client, ['RETRY:a', 'RETRY:b'], [1, 0])
+    assert len(client.calls) == 3
+    assert all(call == ['RETRY:b', 'RETRY:a'] for call in client.calls)  # requeued at their original priority
+    assert set(quotes) == {'RETRY:a', 'RETRY:b'}
+    assert kite_scheduler.stats()['retries'] == retries + 2
+
+
+def test_caller_gets_the_error_after_max_retries():
+    errors = [KiteException('Too many requests', code=429) for _ in range(kite_scheduler.KITE_MAX_RETRIES + 1)]
+    client = RecordingClient(errors=errors)
+    with pytest.raises(KiteException):
+        kite_scheduler.quote(client, ['GIVEUP:a'])
+    assert len(client.calls) == kite_scheduler.KITE_MAX_RETRIES + 1
+    assert kite_scheduler.stats()['pending_instruments'] == 0
+
+
+def test_non_retryable_errors_fail_at_once():
+    client = RecordingClient(errors=[TokenException('Invalid access token')])
+    with pytest.raises(TokenException):
+        kite_scheduler.quote(client, ['TOKEN:a'])
+    assert len(client.calls) == 1
+
+
+def test_call_retries_transient_errors():
+    attempts = []
+
+    def instruments(exchange):
+        attempts.append(exchange)
+        if len(attempts) < 3:
+            raise NetworkException('timed out')
+        return [exchange]
+
+    assert kite_scheduler.call(instruments, 'NFO', retries=2) == ['NFO']
+    assert len(attempts) == 3
+
+
+def test_call_raises_once_retries_run_out():
+    attempts = []
+
+    def instruments(exchange):
+        attempts.append(exchange)
+        raise NetworkException('timed out')
+
+    with pytest.raises(NetworkException):
+        kite_scheduler.call(instruments, 'NFO', retries=1)
+    assert len(attempts) == 2
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import recorder
+from chain import OPTION_FIELDS
+from replay import _build_chain
+
+# 2025-01-06 10:00 IST
+MORNING = 1736137800.0
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """Recorder writing to a temporary directory; stopping it flushes every queued event"""
+    monkeypatch.setattr(recorder, 'RECORDER_DIR', str(tmp_path))
+    recorder.start(flush_interval=0.05)
+    yield str(tmp_path)
+    recorder.stop()
+
+
+def test_chain_snapshot_reads_back_as_the_same_chain(recording, live_chain):
+    recorder.record_chain('NIFTY', live_chain, MORNING)
+    recorder.stop()
+
+    day = recorder.trading_day(MORNING)
+    assert day == '2025-01-06' and recorder.days(recording) == [day]
+    rows = recorder.read(day, symbol='NIFTY', directory=recording)
+    assert len(rows) == 1 + 2 * len(live_chain)
+    assert (rows['kind'][0] == recorder.UNDERLYING) and (rows['seq'] == rows['seq'][0]).all()
+
+    rebuilt = _build_chain('NIFTY', rows['seq'][0], np.asarray(rows))
+    np.testing.assert_array_equal(rebuilt.strikes, live_chain.strikes)
+    assert rebuilt.ltp == live_chain.ltp and rebuilt.atm_strike == live_chain.atm_strike
+    assert rebuilt.time_to_expiry == pytest.approx(live_chain.time_to_expiry)
+    for field in OPTION_FIELDS:
+        np.testing.assert_array_equal(rebuilt.interleaved(field), live_chain.interleaved(field))
+
+
+def test_ticks_and_ltps_are_filtered_by_time_symbol_and_token(recording):
+    recorder.record_ltp('NIFTY', 25010.5, MORNING)
+    recorder.record_ticks([
+        ('NIFTY', 101, recorder.CE, 25000.0, 120.5, 5000, 10, 120.45, 120.55),
+        ('BANKNIFTY', 202, recorder.PE, 51000.0, 300.0, 7000, 20, 299.9, 300.1),
+    ], MORNING + 5)
+    recorder.stop()
+
+    day = recorder.trading_day(MORNING)
+    everything = recorder.read(day, directory=recording)
+    assert len(everything) == 3
+    assert list(everything['source']) == [recorder.SNAPSHOT, recorder.TICK, recorder.TICK]
+
+    later = recorder.read(day, start=MORNING + 1, directory=recording)
+    assert sorted(later['token'].tolist()) == [101, 202]
+    assert len(recorder.read(day, end=MORNING + 1, directory=recording)) == 1
+
+    tick = recorder.read(day, token=202, directory=recording)
+    assert len(tick) == 1 and tick['symbol'][0] == b'BANKNIFTY'
+    assert (tick['ltp'][0], tick['oi'][0], tick['bid'][0], tick['ask'][0]) == (300.0, 7000, 299.9, 300.1)
+    assert recorder.read(day, symbol='NIFTY', start=MORNING + 10, directory=recording).size == 0
+
+
+def test_events_are_not_recorded_while_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, 'RECORDER_DIR', str(tmp_path))
+    recorded = recorder.stats()['recorded']
+    recorder.record_ltp('NIFTY', 25010.5, MORNING)
+    assert recorder.stats()['recorded'] == recorded
+    assert recorder.days(str(tmp_path)) == []
@@ -0,0 +1,79 @@
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+import session_store
+from instruments import IST
+
+
+@pytest.fixture(autouse=True)
+def session_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'session' / 'session.json')
+    monkeypatch.setattr(session_store, 'SESSION_FILE', path)
+    monkeypatch.setattr(session_store, '_seen_mtime', None)
+    return path
+
+
+def test_sessions_expire_at_the_next_6am_ist():
+    before = datetime(2025, 1, 6, 5, 59, tzinfo=IST)
+    after = datetime(2025, 1, 6, 6, 0, tzinfo=IST)
+    assert session_store.expiry_after(before) == datetime(2025, 1, 6, 6, 0, tzinfo=IST)
+    assert session_store.expiry_after(after) == datetime(2025, 1, 7, 6, 0, tzinfo=IST)
+    # 01:00 UTC is 06:30 IST
+    assert session_store.expiry_after(datetime.fromisoformat('2025-01-06T01:00:00+00:00')) == \
+        datetime(2025, 1, 7, 6, 0, tzinfo=IST)
+
+
+def test_saved_session_loads_back(session_file):
+    saved = session_store.save('token-1', 'AB1234')
+    assert oct(os.stat(session_file).st_mode & 0o777) == oct(0o600)
+    loaded = session_store.load()
+    assert loaded == saved
+    assert loaded['access_token'] == 'token-1' and loaded['user_id'] == 'AB1234'
+
+
+def _rewrite(path, **changes):
+    with open(path) as f:
+        session = json.load(f)
+    session.update(changes)
+    with open(path, 'w') as f:
+        json.dump(session, f)
+
+
+def test_expired_session_is_ignored(session_file):
+    session_store.save('token-1')
+    _rewrite(session_file, expires_at=(datetime.now(IST) - timedelta(seconds=1)).isoformat())
+    assert session_store.load() is None
+
+
+def test_session_for_another_api_key_is_ignored(session_file):
+    session_store.save('token-1')
+    _rewrite(session_file, api_key='someone-else')
+    assert session_store.load() is None
+
+
+def test_unreadable_session_file_is_ignored(session_file):
+    os.makedirs(os.path.dirname(session_file), exist_ok=True)
+    with open(session_file, 'w') as f:
+        f.write('{not json')
+    assert session_store.load() is None
+
+
+def test_clear_only_removes_the_named_session(session_file):
+    session_store.save('token-2')
+    session_store.clear('token-1')
+    assert session_store.load()['access_token'] == 'token-2'
+    session_store.clear('token-2')
+    assert not os.path.exists(session_file)
+
+
+def test_poll_reports_changes_made_by_other_workers(session_file):
+    assert session_store.poll() == (False, None)
+    session_store.save('token-1')
+    assert session_store.poll() == (False, None)  # our own write
+    _rewrite(session_file, access_token='token-2')
+    os.utime(session_file, ns=(0, os.stat(session_file).st_mtime_ns + 1_000_000))
+    changed, session = session_store.poll()
+    assert changed and session['access_token'] == 'token-2'
+    os.remove(session_file)
+    assert session_store.poll() == (True, None)
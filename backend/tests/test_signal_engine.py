@@ -0,0 +1,78 @@
+import pytest
+import signal_engine
+from chain import OptionChain
+from config import DEFAULT_THRESHOLDS
+
+LOOSE = {
+    'vega_min': 0.0, 'gamma_min': 0.0, 'theta_min': 100.0, 'delta_min': 0.3,
+    'iv_call_oi_min': 0, 'iv_min': 0.0, 'confidence_min': 0.5,
+}
+PROFILES = [
+    DEFAULT_THRESHOLDS,
+    LOOSE,
+    dict(LOOSE, delta_min=0.5, confidence_min=0.9),
+    dict(LOOSE, iv_call_oi_min=150000),
+    dict(LOOSE, iv_min=0.5),  # nothing in the fake smile is that volatile
+]
+
+
+def _without_timestamp(signal):
+    return None if signal is None else {k: v for k, v in signal.items() if k != 'timestamp'}
+
+
+@pytest.mark.parametrize('params', PROFILES)
+def test_best_candidate_is_the_signal(live_chain, params):
+    signal = signal_engine.evaluate_signal('NIFTY', live_chain, params)
+    candidates = signal_engine.evaluate_candidates('NIFTY', live_chain, params, 5)
+    if signal is None:
+        assert candidates == []
+    else:
+        assert _without_timestamp(candidates[0]) == _without_timestamp(signal)
+        confidences = [candidate['confidence'] for candidate in candidates]
+        assert confidences == sorted(confidences, reverse=True)
+
+
+def test_profiles_match_one_evaluation_per_profile(live_chain):
+    results = signal_engine.evaluate_profiles('NIFTY', live_chain, PROFILES)
+    expected = [signal_engine.evaluate_signal('NIFTY', live_chain, params) for params in PROFILES]
+    assert [_without_timestamp(r) for r in results] == [_without_timestamp(e) for e in expected]
+    assert results[1] is not None and results[-1] is None
+
+
+def test_candidates_are_the_options_passing_every_threshold(live_chain):
+    """Vectorized qualification against per-option calculate_greeks and the threshold rules"""
+    params = dict(LOOSE, confidence_min=0.0)
+    thresholds = signal_engine.signal_thresholds(params)
+    spot, time_to_expiry, _ = signal_engine.chain_inputs('NIFTY', live_chain)
+    expected = {}
+    for row, strike in enumerate(live_chain.strikes.tolist()):
+        for option_type in ('CE', 'PE'):
+            option = live_chain.option(row, option_type)
+            greeks = signal_engine.calculate_greeks(spot, strike, option['iv'], time_to_expiry, option_type)
+            if (option['oi'] > 0 and option['oi'] >= thresholds['oi_min'] and option['iv'] >= thresholds['iv_min']
+                    and abs(greeks['vega']) >= thresholds['vega_min'] and greeks['gamma'] >= thresholds['gamma_min']
+                    and greeks['theta'] <= thresholds['theta_max'] and abs(greeks['delta']) >= thresholds['delta_min']):
+                expected[(strike, option_type)] = greeks
+
+    candidates = signal_engine.evaluate_candidates('NIFTY', live_chain, params, 2 * len(live_chain))
+    assert expected and {(c['strike'], c['option_type']) for c in candidates} == set(expected)
+    for candidate in candidates:
+        greeks = expected[(candidate['strike'], candidate['option_type'])]
+        assert {name: candidate[name] for name in ('delta', 'gamma', 'theta', 'vega')} == \
+            {name: greeks[name] for name in ('delta', 'gamma', 'theta', 'vega')}
+    signal = signal_engine.evaluate_signal('NIFTY', live_chain, params)
+    assert signal['confidence'] == max(candidate['confidence'] for candidate in candidates)
+
+
+def test_empty_chain_has_no_signal():
+    empty = OptionChain('NIFTY', [], 25000.0)
+    assert signal_engine.evaluate_signal('NIFTY', empty, LOOSE) is None
+    assert signal_engine.evaluate_candidates('NIFTY', empty, LOOSE, 3) == []
+    assert signal_engine.evaluate_profiles('NIFTY', empty, PROFILES) == [None] * len(PROFILES)
+
+
+def test_live_path_returns_the_engine_signal(live_chain):
+    import zerodha_api
+    signal = zerodha_api.generate_signal_from_market_data('NIFTY', LOOSE, option_chain=live_chain)
+    assert _without_timestamp(signal) == _without_timestamp(signal_engine.evaluate_signal('NIFTY', live_chain, LOOSE))
+    assert signal['data_source'] == 'ZERODHA_LIVE'
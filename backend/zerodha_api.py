@@ -1,25 +1,84 @@
+import copy
+import os
+import pickle
+import threading
 import time
 import random
 import logging
-import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time
+import numpy as np
+import requests
 from kiteconnect import KiteConnect
-from config import ZERODHA_API_KEY, ZERODHA_API_SECRET, REDIRECT_URL, SYMBOL_MAPPING, CACHE_DURATION, PRICE_CACHE, OPTION_CHAIN_CACHE
+from config import (
+    ZERODHA_API_KEY, ZERODHA_API_SECRET, REDIRECT_URL, KITE_ROOT_URL, SYMBOL_MAPPING,
+    CACHE_DURATION, CACHE_TTLS, MARKET_CACHE_MAX_ENTRIES, KITE_CONNECT_TIMEOUT, KITE_READ_TIMEOUT, KITE_POOL_SIZE,
+    OPTION_CHAIN_STRIKES_EACH_SIDE, STREAM_ENABLED,
+    SHARED_CACHE_MAX_STALENESS, CACHE_STALE_WHILE_REVALIDATE, CACHE_MAX_STALENESS, SESSION_SYNC_INTERVAL,
+    SNAPSHOT_DIR, WARMUP_TIMEOUT,
+)
+import kite_scheduler
+import market_stream
+import shared_cache
+import session_store
+import market_hours
+from cache import TTLCache, single_flight, refresh_in_background
+import instruments
+import recorder
+import implied_vol
+import metrics
+from chain import OptionChain
+from signal_engine import evaluate_signal, evaluate_candidates
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MARKET_CLOSE_TIME = dt_time(15, 30)
+
 # Global state
+market_cache = TTLCache(
+    max_entries=MARKET_CACHE_MAX_ENTRIES,
+    default_ttl=CACHE_DURATION,
+    ttls=CACHE_TTLS,
+    # Keep entries long enough to serve stale-while-revalidate and lagging shared snapshots
+    retention={namespace: max(CACHE_MAX_STALENESS, SHARED_CACHE_MAX_STALENESS) for namespace in CACHE_TTLS},
+)
+metrics.register_cache('market', market_cache)
 kite = None
 is_authenticated = False
 access_token = None
+session_source = None      # 'login' (this worker's /auth/callback) or 'store' (persisted by any worker)
+session_expires_at = None
+_next_session_check = 0.0
+_refresh_pool = ThreadPoolExecutor(max_workers=len(SYMBOL_MAPPING), thread_name_prefix="refresh")
+_last_live = {}       # symbol -> (timestamp, chain) of the newest live chain this worker stored
+_quote_windows = {}   # symbol -> ((expiry, strikes), names, priorities) of the last REST chain fetch
+_frozen = {}          # symbol -> last-close chain served while the market is closed
+_frozen_misses = {}   # symbol -> monotonic time before which a missing frozen chain is not looked up again
+FROZEN_RECHECK = 5    # seconds
+_frozen_lock = threading.Lock()
+
+
+def _http_session() -> requests.Session:
+    """Keep-alive session holding up to KITE_POOL_SIZE connections; retries are left to kite_scheduler"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=KITE_POOL_SIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 def initialize_kite():
     """Initialize Kite client - does NOT require authentication"""
     global kite
     try:
-        kite = KiteConnect(api_key=ZERODHA_API_KEY)
-        logger.info("✓ KiteConnect client initialized successfully")
+        kite = KiteConnect(api_key=ZERODHA_API_KEY, root=KITE_ROOT_URL, timeout=(KITE_CONNECT_TIMEOUT, KITE_READ_TIMEOUT))
+        kite.reqsession = _http_session()
+        kite.set_session_expiry_hook(_on_session_expired)
+        logger.info(f"✓ KiteConnect client initialized successfully (pool {KITE_POOL_SIZE}, "
+                    f"timeouts {KITE_CONNECT_TIMEOUT}s connect / {KITE_READ_TIMEOUT}s read)")
+        if KITE_ROOT_URL:
+            logger.info(f"✓ Kite REST root: {KITE_ROOT_URL}")
         logger.info(f"✓ Redirect URL configured: {REDIRECT_URL}")
         logger.info("✓ Ready for authentication flow")
         return True
@@ -29,6 +88,18 @@ def initialize_kite():
         return False
 
 
+def set_kite_client(client, authenticated: bool = True):
+    """
+    Swap in another Kite client (e.g. the in-process fake the benchmarks use).
+    Cached market data came from the previous client, so it is dropped.
+    """
+    global kite, is_authenticated
+    kite = client
+    is_authenticated = authenticated and client is not None
+    market_cache.clear()
+    logger.info(f"✓ Kite client set to {type(client).__name__} (authenticated: {is_authenticated})")
+
+
 def get_auth_url():
     """Generate Zerodha login URL"""
     global kite
@@ -46,390 +117,665 @@ def get_auth_url():
 
 def set_access_token(request_token):
     """Exchange request token for access token"""
-    global kite, is_authenticated, access_token
     try:
         if not kite:
             initialize_kite()
         
         if kite:
             logger.info(f"Exchanging request_token for access_token...")
-            data = kite.generate_session(request_token, ZERODHA_API_SECRET)
-            access_token = data['access_token']
-            kite.set_access_token(access_token)
-            is_authenticated = True
+            # A request token is single-use, so a failed exchange is never retried
+            data = kite_scheduler.call(kite.generate_session, request_token, ZERODHA_API_SECRET, retries=0)
+            _adopt_session(data['access_token'], 'login')
             logger.info(f"✓ Successfully authenticated! Access token: {access_token[:20]}...")
+            # Share the session with the other workers and the next restart
+            try:
+                session_store.save(access_token, data.get('user_id'))
+            except OSError as e:
+                logger.error(f"✗ Could not persist session: {e}")
+            # The instrument master is a multi-MB download: load it off the request path
+            threading.Thread(target=_after_login, args=(access_token,), daemon=True, name="post-login").start()
             return data
     except Exception as e:
+        # A failed login leaves any working session (e.g. one restored from disk) in place
         logger.error(f"✗ Error setting access token: {e}")
-        is_authenticated = False
     return None
 
 
+def _after_login(token: str):
+    """Load the instrument master and start the tick stream for a new session"""
+    try:
+        instruments.ensure_instruments(kite)
+        # Only the fetcher worker streams, and only while the market is open; the others read what it publishes
+        if STREAM_ENABLED and shared_cache.is_fetcher() and not market_hours.is_closed() and token == access_token:
+            market_stream.start(ZERODHA_API_KEY, token)
+    except Exception as e:
+        logger.error(f"✗ Post-login setup failed: {e}")
+
+
+def _adopt_session(token: str, source: str, expires_at: datetime = None):
+    """Use `token` for every Kite call from this worker"""
+    global access_token, is_authenticated, session_source, session_expires_at
+    if not kite:
+        initialize_kite()
+    was_authenticated = is_authenticated
+    if market_stream.is_started():
+        market_stream.stop()  # the fetcher restarts it with the new token on its next refresh
+    kite.set_access_token(token)
+    access_token = token
+    is_authenticated = True
+    session_source = source
+    session_expires_at = expires_at or session_store.expiry_after(datetime.now(instruments.IST))
+    if not was_authenticated:
+        market_cache.clear()  # drop simulated snapshots
+
+
+def _drop_session(reason: str):
+    global access_token, is_authenticated, session_source, session_expires_at
+    if not is_authenticated:
+        return
+    logger.warning(f"✗ Zerodha session ended ({reason}); serving simulated data until the next login")
+    access_token = None
+    is_authenticated = False
+    session_source = None
+    session_expires_at = None
+    market_stream.stop()
+
+
+def _on_session_expired():
+    """Kite answered 403 TokenException: the token is dead for every worker"""
+    token = access_token
+    _drop_session("access token rejected by Kite")
+    session_store.clear(token)
+
+
+def sync_session(force: bool = False):
+    """
+    Adopt a login made by another worker (or restored from disk) and drop a
+    session that was cleared or has expired. Checks at most every
+    SESSION_SYNC_INTERVAL seconds; cheap enough for the request path.
+    """
+    global _next_session_check
+    now = time.monotonic()
+    if not force and now < _next_session_check:
+        return
+    _next_session_check = now + SESSION_SYNC_INTERVAL
+    changed, session = session_store.poll()
+    if changed and session is not None:
+        if session['access_token'] != access_token:
+            _adopt_session(session['access_token'], 'store', datetime.fromisoformat(session['expires_at']))
+            logger.info(f"✓ Worker {os.getpid()} using stored Zerodha session (expires {session['expires_at']})")
+    elif changed and session_source == 'store':
+        _drop_session("stored session removed or expired")
+    elif session_expires_at is not None and datetime.now(instruments.IST) >= session_expires_at:
+        _drop_session("Kite's daily 6 AM IST token reset")
+
+
 def check_connection():
-    """Check if API is connected and authenticated"""
+    """Check if API is connected and authenticated; the state is this worker's"""
+    sync_session()
     return {
         'kite_initialized': kite is not None,
         'authenticated': is_authenticated,
         'access_token': access_token is not None,
         'api_key': ZERODHA_API_KEY is not None,
+        'worker_pid': os.getpid(),
+        'session_source': session_source,
+        'session_expires_at': session_expires_at.isoformat() if session_expires_at else None,
+        'streaming': market_stream.is_streaming(),
+        'fetcher': shared_cache.is_fetcher(),
+        'kite_scheduler': kite_scheduler.stats(),
         'status': 'AUTHENTICATED' if is_authenticated else ('READY_FOR_AUTH' if kite else 'NOT_INITIALIZED')
     }
 
 
+def _simulated_ltp(symbol: str) -> float:
+    """Realistic simulated LTP around the symbol's base strike"""
+    base_strike = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
+    return base_strike * random.uniform(0.99, 1.01)
+
+
+def _strike_interval(symbol: str) -> int:
+    return SYMBOL_MAPPING.get(symbol, {}).get('strike_interval', 100)
+
+
+def _strike_window(symbol: str, ltp: float, strikes_each_side: int = OPTION_CHAIN_STRIKES_EACH_SIDE):
+    """ATM strike and the ATM ± N strike grid around it"""
+    interval = _strike_interval(symbol)
+    atm_strike = round(ltp / interval) * interval
+    strikes = [atm_strike + i * interval for i in range(-strikes_each_side, strikes_each_side + 1)]
+    return atm_strike, strikes
+
+
+def _best_price(levels: list) -> float:
+    """Top-of-book price from a Kite market depth side"""
+    return levels[0].get('price', 0) if levels else 0
+
+
+def _fill_option(options: np.ndarray, row: int, quote: dict):
+    """Write a Kite quote into one row of a chain side (IV is solved later in _attach_implied_vols)"""
+    depth = quote.get('depth', {})
+    options[row] = (
+        quote.get('last_price', 0),
+        quote.get('oi', 0),
+        0.0,
+        quote.get('volume', 0),
+        _best_price(depth.get('buy', [])),
+        _best_price(depth.get('sell', [])),
+        quote.get('instrument_token') or 0,
+    )
+
+
+def _time_to_expiry(expiry: str) -> float:
+    """Years from now until the 15:30 IST close on the expiry date"""
+    close = datetime.combine(date.fromisoformat(expiry), MARKET_CLOSE_TIME, tzinfo=instruments.IST)
+    seconds = (close - datetime.now(instruments.IST)).total_seconds()
+    return max(seconds, 60.0) / (365 * 24 * 3600)
+
+
+def _attach_implied_vols(symbol: str, chain: OptionChain) -> OptionChain:
+    """
+    Solve the options' implied volatilities from their bid/ask mids (or LTPs) in
+    one vectorized pass. Only options whose price changed, or whose last solve
+    was at a spot/time outside tolerance, are solved (see implied_vol.solve_chain);
+    the rest keep their previous IV.
+    """
+    if not chain.expiry or not chain.ltp or not len(chain):
+        return chain
+    with metrics.STAGE_SECONDS.time('implied_vol'):
+        time_to_expiry = _time_to_expiry(chain.expiry)
+        strikes = np.repeat(chain.strikes, 2)
+        is_call = np.tile([True, False], len(chain))
+        price = implied_vol.option_price(chain.interleaved('ltp'), chain.interleaved('bid'), chain.interleaved('ask'))
+        ivs = implied_vol.solve_chain(symbol, chain.expiry, price, chain.ltp, strikes, time_to_expiry, is_call)
+        ivs = np.round(np.nan_to_num(ivs, nan=0.0), 4)  # NaN: price outside no-arbitrage bounds
+    chain.ce['iv'] = ivs[0::2]
+    chain.pe['iv'] = ivs[1::2]
+    chain.time_to_expiry = time_to_expiry
+    return chain
+
+
+def fetch_quotes(instruments: list, priorities=None) -> dict:
+    """Quotes through the shared scheduler, batched with other callers' pending instruments (see kite_scheduler)"""
+    return kite_scheduler.quote(kite, instruments, priorities)
+
+
+def _fetch_live_chain(symbol: str, reference_ltp: float):
+    """
+    Fetch the underlying and every CE/PE in the ATM ± N window in one batched quote.
+    Contracts come from the instrument master for the nearest listed expiry. The
+    window is centred on the last known LTP; if the fetched LTP lands outside it
+    (cold start, gap open), one more fetch is made around the real ATM. While the
+    window is unchanged its instrument names are reused rather than looked up again.
+    """
+    index = instruments.ensure_instruments(kite)
+    if index is None:
+        raise ValueError("Instrument master unavailable")
+    expiry = index.nearest_expiry(symbol)
+    if expiry is None:
+        raise ValueError(f"No listed expiry for {symbol}")
+    underlying = SYMBOL_MAPPING.get(symbol, {}).get('quote_symbol', f"NSE:{symbol}")
+
+    def instrument(strike, option_type):
+        inst = index.lookup(symbol, expiry, strike, option_type)
+        return f"{inst.exchange}:{inst.tradingsymbol}" if inst else None
+
+    # Fetch two extra strikes each side so small drifts since the last fetch are still covered
+    _, strikes = index.strike_window(symbol, expiry, reference_ltp, OPTION_CHAIN_STRIKES_EACH_SIDE + 2)
+    for _ in range(2):
+        window = (expiry, tuple(strikes))
+        cached = _quote_windows.get(symbol)
+        if cached is not None and cached[0] == window:
+            _, names, priorities = cached
+        else:
+            # Underlying first, then strikes outward from the middle of the window
+            names, priorities = [underlying], [kite_scheduler.PRIORITY_UNDERLYING]
+            middle = len(strikes) // 2
+            for i, strike in enumerate(strikes):
+                names += [instrument(strike, 'CE'), instrument(strike, 'PE')]
+                priorities += [1 + abs(i - middle)] * 2
+            _quote_windows[symbol] = (window, names, priorities)
+        quotes = fetch_quotes(names, priorities)
+
+        ltp = quotes.get(underlying, {}).get('last_price', 0)
+        if not ltp or ltp <= 0:
+            raise ValueError(f"No underlying quote for {underlying}")
+        atm_strike, wanted = index.strike_window(symbol, expiry, ltp, OPTION_CHAIN_STRIKES_EACH_SIDE)
+        if strikes and strikes[0] <= atm_strike <= strikes[-1]:
+            break
+        logger.info(f"ATM {atm_strike} outside fetched window for {symbol}, refetching...")
+        strikes = wanted
+
+    # (CE, PE) names per fetched strike; wanted strikes past the window's edge have no quotes
+    pairs = dict(zip(strikes, zip(names[1::2], names[2::2])))
+    quoted = [
+        (strike, *(quotes.get(name) for name in pairs.get(strike, (None, None))))
+        for strike in wanted
+    ]
+    quoted = [row for row in quoted if row[1] or row[2]]
+    chain = OptionChain(
+        symbol, [strike for strike, _, _ in quoted], ltp, atm_strike,
+        expiry=expiry.isoformat(), lot_size=index.lot_size(symbol),
+    )
+    for row, (_, ce_quote, pe_quote) in enumerate(quoted):
+        _fill_option(chain.ce, row, ce_quote or {})
+        _fill_option(chain.pe, row, pe_quote or {})
+    return chain
+
+
+def _cache_store(namespace: str, symbol: str, value, timestamp: float = None):
+    """Store in this worker's cache and publish to the other workers"""
+    timestamp = timestamp or time.time()
+    market_cache.set(namespace, symbol, value, age=time.time() - timestamp)
+    shared_cache.publish(f"{namespace}_{symbol}", value, timestamp)
+    if is_authenticated and not _is_simulated(value):
+        if namespace == 'option_chain':
+            _last_live[symbol] = (timestamp, value)
+        elif namespace == 'ltp':
+            market_hours.observe(symbol, value, timestamp)
+    # Only the fetcher records, so workers never append the same snapshot twice
+    if shared_cache.is_fetcher():
+        if namespace == 'option_chain':
+            recorder.record_chain(symbol, value, timestamp)
+        elif namespace == 'ltp':
+            recorder.record_ltp(symbol, value, timestamp, simulated=not is_authenticated)
+
+
+def _is_simulated(value) -> bool:
+    return getattr(value, 'data_source', None) == 'SIMULATED'
+
+
+def _from_shared_cache(namespace: str, symbol: str):
+    """
+    Value published by another worker, or None if this worker should fetch.
+    Fresh entries are always used. While another worker is the live fetcher,
+    stale entries are used too (up to SHARED_CACHE_MAX_STALENESS) rather than
+    adding Kite traffic; the fetcher refreshes them on its own cadence.
+    """
+    entry = shared_cache.read(f"{namespace}_{symbol}")
+    if entry is None:
+        return None
+    timestamp, value = entry
+    age = time.time() - timestamp
+    # An authenticated worker never settles for a simulated snapshot
+    if is_authenticated and _is_simulated(value):
+        return None
+    if age < market_cache.ttl(namespace) or (
+        age < SHARED_CACHE_MAX_STALENESS and not shared_cache.is_fetcher() and shared_cache.fetcher_alive()
+    ):
+        market_cache.set(namespace, symbol, value, age=age)
+        if not _is_simulated(value):
+            # Followers size their refresh interval from the fetcher's prices too
+            market_hours.observe(symbol, value if namespace == 'ltp' else value.ltp, timestamp)
+        return value
+    return None
+
+
+def _sync_refresh_interval():
+    """Keep the cache TTLs equal to the current refresh interval (see market_hours)"""
+    interval = market_hours.refresh_interval()
+    if market_cache.ttl('option_chain') != interval:
+        for namespace in CACHE_TTLS:
+            market_cache.set_ttl(namespace, interval)
+
+
+def _snapshot_path(symbol: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{symbol}.pkl")
+
+
+def _save_snapshot(symbol: str, timestamp: float, chain: OptionChain):
+    """Persist a last-close chain, so a worker started off-hours has it without calling Kite"""
+    path = _snapshot_path(symbol)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump((timestamp, chain), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.error(f"✗ Could not save {symbol} snapshot: {e}")
+
+
+def _load_snapshot(symbol: str):
+    try:
+        with open(_snapshot_path(symbol), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _frozen_chain(symbol: str):
+    """
+    Chain served while the market is closed, with no Kite calls. It is the
+    newest of this worker's last live chain, the shared cache's, and the copy
+    saved in SNAPSHOT_DIR, provided it was taken at or after the last close.
+    None if there is none yet; the caller then fetches once to seed it.
+    """
+    frozen = _frozen.get(symbol)
+    if frozen is not None or time.monotonic() < _frozen_misses.get(symbol, 0):
+        return frozen
+    with _frozen_lock:
+        if symbol in _frozen:
+            return _frozen[symbol]
+        saved = _load_snapshot(symbol)
+        close = market_hours.last_close().timestamp()
+        candidates = [_last_live.get(symbol), saved, shared_cache.read(f"option_chain_{symbol}")]
+        candidates = [c for c in candidates if c is not None and c[0] >= close and not _is_simulated(c[1])]
+        if not candidates:
+            _frozen_misses[symbol] = time.monotonic() + FROZEN_RECHECK
+            return None
+        timestamp, chain = max(candidates, key=lambda candidate: candidate[0])
+        if shared_cache.is_fetcher() and (saved is None or saved[0] < timestamp):
+            _save_snapshot(symbol, timestamp, chain)
+        frozen = copy.copy(chain)  # shares the strike arrays
+        frozen.data_source = 'ZERODHA_CLOSE'
+        frozen.version = f"close-{timestamp:.6f}"
+        _frozen[symbol] = frozen
+    logger.info(f"✓ Market closed: serving the {symbol} chain from "
+                f"{datetime.fromtimestamp(timestamp, instruments.IST):%Y-%m-%d %H:%M:%S} IST until the next open")
+    return frozen
+
+
+def _market_frozen() -> bool:
+    """True while the market is closed; drops the frozen chains once it reopens"""
+    if market_hours.is_closed():
+        return True
+    if _frozen or _frozen_misses:
+        _frozen.clear()
+        _frozen_misses.clear()
+    return False
+
+
+def _refresh(namespace: str, symbol: str, loader):
+    """
+    Cache-miss path. Only one load per key runs at a time: concurrent callers
+    wait for it instead of each calling Kite. With stale-while-revalidate the
+    last snapshot (up to CACHE_MAX_STALENESS old) is returned immediately and
+    the load runs in the background.
+    """
+    cache_key = f"{namespace}_{symbol}"
+    if CACHE_STALE_WHILE_REVALIDATE:
+        value = market_cache.get_stale(namespace, symbol, CACHE_MAX_STALENESS)
+        if value is not None and not (is_authenticated and _is_simulated(value)):
+            refresh_in_background(cache_key, loader)
+            return value
+    return single_flight(cache_key, loader)
+
+
 def get_ltp(symbol: str):
     """Get Last Traded Price - works only if authenticated"""
+    sync_session()
+    _sync_refresh_interval()
     try:
-        cache_key = f"ltp_{symbol}"
+        if _market_frozen():
+            frozen = _frozen_chain(symbol)
+            if frozen is not None:
+                return frozen.ltp
+        
+        # Streaming snapshot needs no network I/O
+        live_ltp = market_stream.get_live_ltp(symbol)
+        if live_ltp:
+            return live_ltp
         
         # Check cache first
-        if cache_key in PRICE_CACHE:
-            cached_time, price = PRICE_CACHE[cache_key]
-            if time.time() - cached_time < CACHE_DURATION:
-                return price
+        price = market_cache.get('ltp', symbol)
+        if price is not None:
+            return price
         
-        # Try to fetch from Zerodha ONLY if authenticated
-        if is_authenticated and kite:
-            try:
-                logger.info(f"Fetching live LTP for {symbol}...")
-                # Try different symbol formats
-                symbol_formats = [
-                    f"NSE:{symbol}",
-                    f"NFO:{symbol}2612550CE",  # NIFTY example
-                    symbol
-                ]
-                
-                for sym_format in symbol_formats:
-                    try:
-                        quote = kite.quote(sym_format)
-                        if quote:
-                            ltp = quote[sym_format]['last_price']
-                            PRICE_CACHE[cache_key] = (time.time(), ltp)
-                            logger.info(f"✓ Got live LTP for {symbol}: {ltp}")
-                            return ltp
-                    except:
-                        continue
-            except Exception as auth_error:
-                logger.debug(f"Could not fetch live data for {symbol}: {auth_error}")
-        else:
-            logger.debug(f"Not authenticated. Using simulated LTP for {symbol}")
+        # Then what the fetcher worker published
+        shared_ltp = _from_shared_cache('ltp', symbol)
+        if shared_ltp:
+            return shared_ltp
         
-        # Fallback to simulated realistic data
-        base_strike = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
-        ltp = base_strike * random.uniform(0.99, 1.01)
-        PRICE_CACHE[cache_key] = (time.time(), ltp)
-        return ltp
+        return _refresh('ltp', symbol, lambda: _load_ltp(symbol))
         
     except Exception as e:
         logger.error(f"Error in get_ltp for {symbol}: {e}")
-        base_strike = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
-        return base_strike * random.uniform(0.99, 1.01)
+        # Never pass simulated prices off as live ones
+        return None if is_authenticated else _simulated_ltp(symbol)
+
+
+def _live_load_failed(kind: str, symbol: str, error: Exception):
+    """
+    Authenticated load failed even after the scheduler's retries: serve the last
+    live value (up to CACHE_MAX_STALENESS old) or raise. Simulated data is only
+    ever used before authentication.
+    """
+    stale = market_cache.peek(kind, symbol)
+    if stale is not None and stale[0] < CACHE_MAX_STALENESS and not _is_simulated(stale[1]):
+        metrics.DATA_LOADS.inc(kind, 'STALE')
+        logger.warning(f"✗ Live {kind} fetch for {symbol} failed ({error}); serving snapshot from {stale[0]:.1f}s ago")
+        return stale[1]
+    metrics.DATA_LOADS.inc(kind, 'FAILED')
+    logger.error(f"✗ Live {kind} fetch for {symbol} failed and no recent live snapshot: {error}")
+    raise error
+
+
+def _load_ltp(symbol: str) -> float:
+    """Fetch a fresh LTP (live if authenticated, simulated otherwise) and cache it"""
+    # Try to fetch from Zerodha ONLY if authenticated
+    if is_authenticated and kite:
+        try:
+            logger.info(f"Fetching live LTP for {symbol}...")
+            underlying = SYMBOL_MAPPING.get(symbol, {}).get('quote_symbol', f"NSE:{symbol}")
+            quote = fetch_quotes([underlying], kite_scheduler.PRIORITY_UNDERLYING)
+            ltp = quote[underlying]['last_price']
+            _cache_store('ltp', symbol, ltp)
+            metrics.DATA_LOADS.inc('ltp', 'ZERODHA_LIVE')
+            logger.info(f"✓ Got live LTP for {symbol}: {ltp}")
+            return ltp
+        except Exception as e:
+            return _live_load_failed('ltp', symbol, e)
+    
+    logger.debug(f"Not authenticated. Using simulated LTP for {symbol}")
+    ltp = _simulated_ltp(symbol)
+    market_cache.set('ltp', symbol, ltp)
+    metrics.DATA_LOADS.inc('ltp', 'SIMULATED')
+    return ltp
 
 
 def get_option_chain(symbol: str):
-    """Get option chain with ATM and ITM strikes for both CE and PE with real data"""
+    """Get option chain for ATM ± N strikes for both CE and PE, plus the underlying LTP"""
+    sync_session()
+    _sync_refresh_interval()
     try:
-        cache_key = f"option_chain_{symbol}"
-        
-        # Check cache
-        if cache_key in OPTION_CHAIN_CACHE:
-            cached_time, chain = OPTION_CHAIN_CACHE[cache_key]
-            if time.time() - cached_time < CACHE_DURATION:
-                return chain
-        
-        # Get current LTP to determine ATM
-        ltp = get_ltp(symbol)
-        if not ltp or ltp <= 0:
-            base_strike = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
-            ltp = base_strike
+        # Off-hours: the last-close snapshot, with no Kite calls
+        if _market_frozen():
+            frozen = _frozen_chain(symbol)
+            if frozen is not None:
+                return frozen
         
-        # Determine strike interval
-        strike_interval = 50 if symbol == "NIFTY" else (100 if symbol == "BANKNIFTY" else 100)
-        atm_strike = round(ltp / strike_interval) * strike_interval
+        # Streaming snapshot needs no network I/O
+        live_chain = market_stream.get_live_chain(symbol)
+        if live_chain is not None:
+            return _attach_implied_vols(symbol, live_chain)
         
-        # Get ATM and ITM strikes for both CE and PE
-        strikes_to_fetch = [
-            atm_strike,                     # ATM
-            atm_strike - strike_interval,   # ITM for CE, OTM for PE
-        ]
-        
-        # Try live data if authenticated
-        if is_authenticated and kite:
-            try:
-                logger.info(f"Fetching LIVE option chain for {symbol} | LTP: {ltp:.2f} | ATM: {atm_strike}...")
-                
-                # Get instruments for option chain
-                # Format: NFO:NIFTY26DEC24C20000
-                from datetime import datetime, timedelta
-                
-                # Get nearest expiry (next Thursday for NIFTY/BANKNIFTY)
-                today = datetime.now()
-                days_ahead = (3 - today.weekday()) % 7  # Thursday = 3
-                if days_ahead == 0:
-                    days_ahead = 7
-                expiry_date = today + timedelta(days=days_ahead)
-                expiry_str = expiry_date.strftime('%y%b%d').upper()
-                
-                chain_data = {'strikes': []}
-                
-                for strike in strikes_to_fetch:
-                    # Build instrument names for CE and PE
-                    ce_instrument = f"NFO:{symbol}{expiry_str}{int(strike)}CE"
-                    pe_instrument = f"NFO:{symbol}{expiry_str}{int(strike)}PE"
-                    
-                    try:
-                        # Fetch quotes for both CE and PE
-                        quotes = kite.quote([ce_instrument, pe_instrument])
-                        
-                        ce_data = quotes.get(ce_instrument, {})
-                        pe_data = quotes.get(pe_instrument, {})
-                        
-                        strike_info = {
-                            'strike': strike,
-                            'ce': {
-                                'ltp': ce_data.get('last_price', 0),
-                                'oi': ce_data.get('oi', 0),
-                                'iv': ce_data.get('ohlc', {}).get('close', 0) / strike * 100 * 0.01,  # Approximation
-                                'volume': ce_data.get('volume', 0),
-                                'bid': ce_data.get('depth', {}).get('buy', [{}])[0].get('price', 0),
-                                'ask': ce_data.get('depth', {}).get('sell', [{}])[0].get('price', 0),
-                            },
-                            'pe': {
-                                'ltp': pe_data.get('last_price', 0),
-                                'oi': pe_data.get('oi', 0),
-                                'iv': pe_data.get('ohlc', {}).get('close', 0) / strike * 100 * 0.01,  # Approximation
-                                'volume': pe_data.get('volume', 0),
-                                'bid': pe_data.get('depth', {}).get('buy', [{}])[0].get('price', 0),
-                                'ask': pe_data.get('depth', {}).get('sell', [{}])[0].get('price', 0),
-                            }
-                        }
-                        
-                        chain_data['strikes'].append(strike_info)
-                        logger.info(f"✓ Got LIVE data for strike {strike}: CE OI={strike_info['ce']['oi']}, PE OI={strike_info['pe']['oi']}")
-                        
-                    except Exception as strike_error:
-                        logger.warning(f"Could not fetch strike {strike}: {strike_error}")
-                        continue
-                
-                if chain_data['strikes']:
-                    OPTION_CHAIN_CACHE[cache_key] = (time.time(), chain_data)
-                    logger.info(f"✓ LIVE option chain cached for {symbol} with {len(chain_data['strikes'])} strikes")
-                    return chain_data
-                    
-            except Exception as e:
-                logger.error(f"Failed to fetch live option chain: {e}")
-                logger.info(f"Falling back to simulated data...")
+        # Check cache
+        chain = market_cache.get('option_chain', symbol)
+        if chain is not None:
+            return chain
         
-        # Fallback: Generate simulated data
-        logger.info(f"Using simulated option chain for {symbol} (not authenticated)")
-        chain_data = {
-            'strikes': [
-                {
-                    'strike': strike,
-                    'ce': {
-                        'ltp': random.uniform(50, 500),
-                        'oi': random.randint(10000, 200000),
-                        'iv': random.uniform(0.15, 0.40),
-                        'volume': random.randint(1000, 50000),
-                        'bid': 0,
-                        'ask': 0,
-                    },
-                    'pe': {
-                        'ltp': random.uniform(50, 500),
-                        'oi': random.randint(10000, 200000),
-                        'iv': random.uniform(0.15, 0.40),
-                        'volume': random.randint(1000, 50000),
-                        'bid': 0,
-                        'ask': 0,
-                    }
-                }
-                for strike in strikes_to_fetch
-            ]
-        }
+        # Then what the fetcher worker published
+        shared_chain = _from_shared_cache('option_chain', symbol)
+        if shared_chain is not None:
+            return shared_chain
         
-        OPTION_CHAIN_CACHE[cache_key] = (time.time(), chain_data)
-        return chain_data
+        return _refresh('option_chain', symbol, lambda: _load_option_chain(symbol))
         
     except Exception as e:
         logger.error(f"Error in get_option_chain for {symbol}: {e}")
         return None
 
 
-def calculate_greeks(ltp: float, strike: float, iv: float, time_to_expiry: float = 0.038) -> dict:
+def _load_option_chain(symbol: str):
+    """Fetch a fresh chain (live if authenticated, simulated otherwise) and cache it for every worker"""
+    # Try live data if authenticated
+    if is_authenticated and kite:
+        try:
+            # Centre the fetch window on the last known LTP, even if its cache entry is stale
+            cached_ltp = market_cache.peek('ltp', symbol)
+            reference_ltp = cached_ltp[1] if cached_ltp else SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
+            logger.info(f"Fetching LIVE option chain for {symbol} around {reference_ltp:.2f}...")
+            
+            chain = _attach_implied_vols(symbol, _fetch_live_chain(symbol, reference_ltp))
+            now = time.time()
+            # The batched fetch includes the underlying, so the LTP cache is refreshed for free
+            _cache_store('ltp', symbol, chain.ltp, now)
+            if not len(chain):
+                raise ValueError(f"No option quotes returned for {symbol}")
+            
+            chain.data_source = 'ZERODHA_LIVE'
+            chain.version = f"rest-{now:.6f}"
+            _cache_store('option_chain', symbol, chain, now)
+            metrics.DATA_LOADS.inc('option_chain', 'ZERODHA_LIVE')
+            logger.info(f"✓ LIVE option chain cached for {symbol} | LTP: {chain.ltp:.2f} | ATM: {chain.atm_strike} | {len(chain)} strikes")
+            return chain
+        except Exception as e:
+            return _live_load_failed('option_chain', symbol, e)
+    
+    # Fallback: Generate simulated data
+    logger.info(f"Using simulated option chain for {symbol} (not authenticated)")
+    ltp = get_ltp(symbol)
+    if not ltp or ltp <= 0:
+        ltp = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
+    atm_strike, strikes_to_fetch = _strike_window(symbol, ltp)
+    chain = OptionChain(
+        symbol, strikes_to_fetch, ltp, atm_strike,
+        data_source='SIMULATED', version=f"sim-{time.time():.6f}",
+    )
+    n = len(chain)
+    for options in (chain.ce, chain.pe):
+        options['ltp'] = np.random.uniform(50, 500, n)
+        options['oi'] = np.random.randint(10000, 200001, n)
+        options['iv'] = np.random.uniform(0.15, 0.40, n)
+        options['volume'] = np.random.randint(1000, 50001, n)
+    
+    _cache_store('option_chain', symbol, chain)
+    metrics.DATA_LOADS.inc('option_chain', 'SIMULATED')
+    return chain
+
+
+def refresh_market_data():
     """
-    Calculate Greeks using Black-Scholes approximation
-    time_to_expiry: 0.038 years ≈ 10 trading days (standard for weekly options)
+    Fetcher-worker refresh: publish a fresh chain (and LTP) for every symbol so
+    the other workers never need to call Kite. Also keeps the tick stream,
+    which only the fetcher runs, connected.
     """
-    try:
-        r = 0.05  # Risk-free rate (5%)
-        s = float(ltp)
-        k = float(strike)
-        sigma = float(iv)
-        t = float(time_to_expiry)
-        
-        if t <= 0 or sigma <= 0 or s <= 0 or k <= 0:
-            return {'delta': 0.0, 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0}
-        
-        # d1 and d2 for Black-Scholes
-        d1 = (math.log(s / k) + (r + 0.5 * sigma ** 2) * t) / (sigma * math.sqrt(t))
-        d2 = d1 - sigma * math.sqrt(t)
-        
-        # Standard normal CDF approximation
-        from math import pi, exp
-        def norm_cdf(x):
-            return 0.5 * (1 + math.erf(x / math.sqrt(2)))
-        
-        # Delta: N(d1)
-        delta = norm_cdf(d1)
-        
-        # Gamma: n(d1) / (S * sigma * sqrt(T))
-        norm_pdf_d1 = (1 / math.sqrt(2 * pi)) * exp(-0.5 * d1 ** 2)
-        gamma = norm_pdf_d1 / (s * sigma * math.sqrt(t))
-        
-        # Vega: S * n(d1) * sqrt(T) / 100 (per 1% change in IV)
-        vega = s * norm_pdf_d1 * math.sqrt(t) / 100
-        
-        # Theta: daily decay
-        theta = (-s * norm_pdf_d1 * sigma / (2 * math.sqrt(t)) - r * k * exp(-r * t) * norm_cdf(d2)) / 252
-        
-        return {
-            'delta': round(delta, 4),
-            'gamma': round(gamma, 6),
-            'theta': round(theta, 4),
-            'vega': round(vega, 4),
-        }
-    except Exception as e:
-        logger.error(f"Error calculating Greeks: {e}")
-        return {'delta': 0.0, 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0}
+    sync_session()
+    if not (is_authenticated and kite):
+        return
+    if _market_frozen():
+        # Nothing moves until the next open: stop the stream, and only seed
+        # the frozen snapshot if this worker has none yet
+        if market_stream.is_started():
+            market_stream.stop()
+        for symbol in SYMBOL_MAPPING:
+            get_option_chain(symbol)
+        return
+    if STREAM_ENABLED and not market_stream.is_started():
+        market_stream.start(ZERODHA_API_KEY, access_token)
+    # Symbols refresh concurrently so the scheduler can merge their quotes into one call
+    for symbol, future in [(symbol, _refresh_pool.submit(_refresh_symbol, symbol)) for symbol in SYMBOL_MAPPING]:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"✗ Refresh failed for {symbol}: {e}")
+
+
+def _refresh_symbol(symbol: str):
+    live_chain = market_stream.get_live_chain(symbol)
+    if live_chain is not None:
+        now = time.time()
+        chain = _attach_implied_vols(symbol, live_chain)
+        _cache_store('ltp', symbol, chain.ltp, now)
+        _cache_store('option_chain', symbol, chain, now)
+    else:
+        single_flight(f"option_chain_{symbol}", lambda: _load_option_chain(symbol))
 
 
-def generate_signal_from_market_data(symbol: str, params: dict) -> dict:
-    """Generate STRONG BUY signal only when ALL Greeks, OI, and IV match for CE or PE"""
+def _preconnect() -> int:
+    """
+    Open the pooled keep-alive connections (TCP + TLS) before the first real
+    call. Responses are held until all are open so each request takes its own
+    connection; closing them returns every connection to the pool.
+    """
+    def open_connection(_):
+        try:
+            return kite.reqsession.get(kite.root, stream=True, timeout=(KITE_CONNECT_TIMEOUT, KITE_READ_TIMEOUT),
+                                       verify=not kite.disable_ssl, proxies=kite.proxies)
+        except Exception as e:
+            logger.debug(f"Pre-connect to {kite.root} failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=KITE_POOL_SIZE, thread_name_prefix="kite-preconnect") as pool:
+        responses = [response for response in pool.map(open_connection, range(KITE_POOL_SIZE)) if response is not None]
+    for response in responses:
+        response.close()
+    return len(responses)
+
+
+def _await_published(deadline: float) -> list:
+    """
+    Symbols whose option chain the fetcher has published and this worker would
+    serve (see _from_shared_cache), polling until all are or `deadline` passes
+    """
+    while True:
+        ready = [symbol for symbol in SYMBOL_MAPPING if _from_shared_cache('option_chain', symbol) is not None]
+        if len(ready) == len(SYMBOL_MAPPING) or time.monotonic() >= deadline:
+            return ready
+        time.sleep(0.2)
+
+
+def warm_up(timeout: float = WARMUP_TIMEOUT) -> list:
+    """
+    Startup warm-up: open the pooled Kite connections, load the instrument
+    master and prime the LTP and option chain caches for every symbol, so the
+    first request is served like any later one. Only the fetcher worker calls
+    Kite for market data; the others wait up to `timeout` for the snapshots it
+    publishes. Returns the symbols whose option chain was primed.
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    if kite is None:
+        initialize_kite()
+    # In-process clients (the benchmarks' fake) have no HTTP session to warm
+    opened = _preconnect() if getattr(kite, 'reqsession', None) is not None else 0
+    symbols = list(SYMBOL_MAPPING)
+    if is_authenticated and kite:
+        if shared_cache.wait_for_election(timeout):
+            instruments.ensure_instruments(kite)
+        else:
+            symbols = _await_published(deadline)
+            instruments.ensure_instruments(None)  # today's master, as the fetcher saved it
+    # Concurrent, so the scheduler fetches every symbol in one merged quote call
+    chains = list(_refresh_pool.map(get_option_chain, symbols))
+    primed = [symbol for symbol, chain in zip(symbols, chains) if chain is not None]
+    logger.info(f"✓ Warm-up done in {time.perf_counter() - started:.2f}s: {opened}/{KITE_POOL_SIZE} Kite connections, "
+                f"{len(primed)}/{len(SYMBOL_MAPPING)} option chains cached")
+    return primed
+
+
+def generate_signal_from_market_data(symbol: str, params: dict, option_chain: OptionChain = None) -> dict:
+    """
+    Generate STRONG BUY signal only when ALL Greeks, OI, and IV match for CE or PE.
+    Evaluates `option_chain` if given, otherwise the current chain.
+    """
     try:
-        from datetime import datetime
-        
-        # Get current LTP
-        ltp = get_ltp(symbol)
-        if not ltp or ltp <= 0:
-            base_strike = SYMBOL_MAPPING.get(symbol, {}).get('strike_base', 20000)
-            ltp = base_strike
-        
-        logger.info(f"Analyzing {symbol} | LTP: {ltp:.2f}")
-        
-        # Get option chain with live data
-        option_chain = get_option_chain(symbol)
-        if not option_chain or not option_chain.get('strikes'):
+        started = time.perf_counter()
+        # Get option chain with live data (the same fetch carries the underlying LTP)
+        if option_chain is None:
+            with metrics.STAGE_SECONDS.time('option_chain'):
+                option_chain = get_option_chain(symbol)
+        if option_chain is None or not len(option_chain):
             logger.error(f"Failed to get option chain for {symbol}")
             return None
         
-        strikes_data = option_chain['strikes']
-        if not strikes_data:
-            return None
-        
-        # Get thresholds
-        vega_min = params.get('vega_min', 0.3)
-        gamma_min = params.get('gamma_min', 0.05)
-        theta_max = params.get('theta_min', -0.5)  # theta is negative
-        delta_min = params.get('delta_min', 0.4)
-        oi_min = params.get('iv_call_oi_min', 50000)
-        iv_min = params.get('iv_min', 0.20)
-        confidence_min = params.get('confidence_min', 0.80)  # High threshold for STRONG BUY
+        ltp = option_chain.ltp or get_ltp(symbol)
+        logger.info(f"Analyzing {symbol} | LTP: {ltp:.2f}")
+        metrics.SIGNAL_SOURCES.inc(option_chain.data_source or 'UNKNOWN')
         
-        best_signal = None
-        max_confidence = 0.0
-        
-        # Analyze each strike for both CE and PE
-        for strike_data in strikes_data:
-            strike = strike_data['strike']
-            
-            # Analyze CE (Call Option)
-            ce_data = strike_data.get('ce', {})
-            if ce_data.get('oi', 0) > 0:
-                ce_greeks = calculate_greeks(ltp, strike, ce_data.get('iv', 0.25))
-                
-                # Check if ALL CE Greeks match criteria
-                ce_vega_match = abs(ce_greeks['vega']) >= vega_min
-                ce_gamma_match = ce_greeks['gamma'] >= gamma_min
-                ce_theta_match = ce_greeks['theta'] <= theta_max
-                ce_delta_match = abs(ce_greeks['delta']) >= delta_min
-                ce_oi_match = ce_data['oi'] >= oi_min
-                ce_iv_match = ce_data['iv'] >= iv_min
-                
-                if ce_vega_match and ce_gamma_match and ce_theta_match and ce_delta_match and ce_oi_match and ce_iv_match:
-                    # Calculate confidence score
-                    vega_score = min(abs(ce_greeks['vega']) / vega_min, 1.0)
-                    gamma_score = min(ce_greeks['gamma'] / gamma_min, 1.0)
-                    delta_score = min(abs(ce_greeks['delta']) / delta_min, 1.0)
-                    oi_score = min(ce_data['oi'] / oi_min, 1.0)
-                    iv_score = min(ce_data['iv'] / iv_min, 1.0)
-                    
-                    confidence = (vega_score * 0.20 + gamma_score * 0.20 + delta_score * 0.20 + oi_score * 0.25 + iv_score * 0.15)
-                    confidence = round(min(confidence, 1.0), 2)
-                    
-                    if confidence >= confidence_min and confidence > max_confidence:
-                        max_confidence = confidence
-                        best_signal = {
-                            'symbol': symbol,
-                            'timestamp': datetime.utcnow().strftime('%H:%M:%S'),
-                            'option_type': 'CE',
-                            'strike': strike,
-                            'vega': ce_greeks['vega'],
-                            'gamma': ce_greeks['gamma'],
-                            'theta': ce_greeks['theta'],
-                            'delta': ce_greeks['delta'],
-                            'oi': ce_data['oi'],
-                            'iv': ce_data['iv'],
-                            'ltp_option': ce_data.get('ltp', 0),
-                            'side': 'STRONG BUY CE',
-                            'confidence': confidence,
-                            'ltp': round(ltp, 2),
-                            'data_source': 'ZERODHA_LIVE' if is_authenticated else 'SIMULATED',
-                        }
-                        logger.info(f"✓ STRONG CE MATCH: {symbol} Strike {strike} | Confidence: {confidence*100:.0f}% | OI: {ce_data['oi']}")
-            
-            # Analyze PE (Put Option)
-            pe_data = strike_data.get('pe', {})
-            if pe_data.get('oi', 0) > 0:
-                pe_greeks = calculate_greeks(ltp, strike, pe_data.get('iv', 0.25))
-                
-                # Check if ALL PE Greeks match criteria
-                pe_vega_match = abs(pe_greeks['vega']) >= vega_min
-                pe_gamma_match = pe_greeks['gamma'] >= gamma_min
-                pe_theta_match = pe_greeks['theta'] <= theta_max
-                pe_delta_match = abs(pe_greeks['delta']) >= delta_min
-                pe_oi_match = pe_data['oi'] >= oi_min
-                pe_iv_match = pe_data['iv'] >= iv_min
-                
-                if pe_vega_match and pe_gamma_match and pe_theta_match and pe_delta_match and pe_oi_match and pe_iv_match:
-                    # Calculate confidence score
-                    vega_score = min(abs(pe_greeks['vega']) / vega_min, 1.0)
-                    gamma_score = min(pe_greeks['gamma'] / gamma_min, 1.0)
-                    delta_score = min(abs(pe_greeks['delta']) / delta_min, 1.0)
-                    oi_score = min(pe_data['oi'] / oi_min, 1.0)
-                    iv_score = min(pe_data['iv'] / iv_min, 1.0)
-                    
-                    confidence = (vega_score * 0.20 + gamma_score * 0.20 + delta_score * 0.20 + oi_score * 0.25 + iv_score * 0.15)
-                    confidence = round(min(confidence, 1.0), 2)
-                    
-                    if confidence >= confidence_min and confidence > max_confidence:
-                        max_confidence = confidence
-                        best_signal = {
-                            'symbol': symbol,
-                            'timestamp': datetime.utcnow().strftime('%H:%M:%S'),
-                            'option_type': 'PE',
-                            'strike': strike,
-                            'vega': pe_greeks['vega'],
-                            'gamma': pe_greeks['gamma'],
-                            'theta': pe_greeks['theta'],
-                            'delta': pe_greeks['delta'],
-                            'oi': pe_data['oi'],
-                            'iv': pe_data['iv'],
-                            'ltp_option': pe_data.get('ltp', 0),
-                            'side': 'STRONG BUY PE',
-                            'confidence': confidence,
-                            'ltp': round(ltp, 2),
-                            'data_source': 'ZERODHA_LIVE' if is_authenticated else 'SIMULATED',
-                        }
-                        logger.info(f"✓ STRONG PE MATCH: {symbol} Strike {strike} | Confidence: {confidence*100:.0f}% | OI: {pe_data['oi']}")
+        with metrics.STAGE_SECONDS.time('evaluate'):
+            best_signal = evaluate_signal(symbol, option_chain, params, ltp)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, 'total')
         
         if best_signal:
             logger.info(f"🎯 STRONG BUY SIGNAL: {symbol} {best_signal['option_type']} @ {best_signal['strike']} | Confidence: {best_signal['confidence']*100:.0f}%")
@@ -443,6 +789,32 @@ def generate_signal_from_market_data(symbol: str, params: dict) -> dict:
         return None
 
 
-# Initialize on module load
+def generate_candidates_from_market_data(symbol: str, params: dict, count: int, option_chain: OptionChain = None) -> list:
+    """
+    Top `count` STRONG BUY candidates for a symbol, best first (empty if none
+    qualify). Same inputs as generate_signal_from_market_data.
+    """
+    try:
+        if option_chain is None:
+            option_chain = get_option_chain(symbol)
+        if option_chain is None or not len(option_chain):
+            logger.error(f"Failed to get option chain for {symbol}")
+            return []
+        
+        ltp = option_chain.ltp or get_ltp(symbol)
+        candidates = evaluate_candidates(symbol, option_chain, params, count, ltp)
+        
+        logger.info(f"🎯 {len(candidates)} STRONG BUY candidate(s) for {symbol} (top {count})")
+        return candidates
+        
+    except Exception as e:
+        logger.error(f"Error generating candidates for {symbol}: {e}", exc_info=True)
+        return []
+
+
+# Initialize on module load, restoring a persisted session if one is still valid
 initialize_kite()
+sync_session(force=True)
+instruments.load_from_disk()
+market_stream.set_window_loader(_fetch_live_chain)
 
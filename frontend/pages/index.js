@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import axios from 'axios'
 
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
@@ -11,24 +11,44 @@ export default function Home() {
   const [loading, setLoading] = useState(false)
   const [lastUpdate, setLastUpdate] = useState(null)
   const [strikeAnimation, setStrikeAnimation] = useState(false)
+  const signalRef = useRef(null)
 
-  // Fetch signals every 10 seconds
+  // Signals are pushed by the backend (WebSocket, then SSE); polling at the backend's refresh interval is the last resort
   useEffect(() => {
+    let socket = null
+    let eventSource = null
+    let interval = null
+    let reconnectTimer = null
+    let closed = false
+
+    const applySignal = (data) => {
+      setPrevSignal(signalRef.current)
+      signalRef.current = data
+      setSignal(data)
+      setLastUpdate(new Date())
+      setConnected(true)
+      setLoading(false)
+      if (data) {
+        setStrikeAnimation(true)
+        setTimeout(() => setStrikeAnimation(false), 600)
+      }
+    }
+
+    const handleMessage = (raw) => {
+      const message = JSON.parse(raw)
+      if (message.type === 'signal' && message.symbol === symbol) {
+        applySignal(message.signal)
+      }
+    }
+
     const fetchSignal = async () => {
       setLoading(true)
       try {
         const response = await axios.get(`${BACKEND_URL}/api/signal`, {
           params: { symbol },
         })
-        setPrevSignal(signal)
         // Backend returns null if no STRONG BUY signal
-        setSignal(response.data)
-        setLastUpdate(new Date())
-        setConnected(true)
-        if (response.data) {
-          setStrikeAnimation(true)
-          setTimeout(() => setStrikeAnimation(false), 600)
-        }
+        applySignal(response.data)
       } catch (error) {
         console.error('Error fetching signal:', error)
         setSignal(null)
@@ -38,10 +58,73 @@ export default function Home() {
       }
     }
 
-    fetchSignal()
-    const interval = setInterval(fetchSignal, 10000)
+    // Poll as often as the backend refreshes: faster in volatile sessions, rarely while the market is closed
+    const pollDelay = async () => {
+      try {
+        const response = await axios.get(`${BACKEND_URL}/api/status`)
+        return Math.max(Number(response.data.refresh_interval) || 10, 1) * 1000
+      } catch (error) {
+        return 10000
+      }
+    }
+
+    const startPolling = async () => {
+      await fetchSignal()
+      const delay = await pollDelay()
+      if (!closed) interval = setTimeout(startPolling, delay)
+    }
+
+    const startEventSource = () => {
+      if (typeof EventSource === 'undefined') {
+        startPolling()
+        return
+      }
+      let opened = false
+      eventSource = new EventSource(`${BACKEND_URL}/api/signals/stream?symbol=${symbol}`)
+      eventSource.onopen = () => { opened = true }
+      eventSource.onmessage = (event) => handleMessage(event.data)
+      eventSource.onerror = () => {
+        // EventSource reconnects by itself once it has worked; otherwise fall back to polling
+        setConnected(false)
+        if (!opened && !closed) {
+          eventSource.close()
+          eventSource = null
+          startPolling()
+        }
+      }
+    }
+
+    const startWebSocket = () => {
+      if (typeof WebSocket === 'undefined') {
+        startEventSource()
+        return
+      }
+      let opened = false
+      setLoading(true)
+      socket = new WebSocket(`${BACKEND_URL.replace(/^http/, 'ws')}/ws/signals?symbol=${symbol}`)
+      socket.onopen = () => { opened = true }
+      socket.onmessage = (event) => handleMessage(event.data)
+      socket.onclose = () => {
+        socket = null
+        if (closed) return
+        setConnected(false)
+        if (opened) {
+          reconnectTimer = setTimeout(startWebSocket, 2000)
+        } else {
+          startEventSource()
+        }
+      }
+    }
+
+    startWebSocket()
 
-    return () => clearInterval(interval)
+    return () => {
+      closed = true
+      if (socket) socket.close()
+      if (eventSource) eventSource.close()
+      if (interval) clearTimeout(interval)
+      if (reconnectTimer) clearTimeout(reconnectTimer)
+    }
   }, [symbol])
 
   const handleSymbolChange = (newSymbol) => {
@@ -561,7 +644,8 @@ export default function Home() {
               <h2 className="symbol-name">{signal.symbol}</h2>
               <p className="signal-time">{signal.timestamp}</p>
               <div className="data-source-badge">
-                {signal.data_source === 'ZERODHA_LIVE' ? '📡 LIVE DATA' : '🔄 SIMULATED'}
+                {signal.data_source === 'ZERODHA_LIVE' ? '📡 LIVE DATA'
+                  : signal.data_source === 'ZERODHA_CLOSE' ? '🔒 MARKET CLOSED' : '🔄 SIMULATED'}
               </div>
             </div>
 
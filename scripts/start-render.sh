@@ -17,6 +17,9 @@ echo "📂 Backend directory: $(pwd)"
 echo "🔍 Files in directory:"
 ls -la
 
+# Workers share market data through tmpfs; one elected worker fetches from Kite
+export MARKET_CACHE_BACKEND="${MARKET_CACHE_BACKEND:-shm}"
+
 # Start gunicorn
 echo "🌐 Starting gunicorn on 0.0.0.0:$PORT"
 exec gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT